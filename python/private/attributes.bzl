@@ -344,6 +344,10 @@ files that may be needed at run time belong in `data`.
         "srcs_version": lambda: attrb.String(
             doc = "Defunct, unused, does nothing.",
         ),
+        "_precompile_batch_size_flag": lambda: attrb.Label(
+            default = labels.PRECOMPILE_BATCH_SIZE,
+            providers = [BuildSettingInfo],
+        ),
         "_precompile_flag": lambda: attrb.Label(
             default = labels.PRECOMPILE,
             providers = [BuildSettingInfo],
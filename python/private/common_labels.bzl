@@ -21,9 +21,11 @@ labels = struct(
     PLATFORMS_OS_MACOS = str(Label("@platforms//os:macos")),
     PLATFORMS_OS_WINDOWS = str(Label("@platforms//os:windows")),
     PRECOMPILE = str(Label("//python/config_settings:precompile")),
+    PRECOMPILE_BATCH_SIZE = str(Label("//python/config_settings:precompile_batch_size")),
     PRECOMPILE_SOURCE_RETENTION = str(Label("//python/config_settings:precompile_source_retention")),
     PYC_COLLECTION = str(Label("//python/config_settings:pyc_collection")),
     PYTHON_IMPORT_ALL_REPOSITORIES = str(Label("//python/config_settings:experimental_python_import_all_repositories")),
+    PYTHON_IMPORT_INDEX = str(Label("//python/config_settings:experimental_python_import_index")),
     PYTHON_SRC = str(Label("//python/bin:python_src")),
     PYTHON_VERSION = str(Label("//python/config_settings:python_version")),
     PYTHON_VERSION_MAJOR_MINOR = str(Label("//python/config_settings:python_version_major_minor")),
@@ -73,8 +73,8 @@ def maybe_precompile(ctx, srcs):
     )
     for src in srcs:
         if should_precompile:
-            # NOTE: _precompile() may return None
-            pyc = _precompile(ctx, src, use_pycache = keep_source)
+            # NOTE: _declare_pyc() may return None
+            pyc = _declare_pyc(ctx, src, use_pycache = keep_source)
         else:
             pyc = None
 
@@ -85,10 +85,18 @@ def maybe_precompile(ctx, srcs):
         if keep_source or not pyc:
             result.keep_srcs.append(src)
 
+    if result.py_to_pyc_map:
+        batch_size = ctx.attr._precompile_batch_size_flag[BuildSettingInfo].value
+        srcs_and_pycs = result.py_to_pyc_map.items()
+        if batch_size <= 0:
+            batch_size = len(srcs_and_pycs)
+        for i in range(0, len(srcs_and_pycs), batch_size):
+            _precompile(ctx, srcs_and_pycs[i:i + batch_size])
+
     return result
 
-def _precompile(ctx, src, *, use_pycache):
-    """Compile a py file to pyc.
+def _declare_pyc(ctx, src, *, use_pycache):
+    """Declares the pyc file a py file is compiled to.
 
     Args:
         ctx: rule context.
@@ -98,7 +106,8 @@ def _precompile(ctx, src, *, use_pycache):
             file.
 
     Returns:
-        File of the generated pyc file.
+        File of the pyc file to generate, or None if the file can't be
+        precompiled.
     """
 
     # Generating a file in another package is an error, so we have to skip
@@ -106,16 +115,8 @@ def _precompile(ctx, src, *, use_pycache):
     if ctx.label.package != src.owner.package:
         return None
 
-    exec_tools_info = ctx.toolchains[EXEC_TOOLS_TOOLCHAIN_TYPE].exec_tools
     target_toolchain = ctx.toolchains[TARGET_TOOLCHAIN_TYPE].py3_runtime
 
-    precompiler = exec_tools_info.precompiler
-    if PyInterpreterProgramInfo not in precompiler and not precompiler[DefaultInfo].files_to_run:
-        fail(("Unrecognized precompiler: target '{}' does not provide " +
-              "PyInterpreterProgramInfo nor appears to be executable").format(
-            precompiler,
-        ))
-
     stem = src.basename[:-(len(src.extension) + 1)]
     if use_pycache:
         if not hasattr(target_toolchain, "pyc_tag") or not target_toolchain.pyc_tag:
@@ -134,7 +135,25 @@ def _precompile(ctx, src, *, use_pycache):
     else:
         pyc_path = "{}.pyc".format(stem)
 
-    pyc = ctx.actions.declare_file(pyc_path, sibling = src)
+    return ctx.actions.declare_file(pyc_path, sibling = src)
+
+def _precompile(ctx, srcs_and_pycs):
+    """Compile py files to pyc in a single action.
+
+    Args:
+        ctx: rule context.
+        srcs_and_pycs: list of (File, File) tuples; the py files to compile
+            and the pyc files to generate from them.
+    """
+    exec_tools_info = ctx.toolchains[EXEC_TOOLS_TOOLCHAIN_TYPE].exec_tools
+    target_toolchain = ctx.toolchains[TARGET_TOOLCHAIN_TYPE].py3_runtime
+
+    precompiler = exec_tools_info.precompiler
+    if PyInterpreterProgramInfo not in precompiler and not precompiler[DefaultInfo].files_to_run:
+        fail(("Unrecognized precompiler: target '{}' does not provide " +
+              "PyInterpreterProgramInfo nor appears to be executable").format(
+            precompiler,
+        ))
 
     invalidation_mode = ctx.attr.precompile_invalidation_mode
     if invalidation_mode == PrecompileInvalidationModeAttr.AUTO:
@@ -152,27 +171,34 @@ def _precompile(ctx, src, *, use_pycache):
     precompile_request_args.set_param_file_format("multiline")
 
     precompile_request_args.add("--invalidation_mode", invalidation_mode)
-    precompile_request_args.add("--src", src)
-
-    # NOTE: src.short_path is used because src.path contains the platform and
-    # build-specific hash portions of the path, which we don't want in the
-    # pyc data. Note, however, for remote-remote files, short_path will
-    # have the repo name, which is likely to contain extraneous info.
-    precompile_request_args.add("--src_name", src.short_path)
-    precompile_request_args.add("--pyc", pyc)
+    for src, pyc in srcs_and_pycs:
+        precompile_request_args.add("--src", src)
+
+        # NOTE: src.short_path is used because src.path contains the platform and
+        # build-specific hash portions of the path, which we don't want in the
+        # pyc data. Note, however, for remote-remote files, short_path will
+        # have the repo name, which is likely to contain extraneous info.
+        precompile_request_args.add("--src_name", src.short_path)
+        precompile_request_args.add("--pyc", pyc)
     precompile_request_args.add("--optimize", str(ctx.attr.precompile_optimize_level))
 
     version_info = target_toolchain.interpreter_version_info
     python_version = "{}.{}".format(version_info.major, version_info.minor)
     precompile_request_args.add("--python_version", python_version)
 
+    if len(srcs_and_pycs) == 1:
+        progress_message = "Python precompiling %{input} into %{output}"
+    else:
+        progress_message = "Python precompiling {} files for %{{label}}".format(
+            len(srcs_and_pycs),
+        )
+
     actions_run(
         ctx,
         executable = precompiler,
         arguments = [precompile_request_args],
-        inputs = [src],
-        outputs = [pyc],
+        inputs = [src for src, _ in srcs_and_pycs],
+        outputs = [pyc for _, pyc in srcs_and_pycs],
         mnemonic = "PyCompile",
-        progress_message = "Python precompiling %{input} into %{output}",
+        progress_message = progress_message,
     )
-    return pyc
@@ -235,6 +235,10 @@ accepting arbitrary Python versions.
             # empty target for other platforms.
             default = "//tools/launcher:launcher",
         ),
+        "_python_import_index_flag": lambda: attrb.Label(
+            default = labels.PYTHON_IMPORT_INDEX,
+            providers = [BuildSettingInfo],
+        ),
         "_python_version_flag": lambda: attrb.Label(
             default = labels.PYTHON_VERSION,
         ),
@@ -350,6 +354,7 @@ def _create_executable(
                 "1" if BootstrapImplFlag.get_value(ctx) == BootstrapImplFlag.SYSTEM_PYTHON else "0"
             ),
             extra_deps = extra_deps,
+            app_runfiles = runfiles_details.app_runfiles,
         )
 
         stage2_bootstrap = _create_stage2_bootstrap(
@@ -369,6 +374,7 @@ def _create_executable(
         ).merge(venv.lib_runfiles)
         zip_main = _create_zip_main(
             ctx,
+            main_py = main_py,
             stage2_bootstrap = stage2_bootstrap,
             runtime_details = runtime_details,
             venv = venv,
@@ -526,12 +532,16 @@ WARNING: Target: {}
         venv_interpreter_symlinks = venv.interpreter_symlinks if venv else None,
     )
 
-def _create_zip_main(ctx, *, stage2_bootstrap, runtime_details, venv):
+def _create_zip_main(ctx, *, main_py, stage2_bootstrap, runtime_details, venv):
     if venv.interpreter:
         python_binary = runfiles_root_path(ctx, venv.interpreter.short_path)
     else:
         python_binary = ""
     python_binary_actual = venv.interpreter_actual_path
+    if main_py:
+        main_py_path = runfiles_root_path(ctx, main_py.short_path)
+    else:
+        main_py_path = ""
 
     # The location of this file doesn't really matter. It's added to
     # the zip file as the top-level __main__.py file and not included
@@ -541,6 +551,7 @@ def _create_zip_main(ctx, *, stage2_bootstrap, runtime_details, venv):
         template = runtime_details.effective_runtime.zip_main_template,
         output = output,
         substitutions = {
+            "%main%": main_py_path,
             "%python_binary%": python_binary,
             "%python_binary_actual%": python_binary_actual,
             "%stage2_bootstrap%": runfiles_root_path(ctx, stage2_bootstrap.short_path),
@@ -555,7 +566,7 @@ def _create_zip_main(ctx, *, stage2_bootstrap, runtime_details, venv):
 # * https://snarky.ca/how-virtual-environments-work/
 # * https://github.com/python/cpython/blob/main/Modules/getpath.py
 # * https://github.com/python/cpython/blob/main/Lib/site.py
-def _create_venv(ctx, output_prefix, imports, runtime_details, add_runfiles_root_to_sys_path, extra_deps):
+def _create_venv(ctx, output_prefix, imports, runtime_details, add_runfiles_root_to_sys_path, extra_deps, app_runfiles):
     venv_ctx_rel_root = "_{}.venv".format(output_prefix.lstrip("_"))
     runtime = runtime_details.effective_runtime
     if runtime.interpreter:
@@ -584,6 +595,19 @@ def _create_venv(ctx, output_prefix, imports, runtime_details, add_runfiles_root
     pth = ctx.actions.declare_file("{}/bazel.pth".format(site_packages))
     ctx.actions.write(pth, "import _bazel_site_init\n")
 
+    import_all = read_possibly_native_flag(ctx, "python_import_all_repositories")
+    if ctx.attr._python_import_index_flag[BuildSettingInfo].value:
+        import_index = _create_import_index(
+            ctx,
+            output = ctx.actions.declare_file("{}/_bazel_import_index.txt".format(site_packages)),
+            imports = imports,
+            app_runfiles = app_runfiles,
+            import_all = import_all,
+            add_runfiles_root_to_sys_path = add_runfiles_root_to_sys_path == "1",
+        )
+    else:
+        import_index = None
+
     site_init = ctx.actions.declare_file("{}/_bazel_site_init.py".format(site_packages))
     computed_subs = ctx.actions.template_dict()
     computed_subs.add_joined("%imports%", imports, join_with = ":", map_each = _map_each_identity)
@@ -593,7 +617,8 @@ def _create_venv(ctx, output_prefix, imports, runtime_details, add_runfiles_root
         substitutions = {
             "%add_runfiles_root_to_sys_path%": add_runfiles_root_to_sys_path,
             "%coverage_tool%": _get_coverage_tool_runfiles_path(ctx, runtime),
-            "%import_all%": "True" if read_possibly_native_flag(ctx, "python_import_all_repositories") else "False",
+            "%import_all%": "True" if import_all else "False",
+            "%import_index%": runfiles_root_path(ctx, import_index.short_path) if import_index else "",
             "%site_init_runfiles_path%": runfiles_root_path(ctx, site_init.short_path),
             "%workspace_name%": ctx.workspace_name,
         },
@@ -617,6 +642,8 @@ def _create_venv(ctx, output_prefix, imports, runtime_details, add_runfiles_root
     files_without_interpreter = [pth, site_init] + venv_app_files.venv_files
     if venv_details.pyvenv_cfg:
         files_without_interpreter.append(venv_details.pyvenv_cfg)
+    if import_index:
+        files_without_interpreter.append(import_index)
 
     return struct(
         # File or None; the `bin/python3` executable in the venv.
@@ -653,6 +680,95 @@ def _create_venv(ctx, output_prefix, imports, runtime_details, add_runfiles_root
         lib_symlinks = venv_app_files.explicit_symlinks,
     )
 
+def _create_import_index(ctx, *, output, imports, app_runfiles, import_all, add_runfiles_root_to_sys_path):
+    """Writes the index of top-level importable names for each sys.path root.
+
+    Each line is a tab-separated runfiles-root relative sys.path entry and a
+    top-level name importable from it, or `*` if the names importable from the
+    entry can't be known at analysis time, e.g. because a tree artifact is in
+    it. The site init code uses it to skip sys.path entries that can't contain
+    a top-level module when searching for it.
+
+    Args:
+        ctx: current target ctx
+        output: File; the index file to write.
+        imports: depset[str]; runfiles-root relative import paths.
+        app_runfiles: runfiles; the runfiles of the binary's dependencies.
+        import_all: bool; True if all repo directories are on sys.path.
+        add_runfiles_root_to_sys_path: bool; True if the runfiles root is on
+            sys.path.
+
+    Returns:
+        The `output` File.
+    """
+    roots = {imp: None for imp in imports.to_list()}
+    if not import_all:
+        roots[ctx.workspace_name] = None
+    if add_runfiles_root_to_sys_path:
+        roots[""] = None
+    workspace_name = ctx.workspace_name
+
+    def _index_lines(runfiles_path, is_directory):
+        parts = runfiles_path.split("/")
+        lines = []
+        for i in range(len(parts)):
+            root = "/".join(parts[:i])
+            if root in roots or (import_all and i == 1):
+                name = parts[i]
+                if i == len(parts) - 1 and not is_directory:
+                    name = name.partition(".")[0]
+                lines.append(root + "\t" + name)
+        if is_directory:
+            # The content of a directory isn't known, so the roots within it
+            # can't be indexed.
+            for root in roots:
+                if root == runfiles_path or root.startswith(runfiles_path + "/"):
+                    lines.append(root + "\t*")
+            if import_all and len(parts) == 1:
+                lines.append(runfiles_path + "\t*")
+        return lines
+
+    def _map_file_to_index_lines(file):
+        short_path = file.short_path
+        if short_path.startswith("../"):
+            runfiles_path = short_path[3:]
+        else:
+            runfiles_path = workspace_name + "/" + short_path
+        return _index_lines(runfiles_path, file.is_directory)
+
+    def _map_symlink_to_index_lines(entry):
+        return _index_lines(
+            workspace_name + "/" + entry.path,
+            entry.target_file.is_directory,
+        )
+
+    def _map_root_symlink_to_index_lines(entry):
+        return _index_lines(entry.path, entry.target_file.is_directory)
+
+    args = ctx.actions.args()
+    args.set_param_file_format("multiline")
+    args.add_all(
+        app_runfiles.files,
+        map_each = _map_file_to_index_lines,
+        allow_closure = True,
+        expand_directories = False,
+        uniquify = True,
+    )
+    args.add_all(
+        app_runfiles.symlinks,
+        map_each = _map_symlink_to_index_lines,
+        allow_closure = True,
+        uniquify = True,
+    )
+    args.add_all(
+        app_runfiles.root_symlinks,
+        map_each = _map_root_symlink_to_index_lines,
+        allow_closure = True,
+        uniquify = True,
+    )
+    ctx.actions.write(output, args)
+    return output
+
 def _create_venv_unixy(ctx, *, venv_ctx_rel_root, runtime, interpreter_actual_path):
     interpreter_runfiles = builders.RunfilesBuilder()
     is_bootstrap_script = BootstrapImplFlag.get_value(ctx) == BootstrapImplFlag.SCRIPT
@@ -100,6 +100,17 @@ Stamped targets are not rebuilt unless their dependencies change.
         default = -1,
         values = [1, 0, -1],
     ),
+    "stored_extensions": attr.string_list(
+        doc = """\
+File extensions of already compressed files to store in the wheel without
+compressing them again, e.g. `[".gz", ".zip", ".npz"]`. Matching is case
+insensitive. This only affects the archive size and build time; the RECORD
+file is the same.
+
+:::{versionadded} VERSION_NEXT_FEATURE
+:::
+""",
+    ),
     "version": attr.string(
         mandatory = True,
         doc = """\
@@ -535,6 +546,7 @@ def _py_wheel_impl(ctx):
 
     if not ctx.attr.compress:
         args.add("--no_compress")
+    args.add_all(ctx.attr.stored_extensions, before_each = "--stored_extension")
 
     for target, filename in ctx.attr.extra_distinfo_files.items():
         target_files = target[DefaultInfo].files.to_list()
@@ -20,13 +20,17 @@ load("//python/private:normalize_name.bzl", "normalize_name")
 load(":hash.bzl", "hash")
 load(":version_from_filename.bzl", "version_from_filename")
 
-def parse_simpleapi_html(*, content, parse_index = False):
+def parse_simpleapi_html(*, content, parse_index = False, versions = None):
     """Get the package URLs for given digests by parsing the Simple API HTML.
 
     Args:
         content: {type}`str` The Simple API HTML content.
         parse_index: {type}`bool` whether to parse the content as the index page of the PyPI index,
             e.g. the `https://pypi.org/simple/`. This only has the URLs for the individual package.
+        versions: {type}`list[str] | None` the versions to return the artifacts for. The
+            artifacts of the other versions are skipped before their attributes are parsed, so
+            the cost scales with the requested versions rather than the package history. All
+            versions are returned if `None` or empty.
 
     Returns:
         If it is the index page, return the map of package to URL it can be queried from.
@@ -68,6 +72,11 @@ def parse_simpleapi_html(*, content, parse_index = False):
         # https://packaging.python.org/en/latest/specifications/simple-repository-api/#versioning-pypi-s-simple-api
         fail("Unsupported API version: {}".format(api_version))
 
+    if parse_index or not versions:
+        versions = None
+    else:
+        versions = {v: None for v in versions}
+
     packages = {}
 
     # 2. Iterate using find() to avoid huge list allocations from .split("<a ")
@@ -95,6 +104,12 @@ def parse_simpleapi_html(*, content, parse_index = False):
         # Update cursor for next iteration
         cursor = end_tag + 4
 
+        version = None
+        if not parse_index:
+            version = version_from_filename(filename)
+            if versions != None and version not in versions:
+                continue
+
         attrs = _parse_attrs(attr_part)
         href = attrs.get("href", "")
         if not href:
@@ -120,7 +135,6 @@ def parse_simpleapi_html(*, content, parse_index = False):
         if "data-yanked" in attrs:
             yanked = _unescape_pypi_html(attrs["data-yanked"])
 
-        version = version_from_filename(filename)
         hashes_by_version.setdefault(version, []).append(digest)
 
         # 4. Optimized Metadata Check (PEP 714)
@@ -0,0 +1,125 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Parse the PEP 691 SimpleAPI JSON in Starlark.
+"""
+
+load("//python/private:normalize_name.bzl", "normalize_name")
+load(":hash.bzl", "hash")
+load(":version_from_filename.bzl", "version_from_filename")
+
+# The media type of the PEP 691 JSON responses.
+SIMPLEAPI_JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+
+def is_simpleapi_json(content):
+    """Whether the Simple API response is JSON rather than HTML.
+
+    Bazel's downloader does not expose the `Content-Type` of the response, so
+    we look at the content instead. HTML pages never start with `{`.
+
+    Args:
+        content: {type}`str` The Simple API response.
+
+    Returns:
+        {type}`bool` True if the content should be parsed with {obj}`parse_simpleapi_json`.
+    """
+    return content.lstrip().startswith("{")
+
+def parse_simpleapi_json(*, content, parse_index = False, versions = None):
+    """Get the package URLs for given digests by parsing the PEP 691 Simple API JSON.
+
+    Args:
+        content: {type}`str` The Simple API JSON content.
+        parse_index: {type}`bool` whether to parse the content as the index page of the PyPI index,
+            e.g. the `https://pypi.org/simple/`. This only has the names of the individual packages.
+        versions: {type}`list[str] | None` the versions to return the artifacts for, see
+            {obj}`parse_simpleapi_html`.
+
+    Returns:
+        The same values as {obj}`parse_simpleapi_html`.
+    """
+    data = json.decode(content)
+
+    api_version = data.get("meta", {}).get("api-version", "1.0")
+    if int(api_version.partition(".")[0]) >= 2:
+        # We don't expect to have version 2.0 here, but have this check in place just in case.
+        # https://packaging.python.org/en/latest/specifications/simple-repository-api/#versioning-pypi-s-simple-api
+        fail("Unsupported API version: {}".format(api_version))
+
+    if parse_index:
+        # The JSON index does not have URLs, the project pages are at the normalized names.
+        packages = {}
+        for project in data.get("projects", []):
+            pkg = normalize_name(project["name"])
+            packages[pkg] = "{}/".format(pkg.replace("_", "-"))
+        return packages
+
+    versions = {v: None for v in versions} if versions else None
+    sdists = {}
+    whls = {}
+    hashes_by_version = {}
+
+    for file in data.get("files", []):
+        filename = file["filename"]
+        version = version_from_filename(filename)
+        if versions != None and version not in versions:
+            continue
+
+        dist_url = file["url"]
+
+        # PEP 691 allows several hashes per file, pick the one the rest of the code prefers.
+        digest = hash.preferred_digest([
+            hash.digest(algo, hex_digest)
+            for algo, hex_digest in file.get("hashes", {}).items()
+        ])
+
+        # The value is either a bool or the yank reason.
+        yanked = file.get("yanked", False)
+        if yanked == False:
+            yanked = None
+        elif yanked == True:
+            yanked = ""
+
+        hashes_by_version.setdefault(version, []).append(digest)
+
+        # PEP 714 renamed `dist-info-metadata` to `core-metadata`, the value is either a bool
+        # or a dict of hashes.
+        metadata = file.get("core-metadata", file.get("dist-info-metadata", False))
+        metadata_sha256 = ""
+        metadata_url = ""
+        if metadata:
+            metadata_url = dist_url + ".metadata"
+            if type(metadata) == "dict":
+                metadata_sha256 = metadata.get("sha256", "")
+
+        dist = struct(
+            filename = filename,
+            version = version,
+            url = dist_url,
+            digest = digest,
+            metadata_sha256 = metadata_sha256,
+            metadata_url = metadata_url,
+            yanked = yanked,
+        )
+
+        if filename.endswith(".whl"):
+            whls[digest] = dist
+        else:
+            sdists[digest] = dist
+
+    return struct(
+        sdists = sdists,
+        whls = whls,
+        hashes_by_version = hashes_by_version,
+    )
@@ -13,6 +13,7 @@ load(":whl_archive.bzl", "whl_archive_attrs")
 
 _CPPFLAGS = "CPPFLAGS"
 _COMMAND_LINE_TOOLS_PATH_SLUG = "commandlinetools"
+_WHEEL_CACHE_DIR_ENV_VAR = "RULES_PYTHON_WHEEL_CACHE_DIR"
 
 def _get_xcode_location_cflags(rctx, logger = None):
     """Query the xcode sdk location to update cflags
@@ -144,6 +145,10 @@ def _parse_optional_attrs(rctx, args, extra_pip_args = None):
 
     if rctx.attr.download_only:
         args.append("--download_only")
+    else:
+        wheel_cache_dir = rctx.getenv(_WHEEL_CACHE_DIR_ENV_VAR, "")
+        if wheel_cache_dir:
+            args += ["--wheel_cache_dir", wheel_cache_dir]
 
     if rctx.attr.pip_data_exclude != None:
         args += [
@@ -380,6 +385,7 @@ pip_archive = repository_rule(
             default = [
                 Label("//python/private/pypi/whl_installer:wheel_installer.py"),
                 Label("//python/private/pypi/whl_installer:arguments.py"),
+                Label("//python/private/pypi/whl_installer:wheel_cache.py"),
             ] + record_files.values(),
         ),
         "_rule_name": attr.string(default = "pip_archive"),
@@ -401,6 +407,7 @@ previously named {obj}`whl_library` repository became renamed to `pip_archive`.
     implementation = _pip_archive_impl,
     environ = [
         "RULES_PYTHON_PIP_ISOLATED",
+        _WHEEL_CACHE_DIR_ENV_VAR,
         REPO_DEBUG_ENV_VAR,
     ],
 )
@@ -3,11 +3,14 @@
 This is design to work as the following:
 - in-memory cache for results of PyPI index queries, so that we are not calling PyPI multiple times
   for the same package for different hub repos.
+- optional on-disk cache for the parsed results, so that we are not downloading and parsing the
+  same index pages after a Bazel server restart or in a different workspace.
 
 In the future the same will be used to:
 - Store PyPI index query results as facts in the MODULE.bazel.lock file
 """
 
+load("//python/private:repo_utils.bzl", "repo_utils")
 load(":version_from_filename.bzl", "version_from_filename")
 
 # This value should be changed whenever the storage format changes.
@@ -18,7 +21,21 @@ load(":version_from_filename.bzl", "version_from_filename")
 #     `<algo>:<digest>` strings instead of bare sha256 hex digests.
 _FACT_VERSION = "v2"
 
-def pypi_cache(mctx = None, store = None):
+# This value should be changed whenever the format of the on-disk cache entries changes.
+#
+# v2: the package page entries record the versions the page was parsed for.
+_DISK_CACHE_VERSION = "v2"
+_DISK_CACHE_DIR_ENV_VAR = "RULES_PYTHON_PYPI_INDEX_CACHE_DIR"
+_DISK_CACHE_TTL_ENV_VAR = "RULES_PYTHON_PYPI_INDEX_CACHE_TTL"
+_DISK_CACHE_DEFAULT_TTL = 24 * 60 * 60
+
+# Written after the JSON payload so that partially written entries are detected.
+_DISK_CACHE_END_MARKER = "\n# end\n"
+
+# Recorded in the parsed versions of a package page that was parsed for all versions.
+_ALL_VERSIONS = "*"
+
+def pypi_cache(mctx = None, store = None, disk = None):
     """The cache for PyPI index queries.
 
     Currently the key is of the following structure:
@@ -27,17 +44,21 @@ def pypi_cache(mctx = None, store = None):
     Args:
         mctx: The module context
         store: The in-memory store, should implement dict interface for get and setdefault
+        disk: The on-disk cache, defaults to the {obj}`disk_cache` for the `mctx`.
 
     Returns:
         A cache struct
     """
     mcache = memory_cache(store)
     fcache = facts_cache(getattr(mctx, "facts", None))
+    if disk == None and mctx:
+        disk = disk_cache(mctx)
 
     # buildifier: disable=uninitialized
     self = struct(
         _mcache = mcache,
         _facts = fcache,
+        _disk = disk,
         setdefault = lambda key, parsed_result: _pypi_cache_setdefault(self, key, parsed_result),
         get = lambda key: _pypi_cache_get(self, key),
         get_facts = lambda: _pypi_cache_get_facts(self),
@@ -62,7 +83,9 @@ def _pypi_cache_setdefault(self, key, parsed_result):
         The `parse_result`.
     """
     index_url, real_url, versions = key
-    self._mcache.setdefault(real_url, parsed_result)
+    merged = self._mcache.setdefault(real_url, parsed_result, versions)
+    if self._disk:
+        self._disk.setdefault(real_url, merged)
     if not versions or not self._facts:
         return parsed_result
 
@@ -78,21 +101,45 @@ def _pypi_cache_get(self, key):
         key: {type}`str` The cache key, can be any string.
 
     Returns:
-        The {type}`struct` or `None` based on if the result is in the cache or not.
+        The {type}`struct` or `None` based on if the result is in the cache or not. For the
+        index pages read from the on-disk cache, the `dict` may be empty if none of the requested
+        packages are on the index.
     """
     index_url, real_url, versions = key
 
     # When retrieving from memory cache, filter down to only what is needed. If the
     # cache is empty, we will attempt to read from facts, however, reading from memory
     # first allows us to not parse the contents of the lock file that may add up.
-    cached = _filter_packages(self._mcache.get(real_url), versions)
-    if not self._facts:
-        return cached
-
-    if not cached and versions:
+    cached = self._mcache.get(real_url)
+    if type(cached) == "dict":
+        cached = _filter_packages(cached, versions)
+    elif cached:
+        # The package pages are only parsed for the requested versions, so a missing version
+        # may just not have been requested before.
+        cached = _filter_parsed_versions(cached, versions)
+
+    if not cached and versions and self._facts:
         # Could not get from in-memory, read from lockfile facts
         cached = self._facts.get(index_url, versions)
-    else:
+        if cached:
+            return cached
+
+    if not cached and self._disk:
+        # The on-disk entry may predate the release of a requested version, in which case we
+        # need to query the index again.
+        from_disk = self._disk.get(real_url)
+        if type(from_disk) == "dict":
+            # The index page lists every package on the index, so a fresh entry also tells us
+            # that the requested packages missing from it are not on this index.
+            from_disk = self._mcache.setdefault(real_url, from_disk)
+            cached = _filter_index(from_disk, versions)
+        elif from_disk:
+            # Keep the versions from disk even if incomplete, so that they get merged with the
+            # ones downloaded next and written back.
+            from_disk = self._mcache.setdefault(real_url, from_disk, from_disk.versions)
+            cached = _filter_parsed_versions(from_disk, versions)
+
+    if self._facts:
         # We might be using something from memory that is not yet stored in facts (e.g. we processed
         # the requirements.txt for one Python version and the deps got cached, but new python
         # version means different deps, which may add extras.
@@ -112,8 +159,14 @@ def memory_cache(cache = None):
     We are using the `real_url` as the key in the cache functions on purpose in order to get the
     best possible cache hits.
 
+    The package pages are parsed only for the requested versions, so the results of parsing
+    the same page for different versions are merged. The merged result also records the
+    `versions` the page was parsed for, so that the versions that are not on the page are
+    not queried again.
+
     Args:
-        cache: the storage to store things in memory.
+        cache: the storage to store things in memory, should implement dict interface for
+            `get` and `setdefault`.
 
     Returns:
         struct with 2 methods, `get` and `setdefault`.
@@ -123,9 +176,175 @@ def memory_cache(cache = None):
 
     return struct(
         get = lambda real_url: cache.get(real_url),
-        setdefault = lambda real_url, value: cache.setdefault(real_url, value),
+        setdefault = lambda real_url, value, versions = None: _memory_cache_setdefault(cache, real_url, value, versions),
     )
 
+def _memory_cache_setdefault(cache, real_url, value, versions):
+    if type(value) == "dict":
+        return cache.setdefault(real_url, value)
+
+    merged = cache.setdefault(real_url, struct(
+        sdists = {},
+        whls = {},
+        hashes_by_version = {},
+        versions = {},
+    ))
+    if type(merged) == "dict":
+        return merged
+
+    for digest, d in value.sdists.items():
+        merged.sdists.setdefault(digest, d)
+    for digest, d in value.whls.items():
+        merged.whls.setdefault(digest, d)
+    for version, digests in value.hashes_by_version.items():
+        merged.hashes_by_version.setdefault(version, digests)
+    for version in versions or [_ALL_VERSIONS]:
+        merged.versions.setdefault(version, None)
+    return merged
+
+def disk_cache(mctx, *, now = None):
+    """SimpleAPI cache that persists the parsed results on disk.
+
+    The cache is enabled by setting the {envvar}`RULES_PYTHON_PYPI_INDEX_CACHE_DIR` environment
+    variable and is keyed by the `real_url` with any credentials removed. Bazel's downloader does
+    not expose the response headers, so the entries cannot be revalidated using `ETag` or
+    `Last-Modified`, instead they expire after {envvar}`RULES_PYTHON_PYPI_INDEX_CACHE_TTL` seconds.
+
+    Args:
+        mctx: The module context.
+        now: {type}`int | None` the current time in seconds since the epoch. Used in tests.
+
+    Returns:
+        struct with 2 methods, `get` and `setdefault`, or `None` if the cache is not enabled.
+    """
+    directory = mctx.getenv(_DISK_CACHE_DIR_ENV_VAR, "")
+    if not directory:
+        return None
+
+    ttl = int(mctx.getenv(_DISK_CACHE_TTL_ENV_VAR, "") or _DISK_CACHE_DEFAULT_TTL)
+    if now == None:
+        now = _now(mctx)
+
+    directory = "{}/{}".format(directory.rstrip("/\\"), _DISK_CACHE_VERSION)
+    return struct(
+        get = lambda real_url: _disk_cache_get(mctx, directory, ttl, now, real_url),
+        setdefault = lambda real_url, value: _disk_cache_set(mctx, directory, now, real_url, value),
+    )
+
+def _now(mctx):
+    if repo_utils.get_platforms_os_name(mctx) == "windows":
+        arguments = [
+            "powershell.exe",
+            "-NoProfile",
+            "-Command",
+            "[DateTimeOffset]::UtcNow.ToUnixTimeSeconds()",
+        ]
+    else:
+        arguments = ["date", "+%s"]
+
+    result = mctx.execute(arguments)
+    stdout = result.stdout.strip()
+    if result.return_code != 0 or not stdout.isdigit():
+        # Without knowing the time we cannot tell if the entries are stale.
+        return None
+
+    return int(stdout)
+
+def _strip_userinfo(url):
+    scheme, sep, rest = url.partition("://")
+    host, slash, path = rest.partition("/")
+    _, _, host = host.rpartition("@")
+    return scheme + sep + host + slash + path
+
+def _disk_cache_path(directory, url):
+    # Starlark has no cryptographic hash functions, so the URL is stored in the entry and
+    # compared on read to detect collisions.
+    name = "{}_{}.json".format(len(url), str(hash(url)).replace("-", "n"))
+    return "{}/{}".format(directory, name)
+
+def _disk_cache_get(mctx, directory, ttl, now, real_url):
+    if now == None:
+        return None
+
+    url = _strip_userinfo(real_url)
+    path = mctx.path(_disk_cache_path(directory, url))
+    if not path.exists:
+        return None
+
+    # Do not watch the file, other evaluations updating the cache should not cause this
+    # extension to be re-evaluated.
+    content = mctx.read(path, watch = "no")
+    if not content.endswith(_DISK_CACHE_END_MARKER):
+        return None
+
+    # Concurrent writers may interleave their writes, treat anything that does not decode as
+    # a miss rather than failing the evaluation.
+    entry = json.decode(content[:-len(_DISK_CACHE_END_MARKER)], default = None)
+    if type(entry) != "dict" or entry.get("url") != url:
+        return None
+
+    age = now - entry["fetched_at"]
+    if age < 0 or age > ttl:
+        return None
+
+    result = entry["result"]
+    if entry["is_index"]:
+        return result
+
+    return struct(
+        sdists = {digest: struct(**d) for digest, d in result["sdists"].items()},
+        whls = {digest: struct(**d) for digest, d in result["whls"].items()},
+        hashes_by_version = result["hashes_by_version"],
+        versions = result["versions"],
+    )
+
+def _disk_cache_set(mctx, directory, now, real_url, value):
+    if now == None or not value:
+        return
+
+    url = _strip_userinfo(real_url)
+    entry = {
+        "fetched_at": now,
+        "is_index": type(value) == "dict",
+        "result": value,
+        "url": url,
+    }
+    mctx.file(
+        _disk_cache_path(directory, url),
+        json.encode(entry) + _DISK_CACHE_END_MARKER,
+        executable = False,
+    )
+
+def _filter_parsed_versions(dists, requested_versions):
+    """Filters a package page to the requested versions it was parsed for.
+
+    Returns:
+        The filtered dists, which are empty if none of the requested versions are on the page,
+        or `None` if the page was not parsed for some of the requested versions.
+    """
+    if _ALL_VERSIONS not in dists.versions:
+        if not requested_versions:
+            return None
+        for version in requested_versions:
+            if version not in dists.versions and version not in dists.hashes_by_version:
+                return None
+
+    return _filter_packages(dists, requested_versions) or struct(
+        sdists = {},
+        whls = {},
+        hashes_by_version = {},
+    )
+
+def _filter_index(index, requested_packages):
+    if not requested_packages:
+        return index
+
+    return {
+        pkg: url
+        for pkg, url in index.items()
+        if pkg in requested_packages
+    }
+
 def _filter_packages(dists, requested_versions):
     if dists == None or not requested_versions:
         return dists
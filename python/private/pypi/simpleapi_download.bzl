@@ -20,8 +20,17 @@ load("//python/private:auth.bzl", _get_auth = "get_auth")
 load("//python/private:envsubst.bzl", "envsubst")
 load("//python/private:normalize_name.bzl", "normalize_name")
 load(":parse_simpleapi_html.bzl", "parse_simpleapi_html")
+load(":parse_simpleapi_json.bzl", "SIMPLEAPI_JSON_CONTENT_TYPE", "is_simpleapi_json", "parse_simpleapi_json")
 load(":urllib.bzl", "urllib")
 
+# Prefer the PEP 691 JSON, which is much cheaper to parse in Starlark, and fall back to HTML for
+# the indexes that do not support it.
+_ACCEPT = ", ".join([
+    SIMPLEAPI_JSON_CONTENT_TYPE,
+    "application/vnd.pypi.simple.v1+html;q=0.2",
+    "text/html;q=0.01",
+])
+
 def simpleapi_download(
         ctx,
         *,
@@ -31,7 +40,7 @@ def simpleapi_download(
         read_simpleapi = None,
         get_auth = None,
         _fail = fail):
-    """Download Simple API HTML.
+    """Download Simple API HTML or JSON.
 
     First it queries all of the indexes for available packages and then it downloads the contents of
     the per-package URLs and hash digest values. This is to enable us to use bazel_downloader with
@@ -224,7 +233,7 @@ def _read_simpleapi(ctx, url, attr, cache, versions, parse_index, get_auth = Non
 
     cache_key = (url, real_url, versions)
     cached_result = cache.get(cache_key)
-    if cached_result:
+    if cached_result != None:
         return struct(success = True, output = cached_result)
 
     output_str = envsubst(
@@ -249,6 +258,7 @@ def _read_simpleapi(ctx, url, attr, cache, versions, parse_index, get_auth = Non
         url = [real_url],
         output = output,
         auth = get_auth(ctx, [real_url], ctx_attr = attr),
+        headers = {"Accept": _ACCEPT},
         **download_kwargs
     )
 
@@ -262,6 +272,7 @@ def _read_simpleapi(ctx, url, attr, cache, versions, parse_index, get_auth = Non
                 cache = cache,
                 cache_key = cache_key,
                 parse_index = parse_index,
+                versions = versions,
             ),
         )
 
@@ -272,15 +283,21 @@ def _read_simpleapi(ctx, url, attr, cache, versions, parse_index, get_auth = Non
         cache = cache,
         cache_key = cache_key,
         parse_index = parse_index,
+        versions = versions,
     )
 
-def _read_index_result(ctx, *, result, output, cache, cache_key, parse_index):
+def _read_index_result(ctx, *, result, output, cache, cache_key, parse_index, versions):
     if not result.success:
         return struct(success = False)
 
     content = ctx.read(output)
 
-    output = parse_simpleapi_html(content = content, parse_index = parse_index)
+    # Only the requested versions are parsed, the cache merges the results for the different
+    # version sets of the same page.
+    if is_simpleapi_json(content):
+        output = parse_simpleapi_json(content = content, parse_index = parse_index, versions = versions)
+    else:
+        output = parse_simpleapi_html(content = content, parse_index = parse_index, versions = versions)
     if output:
         cache.setdefault(cache_key, output)
         return struct(success = True, output = output)
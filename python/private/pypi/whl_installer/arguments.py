@@ -17,17 +17,7 @@ import json
 from typing import Any
 
 
-def parser(**kwargs: Any) -> argparse.ArgumentParser:
-    """Create a parser for the wheel_installer tool."""
-    parser = argparse.ArgumentParser(
-        **kwargs,
-    )
-    parser.add_argument(
-        "--requirement",
-        action="store",
-        required=True,
-        help="A single PEP508 requirement specifier string.",
-    )
+def _add_build_args(parser: argparse.ArgumentParser) -> None:
     parser.add_argument(
         "--isolated",
         action="store_true",
@@ -39,14 +29,34 @@ def parser(**kwargs: Any) -> argparse.ArgumentParser:
         help="Extra arguments to pass down to pip.",
     )
     parser.add_argument(
-        "--pip_data_exclude",
+        "--environment",
         action="store",
-        help="Additional data exclusion parameters to add to the pip packages BUILD file.",
+        help="Extra environment variables to set on the pip environment.",
     )
     parser.add_argument(
-        "--environment",
+        "--wheel_cache_dir",
         action="store",
-        help="Extra environment variables to set on the pip environment.",
+        help="A directory in which to cache wheels built from sdists, keyed on the sdist hash "
+        "and the build configuration.",
+    )
+
+
+def parser(**kwargs: Any) -> argparse.ArgumentParser:
+    """Create a parser for the wheel_installer tool."""
+    parser = argparse.ArgumentParser(
+        **kwargs,
+    )
+    parser.add_argument(
+        "--requirement",
+        action="store",
+        required=True,
+        help="A single PEP508 requirement specifier string.",
+    )
+    _add_build_args(parser)
+    parser.add_argument(
+        "--pip_data_exclude",
+        action="store",
+        help="Additional data exclusion parameters to add to the pip packages BUILD file.",
     )
     parser.add_argument(
         "--download_only",
@@ -57,6 +67,22 @@ def parser(**kwargs: Any) -> argparse.ArgumentParser:
     return parser
 
 
+def batch_parser(**kwargs: Any) -> argparse.ArgumentParser:
+    """Create a parser for the batch_installer tool."""
+    parser = argparse.ArgumentParser(
+        **kwargs,
+    )
+    parser.add_argument(
+        "--requests",
+        action="store",
+        required=True,
+        help="A JSON file with a list of objects, each with a `requirement` to build and an "
+        "optional `directory` to put the wheel in.",
+    )
+    _add_build_args(parser)
+    return parser
+
+
 def deserialize_structured_args(args: dict[str, Any]) -> dict[str, Any]:
     """Deserialize structured arguments passed from the starlark rules.
 
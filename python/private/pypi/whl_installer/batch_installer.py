@@ -0,0 +1,272 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Build wheels for many sdists with a single pip invocation.
+
+Every `pip_archive` repository pays for an interpreter start, the pip import
+and, with build isolation, the setup of a build environment, even when many
+sdists share the same build requirements. This tool builds a list of
+requirements in one `pip wheel` process, which shares those costs and pip's
+cache of build requirements across all of them.
+
+Each wheel is handed back to its per-package repository through the wheel
+cache (see `wheel_cache.py`), under the same key that `pip_archive` computes
+for it, and, if the request has a `directory`, copied there along with a
+`whl_file.json` like the one written by `wheel_installer`. For the keys to
+match, the wheels are built with the `CPPFLAGS` that `pip_archive` sets.
+
+pip can't be told which wheel belongs to which requirement, so the requests are
+split into as few runs as possible in which every project is requested once.
+Requirements pinned with `--hash` are never mixed with unpinned ones, since one
+pinned requirement puts pip into hash-checking mode for the whole run.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+from python.private.pypi.whl_installer import arguments, wheel_cache
+from python.private.pypi.whl_installer.wheel_installer import (
+    configure_reproducible_wheels,
+    write_whl_file_json,
+)
+
+_NAME_RE = re.compile(r"\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)")
+
+_CPPFLAGS = "CPPFLAGS"
+_COMMAND_LINE_TOOLS_PATH_SLUG = "commandlinetools"
+
+# Written to the root of the interpreter repositories created by rules_python.
+_STANDALONE_INTERPRETER_FILENAME = "STANDALONE_INTERPRETER"
+
+
+def _resolve(path: str) -> Path:
+    # Under `bazel run`, relative paths are relative to where bazel was run.
+    return Path(os.environ.get("BUILD_WORKING_DIRECTORY", ""), path)
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _requirement_name(requirement: str) -> str:
+    match = _NAME_RE.match(requirement)
+    if not match:
+        raise ValueError(f"Could not find the project name in {requirement!r}")
+    return _normalize(match.group(1))
+
+
+def _xcode_location_cflags() -> list[str]:
+    """Return the flags `_get_xcode_location_cflags` of `pip_archive` returns."""
+    if sys.platform != "darwin":
+        return []
+    xcode_select = shutil.which("xcode-select")
+    if not xcode_select:
+        return []
+    result = subprocess.run(
+        [xcode_select, "--print-path"], capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return []
+
+    xcode_root = result.stdout.strip()
+    if _COMMAND_LINE_TOOLS_PATH_SLUG not in xcode_root.lower():
+        # A full Xcode installation keeps the macOS SDKs elsewhere.
+        sdks = json.loads(
+            subprocess.run(
+                ["xcrun", "xcodebuild", "-showsdks", "-json"],
+                check=True,
+                capture_output=True,
+                text=True,
+                env=dict(os.environ, DEVELOPER_DIR=xcode_root),
+            ).stdout
+        )
+        sdk_path = [
+            sdk["sdkPath"]
+            for sdk in sdks
+            if sdk.get("productName") == "macOS"
+            and "darwinos" not in sdk["canonicalName"]
+        ][0]
+    else:
+        sdk_path = f"{xcode_root}/SDKs/MacOSX.sdk"
+    return [f"-isysroot {sdk_path}"]
+
+
+def _toolchain_unix_cflags() -> list[str]:
+    """Return the flags `_get_toolchain_unix_cflags` of `pip_archive` returns.
+
+    `pip_archive` uses the include directory next to the interpreter it was
+    given, which is the same directory or a symlink to it, so the cache key is
+    the same.
+    """
+    if not sys.platform.startswith(("darwin", "linux")):
+        return []
+    prefix = os.path.realpath(sys.prefix)
+    if not os.path.exists(os.path.join(prefix, _STANDALONE_INTERPRETER_FILENAME)):
+        return []
+    version = f"{sys.version_info[0]}.{sys.version_info[1]}"
+    return [f"-isystem {prefix}/include/python{version}"]
+
+
+class _Request:
+    def __init__(self, request: dict[str, Any]) -> None:
+        self.requirement: str = request["requirement"]
+        self.name = _requirement_name(self.requirement)
+        directory = request.get("directory")
+        self.directory: Optional[Path] = _resolve(directory) if directory else None
+        self.key: Optional[str] = None
+        self.hashed = "--hash" in self.requirement
+        self.local_sdist = bool(self.directory) and bool(
+            wheel_cache.local_sdists(self.directory)
+        )
+
+    def deliver(self, whl: Path, cache: Optional[wheel_cache.WheelCache]) -> None:
+        if cache and self.key:
+            try:
+                cache.put(self.key, whl)
+            except OSError as e:
+                print(f"WARNING: could not cache {whl.name}: {e}", file=sys.stderr)
+        if self.directory:
+            shutil.copyfile(whl, self.directory / whl.name)
+            write_whl_file_json(self.directory)
+
+
+def _runs(requests: list[_Request]) -> list[list[_Request]]:
+    """Split `requests` into the pip runs that build them.
+
+    In each run all requests agree on whether they are pinned by a hash and no
+    project is requested twice, so the wheels a run builds map back to its
+    requests by project name.
+    """
+    runs: list[list[_Request]] = []
+    for request in requests:
+        for run in runs:
+            if run[0].hashed == request.hashed and all(
+                other.name != request.name for other in run
+            ):
+                run.append(request)
+                break
+        else:
+            runs.append([request])
+    return runs
+
+
+def _build(
+    run: list[_Request],
+    *,
+    tmp: Path,
+    isolated: bool,
+    extra_pip_args: list[str],
+    env: dict[str, str],
+) -> dict[str, Path]:
+    """Build the wheels for one run and return them by project name."""
+    tmp.mkdir()
+    requirement_file = tmp / "requirements.txt"
+    requirement_file.write_text("".join(f"{request.requirement}\n" for request in run))
+    find_links = []
+    for request in run:
+        if request.local_sdist:
+            find_links.extend(["--find-links", str(request.directory.resolve())])
+    wheel_dir = tmp / "wheels"
+    pip_args = (
+        [sys.executable, "-m", "pip"]
+        + (["--isolated"] if isolated else [])
+        + ["wheel", "--no-deps", "--wheel-dir", str(wheel_dir)]
+        + extra_pip_args
+        + find_links
+        + ["-r", str(requirement_file)]
+    )
+    # Assumes any errors are logged by pip so do nothing. This command will fail if pip fails
+    subprocess.run(pip_args, check=True, env=env)
+    return {_normalize(whl.name.split("-")[0]): whl for whl in wheel_dir.glob("*.whl")}
+
+
+def main() -> None:
+    args = arguments.batch_parser(description=__doc__).parse_args()
+    deserialized_args = dict(vars(args))
+    arguments.deserialize_structured_args(deserialized_args)
+    extra_pip_args = deserialized_args["extra_pip_args"]
+
+    configure_reproducible_wheels()
+
+    env = os.environ.copy()
+    # Like `pip_archive`, which sets them for `wheel_installer`, which in turn
+    # lets the `environment` attribute override them.
+    env[_CPPFLAGS] = " ".join(_xcode_location_cflags() + _toolchain_unix_cflags())
+    env.update(deserialized_args["environment"])
+    # Let the pip subprocess import the same pip this tool was run with, e.g.
+    # from the runfiles under `bazel run`.
+    env["PYTHONPATH"] = os.pathsep.join(p for p in sys.path if p)
+
+    with open(_resolve(args.requests)) as f:
+        requests = [_Request(request) for request in json.load(f)]
+
+    cache = (
+        wheel_cache.WheelCache(_resolve(args.wheel_cache_dir))
+        if args.wheel_cache_dir
+        else None
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_name:
+        tmp = Path(tmp_name)
+        empty_dir = tmp / "empty"
+        empty_dir.mkdir()
+
+        pending = []
+        for request in requests:
+            if cache:
+                # Compute the key the way `pip_archive` does, which runs the
+                # `wheel_installer` in the directory of the downloaded sdist
+                # with `--find-links .` appended to the extra pip args.
+                request.key = wheel_cache.cache_key(
+                    requirement=request.requirement,
+                    directory=request.directory if request.local_sdist else empty_dir,
+                    isolated=args.isolated,
+                    extra_pip_args=extra_pip_args
+                    + (["--find-links", "."] if request.local_sdist else []),
+                    environment=deserialized_args["environment"],
+                    env=env,
+                )
+                if request.key:
+                    cached = cache.get(request.key, tmp)
+                    if cached:
+                        request.deliver(cached, None)
+                        continue
+            pending.append(request)
+
+        for i, run in enumerate(_runs(pending)):
+            wheels = _build(
+                run,
+                tmp=tmp / f"run{i}",
+                isolated=args.isolated,
+                extra_pip_args=extra_pip_args,
+                env=env,
+            )
+            for request in run:
+                whl = wheels.get(request.name)
+                if not whl:
+                    raise RuntimeError(
+                        f"pip did not build a wheel for {request.requirement!r}"
+                    )
+                request.deliver(whl, cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A machine-local, content-addressed cache of wheels built from sdists.
+
+Building an sdist, especially one with native extensions, can take minutes and
+is repeated for every workspace, output base and `bazel clean --expunge`. The
+cache lets the wheel built once be reused everywhere on the same machine.
+
+An entry is keyed on everything known to affect the built wheel: the sdist
+content hash, the interpreter and its ABI, the platform, the extra pip args and
+the build environment variables. Paths into the output base, e.g. the include
+and lib directories of the toolchain interpreter in `CPPFLAGS` and `LDFLAGS`,
+are resolved and rewritten before hashing so the key is the same in every
+output base and for every repository the interpreter is reached through.
+Builds whose sdist isn't pinned by a hash are never cached.
+"""
+
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import sysconfig
+import tempfile
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+# Bump when the key or the layout of the cache changes.
+_CACHE_VERSION = 3
+
+_BLOCK_SIZE = 1 << 20
+
+_SDIST_SUFFIXES = (".tar.gz", ".tgz", ".tar.bz2", ".zip")
+
+_HASH_RE = re.compile(r"--hash[=\s]+(\w+):([0-9a-fA-F]+)")
+
+# An absolute path, optionally attached to a flag, e.g. `-I/usr/include`.
+_FLAG_PATH_RE = re.compile(r"(-[\w-]*=?)?(/.*)")
+
+# Replaces the interpreter prefixes in the key. The interpreter is keyed by its
+# version and ABI instead, since the same interpreter is reached through
+# different repositories, e.g. the host platform alias of the toolchain.
+_INTERPRETER_PREFIX = "<interpreter_prefix>"
+
+# Environment variables, beyond the ones set via the `environment` attribute,
+# that are read by setuptools and the compilers it drives.
+_BUILD_ENV_VARS = (
+    "AR",
+    "ARCHFLAGS",
+    "CC",
+    "CFLAGS",
+    "CPPFLAGS",
+    "CXX",
+    "CXXFLAGS",
+    "LDFLAGS",
+    "LDSHARED",
+    "MACOSX_DEPLOYMENT_TARGET",
+    "PYTHONHASHSEED",
+    "SOURCE_DATE_EPOCH",
+)
+
+# The build backend is only taken from the environment pip runs in when build
+# isolation is disabled; otherwise pip installs it into an isolated environment.
+_NO_BUILD_ISOLATION_TOOLS = ("setuptools", "wheel")
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def local_sdists(directory: Path) -> list[Path]:
+    """Return the sdists in `directory`, sorted by name."""
+    return sorted(p for p in directory.iterdir() if p.name.endswith(_SDIST_SUFFIXES))
+
+
+def sdist_hashes(requirement: str, directory: Path) -> list[str]:
+    """Return the hashes that pin the sdist being built.
+
+    An sdist already downloaded into `directory` (the `--find-links .` case)
+    is hashed directly, otherwise the `--hash` values of the requirement are
+    used.
+
+    Args:
+        requirement: The requirement line passed to pip.
+        directory: The directory pip is run in.
+
+    Returns:
+        The sorted `algo:digest` hashes, empty if the sdist isn't pinned.
+    """
+    local = local_sdists(directory)
+    if local:
+        return [f"sha256:{_sha256_file(p)}" for p in local]
+    return sorted(
+        f"{algo}:{digest.lower()}" for algo, digest in _HASH_RE.findall(requirement)
+    )
+
+
+def _build_tool_versions(extra_pip_args: list[str]) -> dict[str, Optional[str]]:
+    names = ["pip"]
+    if "--no-build-isolation" in extra_pip_args:
+        names.extend(_NO_BUILD_ISOLATION_TOOLS)
+    versions = {}
+    for name in names:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def _path_rewrites(directory: Path) -> list[tuple[str, str]]:
+    """Return the `(path, replacement)` pairs that make a key portable.
+
+    The interpreter prefixes and the output base, derived from the
+    `<output_base>/external/<repo>` directory pip is run in, are replaced by
+    fixed placeholders. Longer paths are rewritten first.
+    """
+    rewrites = {}
+    for prefix in (sys.prefix, sys.exec_prefix):
+        rewrites[prefix] = _INTERPRETER_PREFIX
+        rewrites[os.path.realpath(prefix)] = _INTERPRETER_PREFIX
+    directory = directory.absolute()
+    if directory.parent.name == "external":
+        output_base = directory.parent.parent
+        rewrites[str(output_base)] = "<output_base>"
+        rewrites[os.path.realpath(output_base)] = "<output_base>"
+    return sorted(rewrites.items(), key=lambda item: len(item[0]), reverse=True)
+
+
+def _resolve_path(word: str) -> str:
+    match = _FLAG_PATH_RE.fullmatch(word)
+    if not match or not os.path.exists(match.group(2)):
+        return word
+    return (match.group(1) or "") + os.path.realpath(match.group(2))
+
+
+def _rewrite_paths(value: str, rewrites: list[tuple[str, str]]) -> str:
+    # `pip_archive` points `CPPFLAGS` at the include directory of the
+    # interpreter it was given, which may be a symlink to the interpreter pip
+    # runs, so existing paths are resolved first.
+    value = " ".join(_resolve_path(word) for word in value.split(" "))
+    for path, replacement in rewrites:
+        if path not in ("", os.sep):
+            value = value.replace(path, replacement)
+    return value
+
+
+def cache_key(
+    *,
+    requirement: str,
+    directory: Path,
+    isolated: bool,
+    extra_pip_args: list[str],
+    environment: Mapping[str, str],
+    env: Mapping[str, str],
+) -> Optional[str]:
+    """Compute the cache key for building `requirement`.
+
+    Args:
+        requirement: The requirement line passed to pip.
+        directory: The directory pip is run in.
+        isolated: Whether pip is run with `--isolated`.
+        extra_pip_args: The extra args passed to pip.
+        environment: The environment variables set by the `environment`
+            attribute; all of them are part of the key.
+        env: The full environment pip is run with.
+
+    Returns:
+        The hex key, or None if the build can't be cached.
+    """
+    sdists = sdist_hashes(requirement, directory)
+    if not sdists:
+        return None
+
+    names = set(environment) | set(_BUILD_ENV_VARS)
+    rewrites = _path_rewrites(directory)
+    key: dict[str, Any] = {
+        "version": _CACHE_VERSION,
+        "requirement": requirement,
+        "sdists": sdists,
+        "interpreter": {
+            "implementation": sys.implementation.name,
+            "cache_tag": sys.implementation.cache_tag,
+            "version": sys.version,
+            "soabi": sysconfig.get_config_var("SOABI"),
+            "abiflags": getattr(sys, "abiflags", ""),
+        },
+        "platform": {
+            "platform": sysconfig.get_platform(),
+            "machine": platform.machine(),
+            "libc": list(platform.libc_ver()),
+        },
+        "isolated": isolated,
+        "extra_pip_args": [_rewrite_paths(arg, rewrites) for arg in extra_pip_args],
+        "build_tools": _build_tool_versions(extra_pip_args),
+        "environment": {
+            name: _rewrite_paths(env[name], rewrites)
+            for name in sorted(names)
+            if name in env
+        },
+    }
+    encoded = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class WheelCache:
+    """A directory of built wheels, one per cache key.
+
+    Each entry is `<root>/<key[:2]>/<key>/<wheel filename>`. Entries are
+    populated by renaming a fully written temporary directory into place, so
+    concurrent builds of the same key never observe a partial wheel.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+
+    def _entry(self, key: str) -> Path:
+        return self._root / key[:2] / key
+
+    def get(self, key: str, dest_dir: Path) -> Optional[Path]:
+        """Copy the cached wheel for `key` into `dest_dir`.
+
+        Returns:
+            The path of the copied wheel, or None on a cache miss.
+        """
+        try:
+            wheels = [p for p in self._entry(key).iterdir() if p.suffix == ".whl"]
+        except FileNotFoundError:
+            return None
+        if len(wheels) != 1:
+            return None
+        dest = dest_dir / wheels[0].name
+        shutil.copyfile(wheels[0], dest)
+        return dest
+
+    def put(self, key: str, whl: Path) -> None:
+        """Store `whl` as the wheel for `key`, unless one is already stored."""
+        entry = self._entry(key)
+        if entry.exists():
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key}.", dir=entry.parent))
+        try:
+            shutil.copyfile(whl, tmp / whl.name)
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                # Another build populated the entry first.
+                pass
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
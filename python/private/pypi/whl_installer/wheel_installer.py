@@ -15,7 +15,6 @@
 """Build and/or fetch a single wheel based on the requirement passed in"""
 
 import errno
-import glob
 import json
 import os
 import subprocess
@@ -23,10 +22,10 @@ import sys
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 
-from python.private.pypi.whl_installer import arguments
+from python.private.pypi.whl_installer import arguments, wheel_cache
 
 
-def _configure_reproducible_wheels() -> None:
+def configure_reproducible_wheels() -> None:
     """Modifies the environment to make wheel building reproducible.
     Wheels created from sdists are not reproducible by default. We can however workaround this by
     patching in some configuration with environment variables.
@@ -51,12 +50,22 @@ def _configure_reproducible_wheels() -> None:
         os.environ["PYTHONHASHSEED"] = "0"
 
 
+def write_whl_file_json(directory: Path) -> Path:
+    """Record the path of the wheel in `directory` for the repository rule."""
+    whl = next(directory.glob("*.whl"))
+
+    with open(directory / "whl_file.json", "w") as f:
+        json.dump({"whl_file": f"{whl.resolve()}"}, f)
+
+    return whl
+
+
 def main() -> None:
     args = arguments.parser(description=__doc__).parse_args()
     deserialized_args = dict(vars(args))
     arguments.deserialize_structured_args(deserialized_args)
 
-    _configure_reproducible_wheels()
+    configure_reproducible_wheels()
 
     pip_args = (
         [sys.executable, "-m", "pip"]
@@ -66,6 +75,26 @@ def main() -> None:
         + deserialized_args["extra_pip_args"]
     )
 
+    env = os.environ.copy()
+    env.update(deserialized_args["environment"])
+
+    cache = None
+    cache_key = None
+    if args.wheel_cache_dir and not args.download_only:
+        cache = wheel_cache.WheelCache(Path(args.wheel_cache_dir))
+        cache_key = wheel_cache.cache_key(
+            requirement=args.requirement,
+            directory=Path.cwd(),
+            isolated=args.isolated,
+            extra_pip_args=deserialized_args["extra_pip_args"],
+            environment=deserialized_args["environment"],
+            env=env,
+        )
+
+    if cache_key and cache.get(cache_key, Path.cwd()):
+        write_whl_file_json(Path.cwd())
+        return
+
     requirement_file = NamedTemporaryFile(mode="wb", delete=False)
     try:
         requirement_file.write(args.requirement.encode("utf-8"))
@@ -77,8 +106,6 @@ def main() -> None:
         # so write our single requirement into a temp file in case it has any of those flags.
         pip_args.extend(["-r", requirement_file.name])
 
-        env = os.environ.copy()
-        env.update(deserialized_args["environment"])
         # Assumes any errors are logged by pip so do nothing. This command will fail if pip fails
         subprocess.run(pip_args, check=True, env=env)
     finally:
@@ -88,10 +115,14 @@ def main() -> None:
             if e.errno != errno.ENOENT:
                 raise
 
-    whl = Path(next(iter(glob.glob("*.whl"))))
+    whl = write_whl_file_json(Path.cwd())
 
-    with open("whl_file.json", "w") as f:
-        json.dump({"whl_file": f"{whl.resolve()}"}, f)
+    if cache_key:
+        try:
+            cache.put(cache_key, whl)
+        except OSError as e:
+            # The cache is only an optimization, never fail the build because of it.
+            print(f"WARNING: could not cache {whl.name}: {e}", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -29,6 +29,26 @@ _SELF_RUNFILES_RELATIVE_PATH = "%site_init_runfiles_path%"
 _COVERAGE_TOOL = "%coverage_tool%"
 # True if the runfiles root should be added to sys.path
 _ADD_RUNFILES_ROOT_TO_SYS_PATH = "%add_runfiles_root_to_sys_path%" == "1"
+# Runfiles-relative path to the index of top-level names importable from
+# each sys.path entry, if any.
+_IMPORT_INDEX = "%import_index%"
+
+
+# Startup phases timed when RULES_PYTHON_STARTUP_PROFILE is set, as tuples of
+# (name, start ns, end ns). The stage 2 bootstrap adds them to its profile.
+STARTUP_PROFILE_PHASES = []
+
+
+def _profile_phase(name, func):
+    if not os.environ.get("RULES_PYTHON_STARTUP_PROFILE"):
+        return func()
+    import time
+
+    start_ns = time.perf_counter_ns()
+    try:
+        return func()
+    finally:
+        STARTUP_PROFILE_PHASES.append((name, start_ns, time.perf_counter_ns()))
 
 
 def _is_verbose():
@@ -52,6 +72,7 @@ _print_verbose("import_all:", _IMPORT_ALL)
 _print_verbose("workspace_name:", _WORKSPACE_NAME)
 _print_verbose("self_runfiles_path:", _SELF_RUNFILES_RELATIVE_PATH)
 _print_verbose("coverage_tool:", _COVERAGE_TOOL)
+_print_verbose("import_index:", _IMPORT_INDEX)
 
 
 def _find_runfiles_root():
@@ -151,6 +172,163 @@ def _install_windows_extension_finder():
             return
 
 
+def _install_import_index_finder():
+    """Skip sys.path entries that the import index says can't have a module.
+
+    The index maps the sys.path entries added for the binary's dependencies to
+    the top-level names importable from them. Top-level imports then only
+    search the entries that contain the name, plus any entries the index
+    doesn't cover (e.g. the stdlib), instead of every entry on sys.path.
+    Entries whose names can't be known at build time, e.g. because of a tree
+    artifact, are marked with `*` and not indexed. If a module isn't found in
+    the entries the index selected, all of sys.path is searched, so a module
+    the index misses is still imported.
+    """
+    if not _IMPORT_INDEX:
+        return
+
+    import importlib.machinery
+
+    names_by_entry = {}
+    with open(os.path.join(_RUNFILES_ROOT, _IMPORT_INDEX), encoding="utf-8") as f:
+        for line in f:
+            rel_path, _, name = line.rstrip("\n").partition("\t")
+            if rel_path:
+                entry = os.path.join(_RUNFILES_ROOT, rel_path)
+                if _is_windows():
+                    entry = entry.replace("/", os.sep)
+            else:
+                entry = _RUNFILES_ROOT
+            names_by_entry.setdefault(entry, set()).add(name)
+    for entry in [entry for entry, names in names_by_entry.items() if "*" in names]:
+        del names_by_entry[entry]
+
+    for index, finder in enumerate(sys.meta_path):
+        if isinstance(finder, type) and issubclass(
+            finder, importlib.machinery.PathFinder
+        ):
+            break
+    else:
+        return
+
+    class _ImportIndexPathFinder(finder):
+        @classmethod
+        def find_spec(cls, fullname, path=None, target=None):
+            if path is not None:
+                return super().find_spec(fullname, path, target)
+            spec = super().find_spec(
+                fullname,
+                [
+                    entry
+                    for entry in sys.path
+                    if fullname in names_by_entry.get(entry, (fullname,))
+                ],
+                target,
+            )
+            if spec is None:
+                spec = super().find_spec(fullname, None, target)
+            return spec
+
+    _print_verbose("import index: indexed", len(names_by_entry), "sys.path entries")
+    sys.meta_path[index] = _ImportIndexPathFinder
+
+
+class _ZipappPathEntryFinder:
+    """Finds modules of a runfiles directory, falling back to the zipapp.
+
+    When a zipapp is run with `RULES_PYTHON_ZIPAPP_IMPORT_FROM_ZIP=1`, its pure
+    Python source files aren't extracted, so they are imported from the
+    zipapp using `zipimport` instead. The origin, and thus `__file__`, of such
+    a module is its location inside the zip. The `__path__` of a package
+    is its extracted directory, so its extension modules and other files that
+    are extracted are still found, and its submodules are again looked up
+    on disk first, then in the zip.
+    """
+
+    def __init__(self, path, archive_path, archive_runfiles, runfiles_root):
+        import zipimport
+
+        self._fallback = None
+        for hook in sys.path_hooks:
+            if hook is _zipapp_path_hook:
+                continue
+            try:
+                self._fallback = hook(path)
+                break
+            except ImportError:
+                continue
+        self._zip_importer = zipimport.zipimporter(archive_path)
+        self._archive_runfiles = archive_runfiles
+        self._runfiles_root = runfiles_root
+
+    def find_spec(self, fullname, target=None):
+        spec = None
+        if self._fallback is not None:
+            spec = self._fallback.find_spec(fullname, target)
+            # A directory without an `__init__.py` is a namespace package on
+            # disk, but its `__init__.py` may be in the zip.
+            if spec is not None and spec.loader is not None:
+                return spec
+        zip_spec = self._zip_importer.find_spec(fullname, target)
+        if zip_spec is None or zip_spec.loader is None:
+            return spec
+        if zip_spec.submodule_search_locations is not None:
+            zip_spec.submodule_search_locations = [
+                self._runfiles_root + location[len(self._archive_runfiles) :]
+                for location in zip_spec.submodule_search_locations
+            ]
+        return zip_spec
+
+    def invalidate_caches(self):
+        if self._fallback is not None:
+            self._fallback.invalidate_caches()
+        self._zip_importer.invalidate_caches()
+
+
+# Tuple of (runfiles root, zipapp path) once _install_zipapp_importer is called.
+_ZIPAPP_IMPORT_STATE = None
+
+
+def _zipapp_path_hook(path):
+    runfiles_root, archive = _ZIPAPP_IMPORT_STATE
+    abs_path = os.path.abspath(path)
+    if abs_path != runfiles_root and not abs_path.startswith(runfiles_root + os.sep):
+        raise ImportError("not in the zipapp runfiles")
+    # Extraction creates every directory of the zip, including those whose
+    # files were left in the zip, so only directories need handling.
+    if not os.path.isdir(abs_path):
+        raise ImportError("not a directory")
+    archive_runfiles = os.path.join(archive, "runfiles")
+    archive_path = archive_runfiles + abs_path[len(runfiles_root) :]
+    return _ZipappPathEntryFinder(path, archive_path, archive_runfiles, runfiles_root)
+
+
+def _install_zipapp_importer():
+    """Imports modules from the zipapp if they weren't extracted from it.
+
+    The zipapp's `__main__.py` sets the environment variables when it leaves
+    files in the zip. They are inherited by child processes, so a Python
+    subprocess using the same runfiles can import from the zip too.
+    """
+    global _ZIPAPP_IMPORT_STATE
+
+    archive = os.environ.get("RULES_PYTHON_ZIPAPP_ARCHIVE")
+    runfiles_root = os.environ.get("RULES_PYTHON_ZIPAPP_RUNFILES_ROOT")
+    if not archive or not runfiles_root:
+        return
+    runfiles_root = os.path.abspath(runfiles_root)
+    if os.path.normcase(runfiles_root) != os.path.normcase(
+        os.path.abspath(_RUNFILES_ROOT)
+    ):
+        # Another binary's runfiles, e.g. inherited from a zipapp that runs it.
+        return
+    _print_verbose("importing from zipapp:", archive)
+    _ZIPAPP_IMPORT_STATE = (runfiles_root, archive)
+    sys.path_hooks.insert(0, _zipapp_path_hook)
+    # Entries for the runfiles may have been cached by the default hooks.
+    sys.path_importer_cache.clear()
+
+
 def _search_path(name):
     """Finds a file in a given search path."""
     search_path = os.getenv("PATH", os.defpath).split(os.pathsep)
@@ -264,8 +442,12 @@ def _fixup_sys_base_executable():
     sys._base_executable = exe
 
 
-_fixup_sys_base_executable()
+_profile_phase("site_init: fixup_sys_base_executable", _fixup_sys_base_executable)
 
-COVERAGE_SETUP = _setup_sys_path()
-_install_windows_extension_finder()
+COVERAGE_SETUP = _profile_phase("site_init: setup_sys_path", _setup_sys_path)
+_profile_phase(
+    "site_init: install_windows_extension_finder", _install_windows_extension_finder
+)
+_profile_phase("site_init: install_import_index_finder", _install_import_index_finder)
+_profile_phase("site_init: install_zipapp_importer", _install_zipapp_importer)
 _print_verbose("DONE")
@@ -25,10 +25,13 @@ import contextlib
 import os
 import re
 import runpy
+import time
 import types
 import uuid
 from functools import cache
 
+_STAGE2_START_NS = time.perf_counter_ns()
+
 # ===== Template substitutions start =====
 # We just put them in one place so its easy to tell which are used.
 
@@ -60,6 +63,7 @@ BUILD_DATA_FILE = "%build_data_file%"
 
 IS_WINDOWS = os.name == "nt"
 IS_VERBOSE = bool(os.environ.get("RULES_PYTHON_BOOTSTRAP_VERBOSE"))
+STARTUP_PROFILE = os.environ.get("RULES_PYTHON_STARTUP_PROFILE")
 
 # Windows APIs can be picky about slashes depending on the context,
 # so convert to backslashes to avoid any issues.
@@ -106,6 +110,136 @@ class BazelBinaryInfoModule(types.ModuleType):
 sys.modules["bazel_binary_info"] = BazelBinaryInfoModule("bazel_binary_info")
 
 
+class _StartupProfiler:
+    """Records the time spent in startup phases and importing modules.
+
+    The events are written as a trace event format JSON file when the program
+    exits. The file can be loaded in trace viewers such as
+    https://ui.perfetto.dev, or processed to aggregate startup costs.
+    """
+
+    def __init__(self, output_dir):
+        self._output_dir = output_dir
+        self._events = []
+        self._orig_import = None
+
+    def add_event(self, name, category, start_ns, end_ns=None, tid=0):
+        if end_ns is None:
+            end_ns = time.perf_counter_ns()
+        self._events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start_ns / 1000,
+                "dur": (end_ns - start_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": tid,
+            }
+        )
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add_event(name, "phase", start_ns)
+
+    def install_import_hook(self):
+        """Records the time taken by `import` statements that import modules.
+
+        Like `-X importtime`, the time of an import includes the time of the
+        imports it triggers.
+        """
+        import _thread
+        import builtins
+
+        orig_import = self._orig_import = builtins.__import__
+        main_thread_id = _thread.get_ident()
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level == 0 and name in sys.modules and not fromlist:
+                return orig_import(name, globals, locals, fromlist, level)
+            num_modules = len(sys.modules)
+            start_ns = time.perf_counter_ns()
+            try:
+                return orig_import(name, globals, locals, fromlist, level)
+            finally:
+                # Only record imports that actually imported something.
+                if len(sys.modules) != num_modules:
+                    if level:
+                        # Resolve relative imports, e.g. `from .. import foo`
+                        package = (globals or {}).get("__package__") or ""
+                        base = package.rsplit(".", level - 1)[0]
+                        name = base + "." + name if name else base
+                    if fromlist:
+                        name = "{} [{}]".format(name, ", ".join(fromlist))
+                    thread_id = _thread.get_ident()
+                    self.add_event(
+                        name,
+                        "import",
+                        start_ns,
+                        tid=0 if thread_id == main_thread_id else thread_id,
+                    )
+
+        builtins.__import__ = timed_import
+
+    def write(self):
+        if self._orig_import:
+            import builtins
+
+            builtins.__import__ = self._orig_import
+        import json
+
+        path = os.path.join(
+            self._output_dir,
+            "rules_python_startup_profile.{}.json".format(os.getpid()),
+        )
+        print_verbose("writing startup profile:", path)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": self._events,
+                    "otherData": {
+                        "argv": sys.argv,
+                        "main": MAIN_PATH or MAIN_MODULE,
+                        "python_version": sys.version,
+                    },
+                },
+                f,
+            )
+
+
+def _create_startup_profiler():
+    if not STARTUP_PROFILE:
+        return None
+    import atexit
+    import tempfile
+
+    if STARTUP_PROFILE == "1":
+        output_dir = (
+            os.environ.get("TEST_UNDECLARED_OUTPUTS_DIR") or tempfile.gettempdir()
+        )
+    else:
+        output_dir = STARTUP_PROFILE
+    profiler = _StartupProfiler(output_dir)
+    profiler.add_event("stage2: bootstrap init", "phase", _STAGE2_START_NS)
+    # The site init phases happen before this bootstrap runs.
+    site_init = sys.modules.get("_bazel_site_init")
+    for name, start_ns, end_ns in getattr(site_init, "STARTUP_PROFILE_PHASES", ()):
+        profiler.add_event(name, "phase", start_ns, end_ns)
+    profiler.install_import_hook()
+    atexit.register(profiler.write)
+    return profiler
+
+
+def _profile_phase(name):
+    if _startup_profiler is None:
+        return contextlib.nullcontext()
+    return _startup_profiler.phase(name)
+
+
 def get_windows_path_with_unc_prefix(path):
     path = path.strip()
 
@@ -271,11 +405,18 @@ def runfiles_envvar(module_space):
     return (None, None)
 
 
+@cache
 def instrumented_file_paths():
-    """Yields tuples of realpath of each instrumented file with the relative path."""
+    """Returns a dict of the realpath of each instrumented file to its path.
+
+    Only files whose realpath differs from their manifest path are included.
+    The result is computed once and shared by the coverage setup and the lcov
+    report fixup, since resolving every path is expensive for large manifests.
+    """
     manifest_filename = os.environ.get("COVERAGE_MANIFEST")
     if not manifest_filename:
-        return
+        return {}
+    paths = {}
     with open(manifest_filename, "r") as manifest:
         for line in manifest:
             filename = line.strip()
@@ -292,7 +433,8 @@ def instrumented_file_paths():
                 continue
             if realpath != filename:
                 print_verbose_coverage("Fixing up {} -> {}".format(realpath, filename))
-                yield (realpath, filename)
+                paths.setdefault(realpath, filename)
+    return paths
 
 
 def unresolve_symlinks(output_filename):
@@ -308,18 +450,18 @@ def unresolve_symlinks(output_filename):
 
     See https://github.com/nedbat/coveragepy/issues/963.
     """
-    substitutions = list(instrumented_file_paths())
+    substitutions = instrumented_file_paths()
     if substitutions:
-        unfixed_file = output_filename + ".tmp"
-        os.rename(output_filename, unfixed_file)
-        with open(unfixed_file, "r") as unfixed:
-            with open(output_filename, "w") as output_file:
+        fixed_file = output_filename + ".tmp"
+        with open(output_filename, "r") as unfixed:
+            with open(fixed_file, "w") as output_file:
                 for line in unfixed:
                     if line.startswith("SF:"):
-                        for realpath, filename in substitutions:
-                            line = line.replace(realpath, filename)
+                        filename = substitutions.get(line[3:].rstrip("\n"))
+                        if filename is not None:
+                            line = "SF:{}\n".format(filename)
                     output_file.write(line)
-        os.unlink(unfixed_file)
+        os.replace(fixed_file, output_filename)
 
 
 def _run_py_path(main_filename, *, args, cwd=None):
@@ -347,6 +489,48 @@ def _run_py_module(module_name):
     runpy.run_module(module_name, alter_sys=True, run_name="__main__")
 
 
+# Environment variable with the coveragerc file of the process combining the
+# coverage data of its subprocesses. Set by the bootstrap for its subprocesses;
+# not for use by users.
+_COVERAGE_COMBINE_RCFILE_ENVVAR = "_RULES_PYTHON_COVERAGE_COMBINE_RCFILE"
+
+# Files that coverage.py data shouldn't be collected for.
+_COVERAGE_OMIT = [
+    # Pipes can't be read back later, which can cause coverage to
+    # throw an error when trying to get its source code.
+    "/dev/fd/*",
+    # The mechanism for finding third-party packages in coverage-py
+    # only works for installed packages, not for runfiles. e.g:
+    #'$HOME/.local/lib/python3.10/site-packages',
+    # '/usr/lib/python',
+    # '/usr/lib/python3.10/site-packages',
+    # '/usr/local/lib/python3.10/dist-packages'
+    # see https://github.com/nedbat/coveragepy/blob/bfb0c708fdd8182b2a9f0fc403596693ef65e475/coverage/inorout.py#L153-L164
+    "*/external/*",
+]
+
+
+def _select_coverage_core():
+    """Use coverage.py's sys.monitoring (PEP 669) core when it can be used.
+
+    The sys.monitoring core has much lower overhead than the default
+    sys.settrace based core. Since branch coverage is collected, it's only
+    used where sys.monitoring can measure branches (CPython 3.14+); otherwise
+    the lcov output would lose its branch data. An explicit `COVERAGE_CORE`
+    setting is respected.
+    """
+    if os.environ.get("COVERAGE_CORE"):
+        return
+    if (
+        getattr(sys, "monitoring", None) is not None
+        and sys.implementation.name == "cpython"
+        and sys.version_info >= (3, 14)
+    ):
+        print_verbose_coverage("using coverage core: sysmon")
+        # Set in the environment so subprocesses use it, too.
+        os.environ["COVERAGE_CORE"] = "sysmon"
+
+
 @contextlib.contextmanager
 def _maybe_collect_coverage(enable):
     print_verbose_coverage("enabled:", enable)
@@ -354,19 +538,40 @@ def _maybe_collect_coverage(enable):
         yield
         return
 
-    instrumented_files = [abs_path for abs_path, _ in instrumented_file_paths()]
-    unique_dirs = {os.path.dirname(file) for file in instrumented_files}
-    source = "\n\t".join(unique_dirs)
-
-    print_verbose_coverage("Instrumented Files:\n" + "\n".join(instrumented_files))
-    print_verbose_coverage("Sources:\n" + "\n".join(unique_dirs))
+    setup_start_ns = time.perf_counter_ns()
 
+    _select_coverage_core()
     import coverage
     from coverage.exceptions import NoDataError
 
     coverage_dir = os.environ["COVERAGE_DIR"]
     unique_id = uuid.uuid4()
 
+    # When a parent process is combining coverage data, save the raw data for
+    # it to combine instead of writing an lcov report.
+    combine_rcfile = os.environ.get(_COVERAGE_COMBINE_RCFILE_ENVVAR)
+    if combine_rcfile and os.path.exists(combine_rcfile):
+        print_verbose_coverage("saving data for combining:", combine_rcfile)
+        cov = coverage.Coverage(
+            config_file=combine_rcfile,
+            data_suffix=True,
+            messages=is_verbose_coverage(),
+        )
+        cov.start()
+        try:
+            yield
+        finally:
+            cov.stop()
+            cov.save()
+        return
+
+    instrumented_files = list(instrumented_file_paths())
+    unique_dirs = {os.path.dirname(file) for file in instrumented_files}
+    source = "\n\t".join(unique_dirs)
+
+    print_verbose_coverage("Instrumented Files:\n" + "\n".join(instrumented_files))
+    print_verbose_coverage("Sources:\n" + "\n".join(unique_dirs))
+
     # We need for coveragepy to use relative paths.  This can only be configured
     # using an rc file.
     rcfile_name = os.path.join(coverage_dir, ".coveragerc_{}".format(unique_id))
@@ -375,16 +580,35 @@ def _maybe_collect_coverage(enable):
         if COVERAGE_INSTRUMENTED
         else ""
     )
+    combine = os.environ.get("RULES_PYTHON_COVERAGE_COMBINE") == "1"
+    if combine:
+        # Subprocesses save their data into a directory, which is combined
+        # into this process's data at exit. Everything they need is in the rc
+        # file, since multiprocessing children only get that.
+        data_dir = os.path.join(coverage_dir, "pycov_{}".format(unique_id))
+        os.makedirs(data_dir, exist_ok=True)
+        omit = "\n\t".join(_COVERAGE_OMIT)
+        combine_config = f"""branch = True
+parallel = True
+concurrency = multiprocessing, thread
+data_file = {os.path.join(data_dir, ".coverage")}
+omit =
+\t{omit}
+"""
+    else:
+        combine_config = ""
     print_verbose_coverage("coveragerc file:", rcfile_name)
     with open(rcfile_name, "w") as rcfile:
         rcfile.write(
             f"""[run]
 relative_files = True
 {disable_warnings}
-source =
+{combine_config}source =
 \t{source}
 """
         )
+    if combine:
+        os.environ[_COVERAGE_COMBINE_RCFILE_ENVVAR] = rcfile_name
     try:
         cov = coverage.Coverage(
             config_file=rcfile_name,
@@ -393,28 +617,24 @@ source =
             # which can interfere with the Bazel coverage command. Enabling message
             # output is only useful for debugging coverage support.
             messages=is_verbose_coverage(),
-            omit=[
-                # Pipes can't be read back later, which can cause coverage to
-                # throw an error when trying to get its source code.
-                "/dev/fd/*",
-                # The mechanism for finding third-party packages in coverage-py
-                # only works for installed packages, not for runfiles. e.g:
-                #'$HOME/.local/lib/python3.10/site-packages',
-                # '/usr/lib/python',
-                # '/usr/lib/python3.10/site-packages',
-                # '/usr/local/lib/python3.10/dist-packages'
-                # see https://github.com/nedbat/coveragepy/blob/bfb0c708fdd8182b2a9f0fc403596693ef65e475/coverage/inorout.py#L153-L164
-                "*/external/*",
-            ],
+            omit=_COVERAGE_OMIT,
         )
         cov.start()
+        if _startup_profiler:
+            _startup_profiler.add_event(
+                "stage2: coverage setup", "phase", setup_start_ns
+            )
         try:
             yield
         finally:
             cov.stop()
             lcov_path = os.path.join(coverage_dir, "pylcov_{}.dat".format(unique_id))
-            print_verbose_coverage("generating lcov from:", lcov_path)
             try:
+                if combine:
+                    cov.save()
+                    print_verbose_coverage("combining coverage data:", data_dir)
+                    cov.combine([data_dir])
+                print_verbose_coverage("generating lcov from:", lcov_path)
                 cov.lcov_report(
                     outfile=lcov_path,
                     # Ignore errors because sometimes instrumented files aren't
@@ -434,6 +654,11 @@ source =
                 if os.path.isfile(lcov_path):
                     unresolve_symlinks(lcov_path)
     finally:
+        if combine:
+            import shutil
+
+            os.environ.pop(_COVERAGE_COMBINE_RCFILE_ENVVAR, None)
+            shutil.rmtree(data_dir, ignore_errors=True)
         try:
             os.unlink(rcfile_name)
         except OSError as err:
@@ -484,7 +709,443 @@ def _add_site_packages(site_packages):
     sys.path[first_global_offset:0] = added_dirs
 
 
+# Environment variable with the socket path the fork server listens on. Set by
+# the client for the server process it starts; not for use by users.
+_FORKSERVER_SOCKET_ENVVAR = "_RULES_PYTHON_FORKSERVER_SOCKET"
+
+
+def _forkserver_enabled():
+    """Tells if the fork server should be used for this invocation."""
+    if os.environ.get("RULES_PYTHON_FORKSERVER") != "1":
+        return False
+    # Coverage and startup profiling are per-process, so run those normally.
+    if os.environ.get("COVERAGE_DIR") or STARTUP_PROFILE:
+        return False
+    import socket
+
+    return (
+        hasattr(os, "fork")
+        and hasattr(socket, "AF_UNIX")
+        and hasattr(socket, "send_fds")
+    )
+
+
+def _forkserver_socket_path(runfiles_root):
+    """Returns the socket path of the fork server for this binary."""
+    import hashlib
+
+    base_dir = os.environ.get("RULES_PYTHON_FORKSERVER_DIR")
+    if not base_dir:
+        base_dir = os.path.join(
+            os.environ.get("XDG_RUNTIME_DIR") or "/tmp",
+            "rules_python_forkserver_{}".format(os.getuid()),
+        )
+    os.makedirs(base_dir, mode=0o700, exist_ok=True)
+    # The server runs code on behalf of its clients, so only allow the current
+    # user to connect.
+    if os.stat(base_dir).st_uid != os.getuid():
+        raise PermissionError(
+            "fork server directory {} isn't owned by the current user".format(base_dir)
+        )
+    # A server is only valid for the same binary, runfiles tree, interpreter,
+    # and environment affecting the preloaded state.
+    key = "\0".join(
+        [
+            sys.executable,
+            str(sys.flags),
+            os.path.abspath(__file__),
+            runfiles_root,
+            os.environ.get("PYTHONPATH", ""),
+            os.environ.get("RULES_PYTHON_FORKSERVER_PRELOAD", ""),
+        ]
+    )
+    digest = hashlib.sha256(key.encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(base_dir, digest[:24] + ".sock")
+
+
+def _forkserver_send(sock, message, fds=()):
+    import json
+    import socket
+
+    data = json.dumps(message).encode("utf-8", "surrogateescape")
+    header = len(data).to_bytes(4, "big")
+    if fds:
+        socket.send_fds(sock, [header], fds)
+        sock.sendall(data)
+    else:
+        sock.sendall(header + data)
+
+
+def _forkserver_recv(sock, with_fds=False):
+    """Receives a message, or returns None if the connection was closed."""
+    import json
+    import socket
+
+    fds = []
+    if with_fds:
+        header, fds, _, _ = socket.recv_fds(sock, 4, 3)
+    else:
+        header = sock.recv(4)
+    while header and len(header) < 4:
+        chunk = sock.recv(4 - len(header))
+        if not chunk:
+            break
+        header += chunk
+    if len(header) < 4:
+        for fd in fds:
+            os.close(fd)
+        return (None, []) if with_fds else None
+    size = int.from_bytes(header, "big")
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    message = json.loads(bytes(data).decode("utf-8", "surrogateescape"))
+    return (message, fds) if with_fds else message
+
+
+def _forkserver_run(runfiles_root):
+    """Runs this invocation in the fork server, starting one if needed.
+
+    Returns:
+        The exit code of the invocation, or None if it wasn't run by a fork
+        server and should run in this process.
+    """
+    import signal
+    import socket
+
+    try:
+        socket_path = _forkserver_socket_path(runfiles_root)
+    except OSError as e:
+        print_verbose("fork server: not used:", e)
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        print_verbose("fork server: starting server:", socket_path)
+        _forkserver_start(socket_path)
+        return None
+
+    with sock:
+        _forkserver_send(
+            sock,
+            {"argv": sys.argv, "env": dict(os.environ), "cwd": os.getcwd()},
+            fds=[0, 1, 2],
+        )
+        response = _forkserver_recv(sock)
+        if not response or "pid" not in response:
+            print_verbose("fork server: not used:", response)
+            if response and response.get("error") == "stale":
+                _forkserver_start(socket_path)
+            return None
+        child_pid = response["pid"]
+        print_verbose("fork server: running in pid", child_pid)
+
+        def forward_signal(signum, frame):
+            try:
+                os.kill(child_pid, signum)
+            except ProcessLookupError:
+                pass
+
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(signum, forward_signal)
+
+        response = _forkserver_recv(sock)
+    if response is None:
+        return 1
+    exit_code = response["exit"]
+    # Like a shell, report death by a signal as 128 + the signal number.
+    return exit_code if exit_code >= 0 else 128 - exit_code
+
+
+def _forkserver_start(socket_path):
+    """Starts a fork server in the background for later invocations."""
+    import subprocess
+
+    # Re-run this bootstrap with the same interpreter options.
+    orig_argv = getattr(sys, "orig_argv", None)
+    if orig_argv and len(orig_argv) >= len(sys.argv):
+        interpreter_argv = orig_argv[: len(orig_argv) - len(sys.argv)]
+    else:
+        interpreter_argv = [sys.executable]
+    env = dict(os.environ)
+    env[_FORKSERVER_SOCKET_ENVVAR] = socket_path
+    subprocess.Popen(
+        interpreter_argv + [os.path.abspath(__file__)],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=None if IS_VERBOSE else subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _forkserver_module_files(runfiles_root):
+    """Returns the stat info of the loaded modules from the runfiles."""
+    files = {}
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and path.startswith(runfiles_root):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+    return files
+
+
+def _forkserver_is_stale(module_files):
+    """Tells if any preloaded module was changed, e.g. by a rebuild."""
+    for path, stat_key in module_files.items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        if (st.st_ino, st.st_size, st.st_mtime_ns) != stat_key:
+            return True
+    return False
+
+
+def _forkserver_serve(socket_path, runfiles_root):
+    """Preloads modules and forks a child to run each client's invocation.
+
+    The server is single threaded: one loop accepts clients, reaps the exited
+    children, and reports their exit codes. A child lives only as long as its
+    client's connection; if the client goes away, e.g. because it was killed,
+    the child's process group is killed too.
+
+    Only returns in the forked children, with the process state (argv,
+    environment, cwd, and stdio) of the client set up so the caller can run
+    the main program.
+    """
+    import errno
+    import importlib
+    import selectors
+    import signal
+    import socket
+    import time
+
+    for name in os.environ.get("RULES_PYTHON_FORKSERVER_PRELOAD", "").split(","):
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print_verbose("fork server: unable to preload", name, ":", e)
+    module_files = _forkserver_module_files(runfiles_root)
+    idle_timeout = float(os.environ.get("RULES_PYTHON_FORKSERVER_IDLE_TIMEOUT", "600"))
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(socket_path)
+    except OSError as e:
+        if e.errno != errno.EADDRINUSE:
+            raise
+        # Another server is running, or a previous one didn't exit cleanly.
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except ConnectionRefusedError:
+                pass
+            else:
+                print_verbose("fork server: already running:", socket_path)
+                sys.exit(0)
+        os.unlink(socket_path)
+        server.bind(socket_path)
+    server.listen()
+    server.setblocking(False)
+    print_verbose("fork server: listening:", socket_path)
+
+    # SIGCHLD wakes up the loop through the wakeup fd; the handler itself has
+    # nothing to do.
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    selector.register(wakeup_read, selectors.EVENT_READ)
+    # The client connection of each running child, by pid. None once the
+    # client has gone away.
+    children = {}
+    idle_since = time.monotonic()
+
+    def reap():
+        nonlocal idle_since
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            conn = children.pop(pid, None)
+            if conn is not None:
+                selector.unregister(conn)
+                try:
+                    _forkserver_send(conn, {"exit": os.waitstatus_to_exitcode(status)})
+                except OSError:
+                    pass
+                conn.close()
+        if not children:
+            idle_since = time.monotonic()
+
+    def drop_client(pid):
+        conn = children[pid]
+        selector.unregister(conn)
+        conn.close()
+        children[pid] = None
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    server_pid = os.getpid()
+    try:
+        # After the server stops accepting clients, keep serving the running
+        # children until they exit.
+        while server is not None or children:
+            if children:
+                timeout = None
+            else:
+                timeout = max(0.0, idle_since + idle_timeout - time.monotonic())
+            events = selector.select(timeout)
+            if not events and not children:
+                print_verbose("fork server: idle timeout")
+                break
+            for key, _ in events:
+                if key.fileobj == wakeup_read:
+                    try:
+                        while os.read(wakeup_read, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    reap()
+                    continue
+                if key.fileobj is not server:
+                    # Clients send nothing after their request, so a readable
+                    # connection means the client closed it or died.
+                    if children.get(key.data) is key.fileobj:
+                        print_verbose("fork server: client gone, killing", key.data)
+                        drop_client(key.data)
+                    continue
+                if server is None:
+                    continue
+
+                try:
+                    conn, _ = server.accept()
+                except BlockingIOError:
+                    continue
+                # Don't let a client that never sends its request stall the
+                # other clients.
+                conn.settimeout(10)
+                try:
+                    request, fds = _forkserver_recv(conn, with_fds=True)
+                except (OSError, ValueError):
+                    request, fds = None, []
+                if request is None or len(fds) != 3:
+                    for fd in fds:
+                        os.close(fd)
+                    conn.close()
+                    continue
+                if _forkserver_is_stale(module_files):
+                    print_verbose("fork server: preloaded modules changed; exiting")
+                    # Remove the socket first so the client can start a new
+                    # server.
+                    selector.unregister(server)
+                    server.close()
+                    server = None
+                    os.unlink(socket_path)
+                    socket_path = None
+                    try:
+                        _forkserver_send(conn, {"error": "stale"})
+                    except OSError:
+                        pass
+                    for fd in fds:
+                        os.close(fd)
+                    conn.close()
+                    continue
+
+                pid = os.fork()
+                if pid == 0:
+                    signal.set_wakeup_fd(-1)
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    selector.close()
+                    os.close(wakeup_read)
+                    os.close(wakeup_write)
+                    server.close()
+                    conn.close()
+                    for other in children.values():
+                        if other is not None:
+                            other.close()
+                    # Run in a process group of its own, so that the child and
+                    # whatever it starts can be killed together.
+                    os.setpgid(0, 0)
+                    _forkserver_setup_child(request, fds)
+                    return
+                try:
+                    os.setpgid(pid, pid)
+                except OSError:
+                    # The child already did it, or already exited.
+                    pass
+                for fd in fds:
+                    os.close(fd)
+                conn.settimeout(None)
+                children[pid] = conn
+                selector.register(conn, selectors.EVENT_READ, pid)
+                try:
+                    _forkserver_send(conn, {"pid": pid})
+                except OSError:
+                    drop_client(pid)
+    finally:
+        if os.getpid() == server_pid:
+            if socket_path:
+                try:
+                    os.unlink(socket_path)
+                except OSError:
+                    pass
+            for pid in children:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+    sys.exit(0)
+
+
+def _forkserver_setup_child(request, fds):
+    """Makes a forked child look like the client process."""
+    for target_fd, fd in enumerate(fds):
+        os.dup2(fd, target_fd)
+        os.close(fd)
+    # Recreate the stdio streams so their buffering matches the new files.
+    sys.stdin = sys.__stdin__ = open(0, "r", closefd=False)
+    sys.stdout = sys.__stdout__ = open(
+        1, "w", buffering=1 if os.isatty(1) else -1, closefd=False
+    )
+    sys.stderr = sys.__stderr__ = open(
+        2, "w", buffering=1, errors="backslashreplace", closefd=False
+    )
+    os.environ.clear()
+    os.environ.update(request["env"])
+    os.chdir(request["cwd"])
+    sys.argv = request["argv"]
+
+
+# Created by main()
+_startup_profiler = None
+
+
 def main():
+    global _startup_profiler
+
+    _startup_profiler = _create_startup_profiler()
     print_verbose("initial argv:", values=sys.argv)
     print_verbose("initial cwd:", os.getcwd())
     print_verbose("initial environ:", mapping=os.environ)
@@ -499,9 +1160,8 @@ def main():
         if IS_WINDOWS:
             main_rel_path = main_rel_path.replace("/", os.sep)
 
-        runfiles_root = find_runfiles_root(main_rel_path)
-    else:
-        runfiles_root = find_runfiles_root("")
+    with _profile_phase("stage2: find_runfiles_root"):
+        runfiles_root = find_runfiles_root(main_rel_path or "")
 
     site_packages = os.path.join(runfiles_root, VENV_ROOT, VENV_SITE_PACKAGES)
     if site_packages not in sys.path and os.path.exists(site_packages):
@@ -518,7 +1178,8 @@ def main():
         print_verbose(
             f"sys.path missing expected site-packages: adding {site_packages}"
         )
-        _add_site_packages(site_packages)
+        with _profile_phase("stage2: add_site_packages"):
+            _add_site_packages(site_packages)
 
     print_verbose("runfiles root:", runfiles_root)
 
@@ -526,6 +1187,12 @@ def main():
     if runfiles_envkey:
         os.environ[runfiles_envkey] = runfiles_envvalue
 
+    forkserver_socket = os.environ.pop(_FORKSERVER_SOCKET_ENVVAR, None)
+    if not forkserver_socket and _forkserver_enabled():
+        exit_code = _forkserver_run(runfiles_root)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
     if MAIN_PATH:
         # Recreate the "add main's dir to sys.path[0]" behavior to match the
         # system-python bootstrap / typical Python behavior.
@@ -569,6 +1236,10 @@ def main():
     else:
         main_filename = None
 
+    if forkserver_socket:
+        # Only returns in the children forked to run the program.
+        _forkserver_serve(forkserver_socket, runfiles_root)
+
     if os.environ.get("COVERAGE_DIR"):
         import _bazel_site_init
 
@@ -577,11 +1248,12 @@ def main():
         coverage_enabled = False
 
     with _maybe_collect_coverage(enable=coverage_enabled):
-        if MAIN_PATH:
-            # The first arg is this bootstrap, so drop that for the re-invocation.
-            _run_py_path(main_filename, args=sys.argv[1:])
-        else:
-            _run_py_module(MAIN_MODULE)
+        with _profile_phase("main"):
+            if MAIN_PATH:
+                # The first arg is this bootstrap, so drop that for the re-invocation.
+                _run_py_path(main_filename, args=sys.argv[1:])
+            else:
+                _run_py_module(MAIN_MODULE)
         sys.exit(0)
 
 
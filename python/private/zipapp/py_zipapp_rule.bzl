@@ -53,6 +53,11 @@ def _create_zipapp_main_py(ctx, py_runtime, py_executable, stage2_bootstrap, run
         ),
         format = "--substitution=%s",
     )
+    if py_executable.main:
+        main_path = runfiles_root_path(ctx, py_executable.main.short_path)
+    else:
+        main_path = ""
+    args.add("%main%=" + main_path, format = "--substitution=%s")
     args.add("%python_binary%=" + venv_python_exe_path, format = "--substitution=%s")
     args.add("%python_binary_actual%=" + python_binary_actual_path, format = "--substitution=%s")
     args.add("%stage2_bootstrap%=" + runfiles_root_path(ctx, stage2_bootstrap.short_path), format = "--substitution=%s")
@@ -33,6 +33,9 @@ from os.path import basename, dirname, join, normpath  # noqa: E402
 
 # runfiles-root-relative path
 _STAGE2_BOOTSTRAP = "%stage2_bootstrap%"
+# runfiles-root-relative path to the main Python source file. Empty if a main
+# module is used instead.
+_MAIN_PATH = "%main%"
 # runfiles-root-relative path to venv's bin/python3. Empty if venv not being used.
 _PYTHON_BINARY_VENV = "%python_binary%"
 # runfiles-root-relative path, absolute path, or single word. The actual Python
@@ -44,6 +47,16 @@ EXTRACT_DIR = "%EXTRACT_DIR%"
 APP_HASH = "%APP_HASH%"
 
 EXTRACT_ROOT = os.environ.get("RULES_PYTHON_EXTRACT_ROOT")
+# File created in an extraction directory under EXTRACT_ROOT once the zip has
+# been fully extracted into it.
+EXTRACTION_MARKER = ".rules_python_extracted"
+# When set, pure-Python source files are imported directly from the zip instead
+# of being extracted.
+IMPORT_FROM_ZIP = os.environ.get("RULES_PYTHON_ZIPAPP_IMPORT_FROM_ZIP") == "1"
+# The environment variables that pass the zip path and the runfiles root
+# extracted from it to the site init code when importing from the zip.
+ZIPAPP_ARCHIVE_ENV = "RULES_PYTHON_ZIPAPP_ARCHIVE"
+ZIPAPP_RUNFILES_ROOT_ENV = "RULES_PYTHON_ZIPAPP_RUNFILES_ROOT"
 IS_WINDOWS = os.name == "nt"
 
 
@@ -58,6 +71,7 @@ if IS_WINDOWS:
         return s.replace("/", "\\")
 
     _STAGE2_BOOTSTRAP = norm_slashes(_STAGE2_BOOTSTRAP)
+    _MAIN_PATH = norm_slashes(_MAIN_PATH)
     _PYTHON_BINARY_VENV = norm_slashes(_PYTHON_BINARY_VENV)
     _PYTHON_BINARY_ACTUAL = norm_slashes(_PYTHON_BINARY_ACTUAL)
     EXTRACT_DIR = norm_slashes(EXTRACT_DIR)
@@ -158,7 +172,93 @@ def find_binary(runfiles_root, bin_name):
         return search_path(bin_name)
 
 
-def extract_zip(zip_path, dest_dir):
+def is_symlink_entry(info):
+    # The Unix st_mode bits (see "man 7 inode") are stored in the upper 16
+    # bits of external_attr. Symlink bit in st_mode is 0o120000.
+    return ((info.external_attr >> 16) & 0o170000) == 0o120000
+
+
+def create_zip_import_filter(zf):
+    """Creates a filter for the entries that can be imported from the zip.
+
+    Python source files can be imported from the zip by the stage 2 bootstrap,
+    so they don't need to be extracted. Everything else (e.g. extension
+    modules and data files) is still extracted, as are the source files that
+    must exist on disk before the stage 2 bootstrap can import from the zip:
+    the interpreter's files, the venv, the bootstrap and main files, and
+    anything a symlink in the zip points to.
+
+    Args:
+        zf: The opened zip file.
+
+    Returns:
+        A function that takes a ZipInfo and returns True if it doesn't need to
+        be extracted.
+    """
+    keep_paths = set()
+    keep_prefixes = set()
+    for rf_path in (_STAGE2_BOOTSTRAP, _MAIN_PATH):
+        if rf_path:
+            keep_paths.add("runfiles/" + rf_path.replace("\\", "/"))
+    if _PYTHON_BINARY_VENV:
+        venv_root = dirname(dirname(_PYTHON_BINARY_VENV.replace("\\", "/")))
+        keep_prefixes.add("runfiles/" + venv_root)
+    python_actual = _PYTHON_BINARY_ACTUAL.replace("\\", "/")
+    if "/" in python_actual and not os.path.isabs(_PYTHON_BINARY_ACTUAL):
+        # The interpreter is in the runfiles, so keep its whole repository.
+        keep_prefixes.add("runfiles/" + python_actual.partition("/")[0])
+    for info in zf.infolist():
+        if is_symlink_entry(info):
+            target = zf.read(info).decode("utf-8").replace("\\", "/")
+            keep_prefixes.add(normpath(join(dirname(info.filename), target)))
+    # normpath converts slashes on Windows, but zip entries use forward slashes.
+    keep_prefixes = {p.replace("\\", "/") for p in keep_prefixes}
+
+    def can_import_from_zip(info):
+        name = info.filename
+        if (
+            not name.startswith("runfiles/")
+            or not name.endswith(".py")
+            or name in keep_paths
+            or is_symlink_entry(info)
+        ):
+            return False
+        prefix = name
+        while "/" in prefix:
+            prefix = prefix.rpartition("/")[0]
+            if prefix in keep_prefixes:
+                return False
+        return True
+
+    return can_import_from_zip
+
+
+def get_extract_workers():
+    """Returns the number of threads to extract the zip with."""
+    value = os.environ.get("RULES_PYTHON_ZIPAPP_EXTRACT_WORKERS")
+    if value:
+        try:
+            return max(1, int(value))
+        except ValueError:
+            print_verbose(
+                "ignoring invalid RULES_PYTHON_ZIPAPP_EXTRACT_WORKERS:", value
+            )
+    return min(8, os.cpu_count() or 1)
+
+
+def remove_existing_file(file_path):
+    # If the file exists, it might be a symlink or read-only file from a previous extraction.
+    # Unlink it first so writing it doesn't corrupt the symlink target or fail on read-only files.
+    if os.path.lexists(file_path) and not os.path.isdir(file_path):
+        try:
+            os.unlink(file_path)
+        except OSError:
+            # On Windows, unlinking a read-only file fails.
+            os.chmod(file_path, stat.S_IWRITE)
+            os.unlink(file_path)
+
+
+def extract_zip(zip_path, dest_dir, import_from_zip=False):
     """Extracts the contents of a zip file, preserving the unix file mode bits.
 
     These include the permission bits, and in particular, the executable bit.
@@ -166,53 +266,180 @@ def extract_zip(zip_path, dest_dir):
     Ideally the zipfile module should set these bits, but it doesn't. See:
     https://bugs.python.org/issue15795.
 
+    Extraction happens in three passes: all directories are created, then the
+    regular files are written by a pool of threads (see
+    `RULES_PYTHON_ZIPAPP_EXTRACT_WORKERS`) that each use their own handle on
+    the zip, and finally symlinks are created and mode bits are set.
+
     Args:
         zip_path: The path to the zip file to extract
         dest_dir: The path to the destination directory
+        import_from_zip: If True, Python source files that can be imported
+            from the zip aren't extracted. Their directories are still created.
     """
     zip_path = get_windows_path_with_unc_prefix(zip_path)
     dest_dir = get_windows_path_with_unc_prefix(dest_dir)
     with zipfile.ZipFile(zip_path) as zf:
+        can_import_from_zip = create_zip_import_filter(zf) if import_from_zip else None
+        dirs = set()
+        files = []
+        symlinks = []
         for info in zf.infolist():
             file_path = os.path.abspath(join(dest_dir, info.filename))
-            # If the file exists, it might be a symlink or read-only file from a previous extraction.
-            # Unlink it first so zipfile.extract doesn't corrupt the symlink target or fail on read-only files.
-            if os.path.lexists(file_path) and not os.path.isdir(file_path):
+            if info.is_dir():
+                dirs.add(file_path)
+                continue
+            # The directory must exist even for files that are imported from
+            # the zip so sys.path setup, which checks for directories, behaves
+            # as if the file was extracted.
+            dirs.add(dirname(file_path))
+            if can_import_from_zip and can_import_from_zip(info):
+                continue
+            if is_symlink_entry(info):
+                symlinks.append((info, file_path))
+            else:
+                files.append((info, file_path))
+
+        for dir_path in sorted(dirs):
+            os.makedirs(dir_path, exist_ok=True)
+
+        workers = min(get_extract_workers(), len(files))
+        if workers > 1:
+            _extract_files_parallel(zip_path, files, workers)
+        else:
+            for info, file_path in files:
+                _extract_file(zf, info, file_path)
+
+        for info, file_path in symlinks:
+            target = zf.read(info).decode("utf-8")
+            remove_existing_file(file_path)
+            if IS_WINDOWS:
+                entry_path = normpath(join(dirname(info.filename), target))
+                # Zip lookup uses forward slashes, target has backslashes.
+                entry_path = entry_path.replace("\\", "/")
                 try:
-                    os.unlink(file_path)
-                except OSError:
-                    # On Windows, unlinking a read-only file fails.
-                    os.chmod(file_path, stat.S_IWRITE)
-                    os.unlink(file_path)
-
-            zf.extract(info, dest_dir)
-            # The Unix st_mode bits (see "man 7 inode") are stored in the upper 16
-            # bits of external_attr.
+                    target_is_directory = zf.getinfo(entry_path).is_dir()
+                except KeyError:
+                    # Directories aren't stored in zips, so a missing
+                    # target means it points to a directory.
+                    target_is_directory = True
+            else:
+                target_is_directory = False
+            os.symlink(target, file_path, target_is_directory=target_is_directory)
+
+        for info, file_path in files:
             attrs = info.external_attr >> 16
-            # Symlink bit in st_mode is 0o120000.
-            if (attrs & 0o170000) == 0o120000:
-                with open(file_path, "r") as f:
-                    target = f.read()
-                os.remove(file_path)
-                if IS_WINDOWS:
-                    entry_path = normpath(join(dirname(info.filename), target))
-                    # Zip lookup uses forward slashes, target has backslashes.
-                    entry_path = entry_path.replace("\\", "/")
-                    try:
-                        target_is_directory = zf.getinfo(entry_path).is_dir()
-                    except KeyError:
-                        # Directories aren't stored in zips, so a missing
-                        # target means it points to a directory.
-                        target_is_directory = True
-                else:
-                    target_is_directory = False
-                os.symlink(target, file_path, target_is_directory=target_is_directory)
             # Of those, we set the lower 12 bits, which are the
             # file mode bits (since the file type bits can't be set by chmod anyway).
-            elif attrs != 0:  # Rumor has it these can be 0 for zips created on Windows.
+            if attrs != 0:  # Rumor has it these can be 0 for zips created on Windows.
                 os.chmod(file_path, attrs & 0o7777)
 
 
+def _extract_file(zf, info, file_path):
+    remove_existing_file(file_path)
+    with zf.open(info) as src, open(file_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def _extract_files_parallel(zip_path, files, workers):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    # A ZipFile's underlying file object is shared by its readers, so each
+    # thread opens its own handle.
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+
+    def extract(item):
+        zf = getattr(local, "zf", None)
+        if zf is None:
+            zf = local.zf = zipfile.ZipFile(zip_path)
+            with handles_lock:
+                handles.append(zf)
+        _extract_file(zf, *item)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Consume the results so that errors are raised.
+            for _ in executor.map(extract, files):
+                pass
+    finally:
+        for zf in handles:
+            zf.close()
+
+
+def extract_zip_cached(zip_path, extract_root, import_from_zip=False):
+    """Extracts a zip file to a reusable directory unless it's already there.
+
+    The zip is extracted into a temporary sibling directory that is then
+    renamed to `extract_root`, and a marker file is created once the
+    extraction is complete. This allows concurrent and subsequent runs of the
+    same app to skip extraction entirely, and never observe a partially
+    extracted directory.
+
+    A directory without the marker, left by an interrupted or older
+    extraction, is moved aside and replaced by a fresh extraction, rather
+    than extracted over.
+
+    Args:
+        zip_path: The path to the zip file to extract
+        extract_root: The path to the directory to extract to. Its name is
+            expected to be unique to the contents of the zip file.
+        import_from_zip: See `extract_zip`.
+    """
+    marker = join(extract_root, EXTRACTION_MARKER)
+    if os.path.exists(marker):
+        print_verbose("reusing extraction:", extract_root)
+        return
+
+    parent_dir = dirname(extract_root)
+    os.makedirs(parent_dir, exist_ok=True)
+    prefix = basename(extract_root) + "."
+    tmp_root = tempfile.mkdtemp(".tmp", prefix, parent_dir)
+    stale_root = None
+    try:
+        extract_zip(zip_path, tmp_root, import_from_zip)
+        with open(join(tmp_root, EXTRACTION_MARKER), "w"):
+            pass
+        try:
+            os.rename(tmp_root, extract_root)
+            return
+        except OSError:
+            # Either another process finished extracting first, or a directory
+            # without a marker was left by an interrupted or older extraction.
+            if os.path.exists(marker):
+                return
+
+        print_verbose("replacing incomplete extraction:", extract_root)
+        stale_root = tempfile.mkdtemp(".stale", prefix, parent_dir)
+        stale = join(stale_root, "extraction")
+        try:
+            os.rename(extract_root, stale)
+        except OSError:
+            # Another process moved it aside first.
+            pass
+        else:
+            if os.path.exists(join(stale, EXTRACTION_MARKER)):
+                # Another process completed its extraction in the meantime, so
+                # put it back instead.
+                _rename_unless_extracted(stale, extract_root)
+                return
+        _rename_unless_extracted(tmp_root, extract_root)
+    finally:
+        shutil.rmtree(tmp_root, True)
+        if stale_root:
+            shutil.rmtree(stale_root, True)
+
+
+def _rename_unless_extracted(src, extract_root):
+    try:
+        os.rename(src, extract_root)
+    except OSError:
+        if not os.path.exists(join(extract_root, EXTRACTION_MARKER)):
+            raise
+
+
 # Create the runfiles tree by extracting the zip file
 def create_runfiles_root():
     if EXTRACT_ROOT:
@@ -224,10 +451,14 @@ def create_runfiles_root():
         else:
             extract_root = join(EXTRACT_ROOT, EXTRACT_DIR, APP_HASH)
             extract_root = get_windows_path_with_unc_prefix(extract_root)
+        if IMPORT_FROM_ZIP:
+            # A partial extraction must not be reused for a full one.
+            extract_root += "-zipimport"
+        extract_zip_cached(dirname(__file__), extract_root, IMPORT_FROM_ZIP)
     else:
         extract_root = tempfile.mkdtemp("", "Bazel.runfiles_")
+        extract_zip(dirname(__file__), extract_root, IMPORT_FROM_ZIP)
 
-    extract_zip(dirname(__file__), extract_root)
     print_verbose("extracted to:", extract_root)
     # IMPORTANT: Later code does `rm -fr` on dirname(runfiles_root) -- it's
     # important that deletion code be in sync with this directory structure
@@ -333,6 +564,8 @@ def main():
     print_verbose("initial argv:", values=sys.argv)
     print_verbose("initial environ:", mapping=os.environ)
     print_verbose("stage2_bootstrap:", _STAGE2_BOOTSTRAP)
+    print_verbose("main:", _MAIN_PATH)
+    print_verbose("import_from_zip:", IMPORT_FROM_ZIP)
     print_verbose("python_binary_venv:", _PYTHON_BINARY_VENV)
     print_verbose("python_binary_actual:", _PYTHON_BINARY_ACTUAL)
     print_verbose("workspace_name:", _WORKSPACE_NAME)
@@ -351,6 +584,16 @@ def main():
 
     new_env["RUNFILES_DIR"] = runfiles_root
 
+    # Tell the site init code, in this and in any child Python process using
+    # the same runfiles, to import the files that weren't extracted from the
+    # zip. Unset otherwise, so values inherited from another zipapp aren't used.
+    if IMPORT_FROM_ZIP:
+        new_env[ZIPAPP_ARCHIVE_ENV] = os.path.abspath(dirname(__file__))
+        new_env[ZIPAPP_RUNFILES_ROOT_ENV] = runfiles_root
+    else:
+        os.environ.pop(ZIPAPP_ARCHIVE_ENV, None)
+        os.environ.pop(ZIPAPP_RUNFILES_ROOT_ENV, None)
+
     # Don't prepend a potentially unsafe path to sys.path
     # See: https://docs.python.org/3.11/using/cmdline.html#envvar-PYTHONSAFEPATH
     new_env["PYTHONSAFEPATH"] = "1"
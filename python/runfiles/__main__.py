@@ -0,0 +1,49 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Writes the index of runfiles manifests.
+
+Usage: python -m runfiles [--output INDEX] MANIFEST...
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from .runfiles import WriteManifestIndex
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m runfiles",
+        description="Writes the index of runfiles manifests, so manifest-based "
+        "runfiles lookups don't have to parse the manifests.",
+    )
+    parser.add_argument(
+        "--output",
+        help="Path of the index to write; only valid with a single manifest. "
+        "Defaults to the manifest path with the `.index` suffix.",
+    )
+    parser.add_argument("manifests", nargs="+", metavar="MANIFEST")
+    args = parser.parse_args(argv)
+    if args.output and len(args.manifests) > 1:
+        parser.error("--output requires a single manifest")
+    for manifest in args.manifests:
+        WriteManifestIndex(manifest, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
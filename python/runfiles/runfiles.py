@@ -25,13 +25,17 @@ dependency graphs under bzlmod.
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import inspect
+import mmap
 import os
 import pathlib
 import posixpath
+import struct
 import sys
 from collections import defaultdict
-from collections.abc import Generator
+from collections.abc import Generator, Iterable
 from typing import cast
 
 if sys.version_info >= (3, 11):
@@ -43,6 +47,14 @@ elif sys.version_info >= (3, 10):
 else:
     from typing import Any as Self
 
+# The maximum number of resolved runfiles `Runfiles.Rlocation` remembers.
+_RLOCATION_CACHE_SIZE = 4096
+
+# Set by a zipapp that imports its Python source files from the zip, see
+# RULES_PYTHON_ZIPAPP_IMPORT_FROM_ZIP. The files of such modules are located at
+# `<zipapp>/runfiles/<runfiles path>`.
+_ZIPAPP_ARCHIVE_ENV = "RULES_PYTHON_ZIPAPP_ARCHIVE"
+
 
 class _RepositoryMapping:
     """Repository mapping for resolving apparent repository names to canonical ones.
@@ -64,15 +76,21 @@ class _RepositoryMapping:
         """
         self._exact_mappings = exact_mappings
 
-        # Group prefixed mappings by target_apparent for faster lookups
-        self._grouped_prefixed_mappings = defaultdict(list)
-        for (
-            prefix_source,
-            target_app,
-        ), target_canonical in prefixed_mappings.items():
-            self._grouped_prefixed_mappings[target_app].append(
-                (prefix_source, target_canonical)
-            )
+        # Group prefixed mappings by target_apparent and index them by prefix,
+        # remembering the position of each mapping because the first matching
+        # one wins. A lookup then only has to check one prefix of the source
+        # repo per distinct prefix length instead of every mapping.
+        grouped: dict[str, dict[str, tuple[int, str]]] = defaultdict(dict)
+        for position, ((prefix_source, target_app), target_canonical) in enumerate(
+            prefixed_mappings.items()
+        ):
+            grouped[target_app].setdefault(prefix_source, (position, target_canonical))
+        self._grouped_prefixed_mappings: dict[
+            str, tuple[list[int], dict[str, tuple[int, str]]]
+        ] = {
+            target_app: (sorted({len(prefix) for prefix in by_prefix}), by_prefix)
+            for target_app, by_prefix in grouped.items()
+        }
 
     @staticmethod
     def create_from_file(repo_mapping_path: str | None) -> _RepositoryMapping:
@@ -135,11 +153,16 @@ class _RepositoryMapping:
 
         # Try prefixed mapping if no exact match found
         if target_apparent in self._grouped_prefixed_mappings:
-            for prefix_source, target_canonical in self._grouped_prefixed_mappings[
-                target_apparent
-            ]:
-                if source_repo.startswith(prefix_source):
-                    return target_canonical
+            prefix_lengths, by_prefix = self._grouped_prefixed_mappings[target_apparent]
+            match = None
+            for prefix_length in prefix_lengths:
+                if prefix_length > len(source_repo):
+                    break
+                candidate = by_prefix.get(source_repo[:prefix_length])
+                if candidate is not None and (match is None or candidate < match):
+                    match = candidate
+            if match is not None:
+                return match[1]
 
         # No mapping found
         return None
@@ -395,16 +418,327 @@ class Path(pathlib.Path):
         return self._runfiles.root(source_repo=self._source_repo)
 
 
-class _ManifestBased:
-    """`Runfiles` strategy that parses a runfiles-manifest to look up runfiles."""
+class _ManifestIndex:
+    """A sorted, binary index of a runfiles manifest that is looked up via mmap.
+
+    The index is stored next to the manifest, in a file with the same name plus
+    the `.index` suffix. It lets the manifest-based strategy resolve runfiles
+    by binary search without parsing the whole manifest into memory.
+
+    The file layout (all integers are little-endian) is:
+
+    * 8 bytes: the magic `_MAGIC`.
+    * 8 bytes: the size of the manifest the index was created from.
+    * 8 bytes: the modification time of that manifest, in nanoseconds.
+    * 32 bytes: the SHA-256 digest of that manifest.
+    * 8 bytes: the number of entries `N`.
+    * `N` * 8 bytes: the offsets of the entries, sorted by their UTF-8 encoded
+      runfiles path.
+    * The entries, each being a 4 byte path length, a 4 byte target length,
+      then the UTF-8 encoded path and target.
+
+    An index is used only if it was created from the manifest next to it. The
+    manifest's size and modification time are checked first; if only the
+    modification time differs, e.g. because the runfiles tree was copied, the
+    manifest is hashed and compared with the recorded digest.
+    """
+
+    SUFFIX = ".index"
+    _MAGIC = b"RFMIDX02"
+    _HEADER = struct.Struct("<8sQq32sQ")
+    _OFFSET = struct.Struct("<Q")
+    _ENTRY = struct.Struct("<II")
+    _BLOCK_SIZE = 1 << 20
+
+    def __init__(self, data: mmap.mmap, count: int) -> None:
+        self._data = data
+        self._count = count
+        self._offsets_start = _ManifestIndex._HEADER.size
+
+    @staticmethod
+    def Open(manifest_path: str) -> _ManifestIndex | None:
+        """Opens the index of a manifest.
+
+        Args:
+            manifest_path: Path to the runfiles manifest.
+
+        Returns:
+            The index, or None if there is no index or it doesn't match the
+            manifest, in which case the manifest has to be parsed.
+        """
+        try:
+            with open(manifest_path + _ManifestIndex.SUFFIX, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # A missing or empty index is not an error, the manifest is used.
+            return None
+
+        try:
+            if _ManifestIndex._Matches(data, manifest_path):
+                (count,) = _ManifestIndex._OFFSET.unpack_from(
+                    data, _ManifestIndex._HEADER.size - _ManifestIndex._OFFSET.size
+                )
+                return _ManifestIndex(data, count)
+        except OSError:
+            pass
+        data.close()
+        return None
+
+    @staticmethod
+    def _Matches(data: mmap.mmap, manifest_path: str) -> bool:
+        """Returns whether the index in `data` was created from the manifest."""
+        if len(data) < _ManifestIndex._HEADER.size:
+            return False
+        magic, size, mtime_ns, digest, _ = _ManifestIndex._HEADER.unpack_from(data, 0)
+        if magic != _ManifestIndex._MAGIC:
+            # The index is from an incompatible version.
+            return False
+        st = os.stat(manifest_path)
+        if size != st.st_size:
+            return False
+        if mtime_ns == st.st_mtime_ns:
+            return True
+        return digest == _ManifestIndex._Digest(manifest_path)
+
+    @staticmethod
+    def _Digest(manifest_path: str) -> bytes:
+        h = hashlib.sha256()
+        with open(manifest_path, "rb") as f:
+            for block in iter(lambda: f.read(_ManifestIndex._BLOCK_SIZE), b""):
+                h.update(block)
+        return h.digest()
+
+    @staticmethod
+    def Write(manifest_path: str, index_path: str | None = None) -> None:
+        """Writes the index of a runfiles manifest.
+
+        Args:
+            manifest_path: Path to the runfiles manifest.
+            index_path: Path of the index to write. Defaults to the manifest
+                path with the `.index` suffix, which is where `Open` looks.
+        """
+        if index_path is None:
+            index_path = manifest_path + _ManifestIndex.SUFFIX
+        # Stat before reading, so a manifest modified meanwhile doesn't match.
+        st = os.stat(manifest_path)
+        with open(manifest_path, "rb") as f:
+            content = f.read()
+        lines = content.decode("utf-8").split("\n")
+        if not lines[-1]:
+            lines.pop()
+        runfiles = {}
+        for line in lines:
+            link, target = _ManifestBased._ParseLine(line)
+            runfiles[link] = target
+        entries = sorted(
+            (link.encode("utf-8"), target.encode("utf-8"))
+            for link, target in runfiles.items()
+        )
+
+        offset = _ManifestIndex._HEADER.size + _ManifestIndex._OFFSET.size * len(
+            entries
+        )
+        offsets = []
+        for link, target in entries:
+            offsets.append(_ManifestIndex._OFFSET.pack(offset))
+            offset += _ManifestIndex._ENTRY.size + len(link) + len(target)
+
+        # Write to a temporary file first, so readers never see a partial index.
+        tmp_path = "{}.{}.tmp".format(index_path, os.getpid())
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(
+                    _ManifestIndex._HEADER.pack(
+                        _ManifestIndex._MAGIC,
+                        st.st_size,
+                        st.st_mtime_ns,
+                        hashlib.sha256(content).digest(),
+                        len(entries),
+                    )
+                )
+                f.writelines(offsets)
+                for link, target in entries:
+                    f.write(_ManifestIndex._ENTRY.pack(len(link), len(target)))
+                    f.write(link)
+                    f.write(target)
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _Entry(self, i: int) -> tuple[bytes, int, int]:
+        """Returns the path and the bounds of the target of the i-th entry."""
+        (offset,) = _ManifestIndex._OFFSET.unpack_from(
+            self._data, self._offsets_start + i * _ManifestIndex._OFFSET.size
+        )
+        link_len, target_len = _ManifestIndex._ENTRY.unpack_from(self._data, offset)
+        link_start = offset + _ManifestIndex._ENTRY.size
+        target_start = link_start + link_len
+        return (
+            self._data[link_start:target_start],
+            target_start,
+            target_start + target_len,
+        )
+
+    def get(self, path: str) -> str | None:
+        """Returns the target of `path`, or None if it isn't in the index."""
+        key = path.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            link, target_start, target_end = self._Entry(mid)
+            if link < key:
+                lo = mid + 1
+            elif link > key:
+                hi = mid
+            else:
+                return self._data[target_start:target_end].decode("utf-8")
+        return None
+
+
+class _LazyManifest:
+    """A runfiles manifest that is only searched for the entries looked up.
+
+    Bazel writes the entries of a runfiles manifest sorted by their runfiles
+    path, so an entry can be found by bisecting the memory-mapped manifest on
+    line boundaries. The results, including misses, are remembered, so memory
+    scales with the number of lookups instead of with the size of the
+    manifest.
+
+    Bisecting requires the entries to be sorted by their UTF-8 encoded path.
+    Some manifests aren't, e.g. on Windows paths are sorted
+    case-insensitively. Checking the whole manifest would defeat the point of
+    being lazy, so only the entries around where a missing entry would be are
+    checked. If they are out of order, the manifest is parsed and looked up
+    like in the non-lazy mode from then on.
+    """
+
+    # The number of entries checked on each side of where a missing entry
+    # would be.
+    _ORDER_CHECK_ENTRIES = 4
 
     def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            try:
+                self._data: mmap.mmap | bytes = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:
+                # Empty files can't be mapped.
+                self._data = b""
+        self._cache: dict[str, str | None] = {}
+        self._runfiles: dict[str, str] | None = None
+
+    def get(self, path: str) -> str | None:
+        """Returns the target of `path`, or None if it isn't in the manifest."""
+        if self._runfiles is not None:
+            return self._runfiles.get(path)
+        try:
+            return self._cache[path]
+        except KeyError:
+            pass
+        target, position = self._Find(path.encode("utf-8"))
+        if target is None and not self._IsSortedAround(position):
+            self._runfiles = dict(self._Entries())
+            self._cache.clear()
+            return self._runfiles.get(path)
+        self._cache[path] = target
+        return target
+
+    def _Entries(self) -> Generator[tuple[str, str], None, None]:
+        data = self._data
+        start = 0
+        while start < len(data):
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = len(data)
+            yield _ManifestBased._ParseLine(data[start:end].decode("utf-8"))
+            start = end + 1
+
+    def _LinkKey(self, start: int, end: int) -> bytes:
+        link, _ = _ManifestBased._ParseLine(self._data[start:end].decode("utf-8"))
+        return link.encode("utf-8")
+
+    def _IsSortedAround(self, position: int) -> bool:
+        """Returns whether the entries around `position` are sorted.
+
+        Args:
+          position: The start of a line, or the end of the data.
+        """
+        data = self._data
+        # Start from up to _ORDER_CHECK_ENTRIES lines before position.
+        start = position
+        for _ in range(self._ORDER_CHECK_ENTRIES):
+            if start == 0:
+                break
+            newline = data.rfind(b"\n", 0, start - 1)
+            start = 0 if newline == -1 else newline + 1
+        previous = None
+        for _ in range(2 * self._ORDER_CHECK_ENTRIES):
+            if start >= len(data):
+                break
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = len(data)
+            link_key = self._LinkKey(start, end)
+            if previous is not None and link_key < previous:
+                return False
+            previous = link_key
+            start = end + 1
+        return True
+
+    def _Find(self, key: bytes) -> tuple[str | None, int]:
+        """Bisects the manifest for `key`.
+
+        Returns:
+          The target of `key`, or None if it wasn't found, and the start of the
+          line where the entry is or would be.
+        """
+        data = self._data
+        # lo is always the start of a line and hi is the end of the range to
+        # search, which is either the start of a line or the end of the data.
+        lo, hi = 0, len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            newline = data.rfind(b"\n", lo, mid)
+            start = lo if newline == -1 else newline + 1
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = len(data)
+            link, target = _ManifestBased._ParseLine(data[start:end].decode("utf-8"))
+            link_key = link.encode("utf-8")
+            if link_key < key:
+                lo = end + 1
+            elif link_key > key:
+                hi = start
+            else:
+                return target, start
+        return None, lo
+
+
+class _ManifestBased:
+    """`Runfiles` strategy that parses a runfiles-manifest to look up runfiles.
+
+    If the manifest has a `_ManifestIndex` next to it, the index is used
+    instead of parsing the manifest. Otherwise, in lazy mode, the manifest is
+    searched on demand by `_LazyManifest`.
+    """
+
+    def __init__(self, path: str, lazy: bool = False) -> None:
         if not path:
             raise ValueError()
         if not isinstance(path, str):
             raise TypeError()
         self._path = path
-        self._runfiles = _ManifestBased._LoadRunfiles(path)
+        self._runfiles: dict[str, str] | _ManifestIndex | _LazyManifest
+        index = _ManifestIndex.Open(path)
+        if index is not None:
+            self._runfiles = index
+        elif lazy:
+            self._runfiles = _LazyManifest(path)
+        else:
+            self._runfiles = _ManifestBased._LoadRunfiles(path)
 
     def RlocationChecked(self, path: str) -> str | None:
         """Returns the runtime path of a runfile."""
@@ -430,26 +764,30 @@ class _ManifestBased:
         result = {}
         with open(path, "r", encoding="utf-8", newline="\n") as f:
             for line in f:
-                line = line.rstrip("\n")
-                if line.startswith(" "):
-                    # In lines that start with a space, spaces, newlines, and backslashes are escaped as \s, \n, and \b in
-                    # link and newlines and backslashes are escaped in target.
-                    escaped_link, escaped_target = line[1:].split(" ", maxsplit=1)
-                    link = (
-                        escaped_link.replace(r"\s", " ")
-                        .replace(r"\n", "\n")
-                        .replace(r"\b", "\\")
-                    )
-                    target = escaped_target.replace(r"\n", "\n").replace(r"\b", "\\")
-                else:
-                    link, target = line.split(" ", maxsplit=1)
-
-                if target:
-                    result[link] = target
-                else:
-                    result[link] = link
+                link, target = _ManifestBased._ParseLine(line.rstrip("\n"))
+                result[link] = target
         return result
 
+    @staticmethod
+    def _ParseLine(line: str) -> tuple[str, str]:
+        """Parses a runfiles manifest line into its link and target."""
+        if line.startswith(" "):
+            # In lines that start with a space, spaces, newlines, and backslashes are escaped as \s, \n, and \b in
+            # link and newlines and backslashes are escaped in target.
+            escaped_link, escaped_target = line[1:].split(" ", maxsplit=1)
+            link = (
+                escaped_link.replace(r"\s", " ")
+                .replace(r"\n", "\n")
+                .replace(r"\b", "\\")
+            )
+            target = escaped_target.replace(r"\n", "\n").replace(r"\b", "\\")
+        else:
+            link, target = line.split(" ", maxsplit=1)
+
+        if target:
+            return link, target
+        return link, link
+
     def _GetRunfilesDir(self) -> str:
         if self._path.endswith("/MANIFEST") or self._path.endswith("\\MANIFEST"):
             return self._path[: -len("/MANIFEST")]
@@ -508,6 +846,11 @@ class Runfiles:
         self._repo_mapping = _RepositoryMapping.create_from_file(
             strategy.RlocationChecked("_repo_mapping")
         )
+        # Maps the file of a caller to the canonical name of its repository.
+        self._current_repository_cache: dict[str, str] = {}
+        self._resolve_cached = functools.lru_cache(maxsize=_RLOCATION_CACHE_SIZE)(
+            self._Resolve
+        )
 
     def root(self, source_repo: str | None = None) -> Path:
         """Returns a Path object representing the runfiles root.
@@ -546,6 +889,78 @@ class Runfiles:
           TypeError: if `path` is not a string
           ValueError: if `path` is None or empty, or it's absolute or not normalized
         """
+        Runfiles._CheckPath(path)
+        if os.path.isabs(path):
+            return path
+
+        if source_repo is None and not self._repo_mapping.is_empty():
+            # Look up runfiles using the repository mapping of the caller of the
+            # current method. If the repo mapping is empty, determining this
+            # name is not necessary.
+            source_repo = self.CurrentRepository(frame=2)
+
+        return self._resolve_cached(path, source_repo)
+
+    def RlocationMany(
+        self, paths: Iterable[str], source_repo: str | None = None
+    ) -> list[str | None]:
+        """Returns the runtime paths of many runfiles.
+
+        This is equivalent to calling `Rlocation` for each path, but the
+        caller's repository is determined and each apparent repository name is
+        mapped only once for the whole batch.
+
+        Args:
+          paths: iterable of strings; runfiles-root-relative paths of the
+            runfiles
+          source_repo: string; optional; the canonical name of the repository
+            whose repository mapping should be used. See `Rlocation`.
+        Returns:
+          a list with the result of `Rlocation` for each path, in order
+        Raises:
+          TypeError: if a path is not a string
+          ValueError: if a path is None or empty, or it's absolute or not
+            normalized
+
+        :::{versionadded} VERSION_NEXT_FEATURE
+        :::
+        """
+        if source_repo is None and not self._repo_mapping.is_empty():
+            source_repo = self.CurrentRepository(frame=2)
+
+        target_canonicals: dict[str, str | None] = {}
+        results: list[str | None] = []
+        for path in paths:
+            Runfiles._CheckPath(path)
+            if os.path.isabs(path):
+                results.append(path)
+                continue
+
+            target_repo, _, remainder = path.partition("/")
+            if target_repo in target_canonicals:
+                target_canonical = target_canonicals[target_repo]
+            else:
+                target_canonical = self._repo_mapping.lookup(source_repo, target_repo)
+                target_canonicals[target_repo] = target_canonical
+
+            # See `_Resolve` for when the repository mapping doesn't apply.
+            if not remainder or target_canonical is None:
+                results.append(self._strategy.RlocationChecked(path))
+            else:
+                results.append(
+                    self._strategy.RlocationChecked(target_canonical + "/" + remainder)
+                )
+        return results
+
+    @staticmethod
+    def _CheckPath(path: str) -> None:
+        """Raises an error if `path` isn't a valid runfiles path.
+
+        Raises:
+          TypeError: if `path` is not a string
+          ValueError: if `path` is None or empty, or it's absolute without a
+            drive letter or not normalized
+        """
         if not path:
             raise ValueError()
         if not isinstance(path, str):
@@ -561,15 +976,12 @@ class Runfiles:
             raise ValueError('path is not normalized: "%s"' % path)
         if path[0] == "\\":
             raise ValueError('path is absolute without a drive letter: "%s"' % path)
-        if os.path.isabs(path):
-            return path
 
-        if source_repo is None and not self._repo_mapping.is_empty():
-            # Look up runfiles using the repository mapping of the caller of the
-            # current method. If the repo mapping is empty, determining this
-            # name is not necessary.
-            source_repo = self.CurrentRepository(frame=2)
+    def _Resolve(self, path: str, source_repo: str | None) -> str | None:
+        """Resolves a validated, relative runfiles path.
 
+        Results are cached by `Rlocation` per `(path, source_repo)`.
+        """
         # Split off the first path component, which contains the repository
         # name (apparent or canonical).
         target_repo, _, remainder = path.partition("/")
@@ -644,7 +1056,35 @@ class Runfiles:
             caller_path = inspect.getfile(sys._getframe(frame))
         except (TypeError, ValueError) as exc:
             raise ValueError("failed to determine caller's file path") from exc
-        caller_runfiles_path = os.path.relpath(caller_path, self._python_runfiles_root)
+
+        # Computing the repository of a file is comparatively expensive and
+        # callers typically look up many runfiles from the same few files.
+        repository = self._current_repository_cache.get(caller_path)
+        if repository is None:
+            repository = self._CurrentRepositoryOfFile(caller_path)
+            self._current_repository_cache[caller_path] = repository
+        return repository
+
+    @staticmethod
+    def _ZipappRunfilesPath(caller_path: str) -> str | None:
+        """Returns the runfiles path of a file inside a zipapp, if it is one."""
+        archive = os.environ.get(_ZIPAPP_ARCHIVE_ENV)
+        if not archive:
+            return None
+        prefix = os.path.join(archive, "runfiles") + os.path.sep
+        if not caller_path.startswith(prefix):
+            return None
+        return caller_path[len(prefix) :]
+
+    def _CurrentRepositoryOfFile(self, caller_path: str) -> str:
+        """Returns the canonical name of the repository containing a file."""
+        # Modules imported from a zipapp have a path inside the zip, which has
+        # the same layout as the runfiles root it is extracted to.
+        caller_runfiles_path = self._ZipappRunfilesPath(caller_path)
+        if caller_runfiles_path is None:
+            caller_runfiles_path = os.path.relpath(
+                caller_path, self._python_runfiles_root
+            )
         if caller_runfiles_path.startswith(".." + os.path.sep):
             # With Python 3.10 and earlier, sys.path contains the directory
             # of the script, which can result in a module being loaded from
@@ -686,8 +1126,20 @@ class Runfiles:
     # TODO: Update return type to Self when 3.11 is the min version
     # https://peps.python.org/pep-0673/
     @staticmethod
-    def CreateManifestBased(manifest_path: str) -> "Runfiles":
-        return Runfiles(_ManifestBased(manifest_path))
+    def CreateManifestBased(manifest_path: str, lazy: bool = False) -> "Runfiles":
+        """Returns a new manifest-based `Runfiles` instance.
+
+        Args:
+          manifest_path: string; path to the runfiles manifest.
+          lazy: bool; if True, the manifest isn't parsed upfront, but searched
+            for the runfiles that are looked up. This requires the manifest to
+            be sorted, which manifests written by Bazel are.
+
+        :::{versionadded} VERSION_NEXT_FEATURE
+        The `lazy` argument.
+        :::
+        """
+        return Runfiles(_ManifestBased(manifest_path, lazy=lazy))
 
     # TODO: Update return type to Self when 3.11 is the min version
     # https://peps.python.org/pep-0673/
@@ -698,7 +1150,9 @@ class Runfiles:
     # TODO: Update return type to Self when 3.11 is the min version
     # https://peps.python.org/pep-0673/
     @staticmethod
-    def Create(env: dict[str, str] | None = None) -> Runfiles | None:
+    def Create(
+        env: dict[str, str] | None = None, lazy: bool = False
+    ) -> Runfiles | None:
         """Returns a new `Runfiles` instance.
 
         The returned object is either:
@@ -708,8 +1162,9 @@ class Runfiles:
 
         If `env` contains "RUNFILES_MANIFEST_FILE" with non-empty value, this method
         returns a manifest-based implementation. The object eagerly reads and caches
-        the whole manifest file upon instantiation; this may be relevant for
-        performance consideration.
+        the whole manifest file upon instantiation, unless a `<manifest>.index`
+        file created by `WriteManifestIndex` is next to it or `lazy` is True;
+        this may be relevant for performance consideration.
 
         Otherwise, if `env` contains "RUNFILES_DIR" with non-empty value (checked in
         this priority order), this method returns a directory-based implementation.
@@ -719,13 +1174,20 @@ class Runfiles:
         Args:
         env: {string: string}; optional; the map of environment variables. If None,
             this function uses the environment variable map of this process.
+        lazy: bool; optional; if True, a manifest-based implementation searches
+            the manifest on demand instead of reading it upon instantiation.
+            See `CreateManifestBased`.
         Raises:
         IOError: if some IO error occurs.
+
+        :::{versionadded} VERSION_NEXT_FEATURE
+        The `lazy` argument.
+        :::
         """
         env_map = os.environ if env is None else env
         manifest = env_map.get("RUNFILES_MANIFEST_FILE")
         if manifest:
-            return CreateManifestBased(manifest)
+            return CreateManifestBased(manifest, lazy=lazy)
 
         directory = env_map.get("RUNFILES_DIR")
         if directory:
@@ -736,7 +1198,9 @@ class Runfiles:
     # TODO: Update return type to Self when 3.11 is the min version
     # https://peps.python.org/pep-0673/
     @staticmethod
-    def CreateOrRaise(env: dict[str, str] | None = None) -> Runfiles:
+    def CreateOrRaise(
+        env: dict[str, str] | None = None, lazy: bool = False
+    ) -> Runfiles:
         """Returns a new `Runfiles` instance, or raises an error.
 
         The returned object is either:
@@ -747,8 +1211,8 @@ class Runfiles:
 
         If `env` contains "RUNFILES_MANIFEST_FILE" with non-empty value, this
         method returns a manifest-based implementation. The object eagerly
-        reads and caches the whole manifest file upon instantiation; this may
-        be relevant for performance consideration.
+        reads and caches the whole manifest file upon instantiation, unless
+        `lazy` is True; this may be relevant for performance consideration.
 
         Otherwise, if `env` contains "RUNFILES_DIR" with non-empty value
         (checked in this priority order), this method returns a directory-based
@@ -760,13 +1224,15 @@ class Runfiles:
           env: {string: string}; optional; the map of environment variables. If
             None, this function uses the environment variable map of this
             process.
+          lazy: bool; optional; if True, a manifest-based implementation
+            searches the manifest on demand. See `CreateManifestBased`.
         Raises:
           RuntimeError: if runfiles cannot be found.
 
         :::{versionadded} VERSION_NEXT_FEATURE
         :::
         """
-        runfiles = Runfiles.Create(env=env)
+        runfiles = Runfiles.Create(env=env, lazy=lazy)
         if runfiles is None:
             raise RuntimeError(
                 "Cannot create Runfiles: $RUNFILES_MANIFEST_FILE and $RUNFILES_DIR are both unset or empty"
@@ -778,22 +1244,42 @@ class Runfiles:
 _Runfiles = Runfiles
 
 
-def CreateManifestBased(manifest_path: str) -> Runfiles:
-    return Runfiles.CreateManifestBased(manifest_path)
+def CreateManifestBased(manifest_path: str, lazy: bool = False) -> Runfiles:
+    return Runfiles.CreateManifestBased(manifest_path, lazy=lazy)
 
 
 def CreateDirectoryBased(runfiles_dir_path: str) -> Runfiles:
     return Runfiles.CreateDirectoryBased(runfiles_dir_path)
 
 
-def Create(env: dict[str, str] | None = None) -> Runfiles | None:
-    return Runfiles.Create(env)
+def Create(env: dict[str, str] | None = None, lazy: bool = False) -> Runfiles | None:
+    return Runfiles.Create(env, lazy=lazy)
 
 
-def CreateOrRaise(env: dict[str, str] | None = None) -> Runfiles:
+def CreateOrRaise(env: dict[str, str] | None = None, lazy: bool = False) -> Runfiles:
     """Refer to `Runfiles.CreateOrRaise`.
 
     :::{versionadded} VERSION_NEXT_FEATURE
     :::
     """
-    return Runfiles.CreateOrRaise(env)
+    return Runfiles.CreateOrRaise(env, lazy=lazy)
+
+
+def WriteManifestIndex(manifest_path: str, index_path: str | None = None) -> None:
+    """Writes the index of a runfiles manifest.
+
+    Manifest-based `Runfiles` look up runfiles in the index, by binary search
+    of the memory-mapped file, instead of parsing the whole manifest. The index
+    is only used while it matches the manifest, so it has to be written again
+    whenever the manifest changes. The index can also be written by running
+    `python -m runfiles <manifest>...`.
+
+    Args:
+        manifest_path: Path to the runfiles manifest.
+        index_path: Path of the index to write. Defaults to the manifest path
+            with the `.index` suffix, which is where `Runfiles` look for it.
+
+    :::{versionadded} VERSION_NEXT_FEATURE
+    :::
+    """
+    _ManifestIndex.Write(manifest_path, index_path)
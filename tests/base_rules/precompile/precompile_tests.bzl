@@ -254,6 +254,34 @@ def _test_precompiler_action_impl(env, target):
         "PYTHONSAFEPATH": "1",
     })
 
+def _test_precompile_batch_size(name):
+    rt_util.helper_target(
+        py_library,
+        name = name + "_subject",
+        srcs = ["batch1.py", "batch2.py", "batch3.py"],
+        precompile = "enabled",
+    )
+    analysis_test(
+        name = name,
+        impl = _test_precompile_batch_size_impl,
+        target = name + "_subject",
+        config_settings = _COMMON_CONFIG_SETTINGS | {
+            labels.PRECOMPILE_BATCH_SIZE: 2,
+        },
+    )
+
+_tests.append(_test_precompile_batch_size)
+
+def _test_precompile_batch_size_impl(env, target):
+    compile_actions = [a for a in target.actions if a.mnemonic == "PyCompile"]
+    env.expect.that_collection([
+        [f.basename for f in a.outputs.to_list()]
+        for a in compile_actions
+    ]).contains_exactly([
+        ["batch1.fakepy-45.pyc", "batch2.fakepy-45.pyc"],
+        ["batch3.fakepy-45.pyc"],
+    ])
+
 def _setup_precompile_flag_pyc_collection_attr_interaction(
         *,
         name,
@@ -389,6 +389,75 @@ def _test_explicit_main_cannot_be_ambiguous(name, config):
 
 _tests.append(_test_explicit_main_cannot_be_ambiguous)
 
+def _import_index_runfiles_impl(ctx):
+    tree = ctx.actions.declare_directory(ctx.attr.name + "_site")
+    ctx.actions.run_shell(
+        outputs = [tree],
+        command = "mkdir -p {}/tree_pkg".format(tree.path),
+    )
+    module = ctx.actions.declare_file(ctx.attr.name + "_module.py")
+    ctx.actions.write(module, "")
+    site = "{}/site".format(ctx.label.package)
+    return [DefaultInfo(runfiles = ctx.runfiles(
+        files = [tree],
+        symlinks = {
+            "{}/{}_sym/__init__.py".format(site, ctx.attr.name): module,
+        },
+        root_symlinks = {
+            "{}/{}/{}_rootsym.py".format(ctx.workspace_name, site, ctx.attr.name): module,
+        },
+    ))]
+
+_import_index_runfiles = rule(implementation = _import_index_runfiles_impl)
+
+def _test_import_index(name, config):
+    rt_util.helper_target(_import_index_runfiles, name = name + "_runfiles")
+    rt_util.helper_target(
+        py_library,
+        name = name + "_lib",
+        srcs = [rt_util.empty_file("site/" + name + "_pkg/mod.py")],
+        imports = ["site", name + "_runfiles_site"],
+        data = [name + "_runfiles"],
+    )
+    rt_util.helper_target(
+        config.rule,
+        name = name + "_subject",
+        srcs = [name + "_subject.py"],
+        deps = [name + "_lib"],
+    )
+    analysis_test(
+        name = name,
+        impl = _test_import_index_impl,
+        target = name + "_subject",
+        config_settings = {
+            labels.BOOTSTRAP_IMPL: "script",
+            labels.PYTHON_IMPORT_INDEX: True,
+            "//command_line_option:extra_execution_platforms": ["@bazel_tools//tools:host_platform", platform_targets.LINUX_X86_64],
+            "//command_line_option:platforms": [platform_targets.LINUX_X86_64],
+        },
+    )
+
+def _test_import_index_impl(env, target):
+    actions = [
+        action
+        for action in target.actions
+        if [f for f in action.outputs.to_list() if f.basename == "_bazel_import_index.txt"]
+    ]
+    env.expect.that_collection(actions).has_size(1)
+
+    root = "{}/{}".format(env.ctx.workspace_name, target.label.package)
+    env.expect.that_action(actions[0]).content().split("\n").contains_at_least([
+        # From a file.
+        env.expect.meta.format_str(root + "/site\t{test_name}_pkg"),
+        # From the runfiles symlinks and root symlinks.
+        env.expect.meta.format_str(root + "/site\t{test_name}_runfiles_sym"),
+        env.expect.meta.format_str(root + "/site\t{test_name}_runfiles_rootsym"),
+        # The names in a tree artifact aren't known.
+        env.expect.meta.format_str(root + "/{test_name}_runfiles_site\t*"),
+    ])
+
+_tests.append(_test_import_index)
+
 def _test_explicit_main_cannot_be_ambiguous_impl(env, target):
     env.expect.that_target(target).failures().contains_predicate(
         matching.str_matches("foo.py*matches multiple"),
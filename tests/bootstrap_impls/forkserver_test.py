@@ -0,0 +1,105 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from python.runfiles import runfiles
+
+
+def _wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for {}".format(condition))
+        time.sleep(0.05)
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+class ForkServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bin = runfiles.Create().Rlocation(os.environ["BIN_RLOCATION"])
+        # Keep the socket path short, unix socket paths are limited to ~100
+        # bytes and TEST_TMPDIR is often longer than that.
+        cls.socket_dir = Path(tempfile.mkdtemp(dir="/tmp"))
+        cls.env = dict(
+            os.environ,
+            RULES_PYTHON_FORKSERVER="1",
+            RULES_PYTHON_FORKSERVER_DIR=str(cls.socket_dir),
+            RULES_PYTHON_FORKSERVER_IDLE_TIMEOUT="30",
+        )
+        # The first invocation runs normally and starts the server.
+        cls.run_bin()
+        _wait_for(lambda: any(cls.socket_dir.glob("*.sock")))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.socket_dir, ignore_errors=True)
+
+    @classmethod
+    def run_bin(cls, *args):
+        return subprocess.run(
+            [cls.bin, *args],
+            env=cls.env,
+            stdout=subprocess.PIPE,
+            text=True,
+            timeout=60,
+        )
+
+    def test_request_runs_in_server(self):
+        result = self.run_bin()
+        self.assertEqual(result.returncode, 0)
+        sid = int(result.stdout.removeprefix("sid:"))
+        self.assertNotEqual(sid, os.getsid(0))
+
+    def test_exit_code_is_propagated(self):
+        for exit_code in (0, 3, 42):
+            with self.subTest(exit_code=exit_code):
+                result = self.run_bin("exit", str(exit_code))
+                self.assertEqual(result.returncode, exit_code)
+
+    def test_child_is_killed_when_client_dies(self):
+        pid_file = self.socket_dir / "child.pid"
+        client = subprocess.Popen(
+            [self.bin, "sleep", str(pid_file)],
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for(pid_file.exists)
+            child = int(pid_file.read_text())
+            self.assertNotEqual(child, client.pid)
+            self.assertTrue(_is_running(child))
+        finally:
+            client.kill()
+            client.wait()
+        # The server reaps the killed child, so it disappears entirely.
+        _wait_for(lambda: not _is_running(child))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runfiles that provide modules the import index can't list from files."""
+
+def _import_index_runfiles_impl(ctx):
+    # A tree artifact named after the target, with a module in it.
+    tree = ctx.actions.declare_directory(ctx.attr.name)
+    ctx.actions.run_shell(
+        outputs = [tree],
+        command = """echo "VALUE = 'tree'" > "$1/tree_mod.py" """,
+        arguments = [tree.path],
+    )
+
+    module = ctx.actions.declare_file(ctx.attr.name + "_symlinked.py")
+    ctx.actions.write(module, "VALUE = 'symlink'\n")
+    site = "{}/site".format(ctx.label.package)
+    return [DefaultInfo(runfiles = ctx.runfiles(
+        files = [tree],
+        symlinks = {
+            "{}/sym_mod.py".format(site): module,
+        },
+        root_symlinks = {
+            "{}/{}/root_sym_mod.py".format(ctx.workspace_name, site): module,
+        },
+    ))]
+
+import_index_runfiles = rule(
+    implementation = _import_index_runfiles_impl,
+)
@@ -0,0 +1,55 @@
+import sys
+import unittest
+
+
+class ImportIndexTest(unittest.TestCase):
+    def test_finder_installed(self):
+        self.assertIn(
+            "_ImportIndexPathFinder",
+            [getattr(finder, "__name__", "") for finder in sys.meta_path],
+        )
+
+    def test_import_from_file(self):
+        import indexed_pkg
+
+        self.assertEqual(indexed_pkg.VALUE, "file")
+
+    def test_import_from_tree_artifact(self):
+        import tree_mod  # pyrefly: ignore[missing-import]
+
+        self.assertEqual(tree_mod.VALUE, "tree")
+
+    def test_import_from_symlinks(self):
+        import root_sym_mod  # pyrefly: ignore[missing-import]
+        import sym_mod  # pyrefly: ignore[missing-import]
+
+        self.assertEqual(sym_mod.VALUE, "symlink")
+        self.assertEqual(root_sym_mod.VALUE, "symlink")
+
+    def test_index_lists_symlinks_and_tree_artifacts(self):
+        import _bazel_site_init  # pyrefly: ignore[missing-import]
+
+        with open(
+            _bazel_site_init._RUNFILES_ROOT + "/" + _bazel_site_init._IMPORT_INDEX,
+            encoding="utf-8",
+        ) as f:
+            lines = set(f.read().splitlines())
+        site = "{}/tests/bootstrap_impls/import_index/site".format(
+            _bazel_site_init._WORKSPACE_NAME
+        )
+        self.assertIn(site + "\tsym_mod", lines)
+        self.assertIn(site + "\troot_sym_mod", lines)
+        self.assertIn(
+            "{}/tests/bootstrap_impls/import_index/tree\t*".format(
+                _bazel_site_init._WORKSPACE_NAME
+            ),
+            lines,
+        )
+
+    def test_missing_module_raises(self):
+        with self.assertRaises(ModuleNotFoundError):
+            import does_not_exist  # pyrefly: ignore[missing-import]  # noqa: F401
+
+
+if __name__ == "__main__":
+    unittest.main()
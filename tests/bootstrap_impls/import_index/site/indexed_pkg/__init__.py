@@ -0,0 +1 @@
+VALUE = "file"
@@ -0,0 +1,181 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the functions of the stage 2 bootstrap template."""
+
+import ast
+import os
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from python.runfiles import runfiles
+
+
+def _load_stage2_bootstrap():
+    path = runfiles.Create().Rlocation(os.environ["STAGE2_BOOTSTRAP_TEMPLATE"])
+    source = Path(path).read_text()
+    tree = ast.parse(source, path)
+    # Don't run the bootstrap's main() when it's loaded.
+    tree.body = [
+        node
+        for node in tree.body
+        if not (
+            isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Call)
+            and getattr(node.value.func, "id", None) == "main"
+        )
+    ]
+    module = types.ModuleType("stage2_bootstrap")
+    module.__file__ = path
+    # The template removes the first sys.path entry when it's loaded.
+    saved_path = list(sys.path)
+    try:
+        exec(compile(tree, path, "exec"), module.__dict__)
+    finally:
+        sys.path[:] = saved_path
+    return module
+
+
+stage2_bootstrap = _load_stage2_bootstrap()
+
+
+class UnresolveSymlinksTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(dir=os.environ.get("TEST_TMPDIR")))
+        real_dir = self.tmp / "real"
+        real_dir.mkdir()
+        (real_dir / "linked.py").write_text("")
+        runfiles_dir = self.tmp / "runfiles"
+        (runfiles_dir / "pkg").mkdir(parents=True)
+        (runfiles_dir / "pkg" / "linked.py").symlink_to(real_dir / "linked.py")
+        (runfiles_dir / "pkg" / "regular.py").write_text("")
+        self.real_linked = os.path.realpath(real_dir / "linked.py")
+        self.abs_regular = os.path.realpath(runfiles_dir / "pkg" / "regular.py")
+
+        # Like Bazel, the manifest lists paths relative to the working directory.
+        manifest = self.tmp / "coverage_manifest.txt"
+        manifest.write_text("pkg/linked.py\npkg/regular.py\n")
+        orig_cwd = os.getcwd()
+        os.chdir(runfiles_dir)
+        self.addCleanup(os.chdir, orig_cwd)
+        env = mock.patch.dict(os.environ, {"COVERAGE_MANIFEST": str(manifest)})
+        env.start()
+        self.addCleanup(env.stop)
+        stage2_bootstrap.instrumented_file_paths.cache_clear()
+        self.addCleanup(stage2_bootstrap.instrumented_file_paths.cache_clear)
+
+    def test_rewrites_resolved_paths(self):
+        lcov = self.tmp / "coverage.dat"
+        lcov.write_text(
+            "\n".join(
+                [
+                    # A symlinked file, reported at the path it resolves to.
+                    "SF:" + self.real_linked,
+                    "DA:1,1",
+                    "end_of_record",
+                    # A file that isn't a symlink, reported at its absolute path.
+                    "SF:" + self.abs_regular,
+                    "DA:1,1",
+                    "end_of_record",
+                    # Already the manifest path.
+                    "SF:pkg/regular.py",
+                    "end_of_record",
+                    # Paths that contain, but don't equal, a resolved path.
+                    "SF:" + self.real_linked + ".orig",
+                    "SF:/prefix" + self.abs_regular,
+                    # Not instrumented.
+                    "SF:/elsewhere/other.py",
+                    "end_of_record",
+                    "",
+                ]
+            )
+        )
+
+        stage2_bootstrap.unresolve_symlinks(str(lcov))
+
+        self.assertEqual(
+            lcov.read_text().splitlines(),
+            [
+                "SF:pkg/linked.py",
+                "DA:1,1",
+                "end_of_record",
+                "SF:pkg/regular.py",
+                "DA:1,1",
+                "end_of_record",
+                "SF:pkg/regular.py",
+                "end_of_record",
+                "SF:" + self.real_linked + ".orig",
+                "SF:/prefix" + self.abs_regular,
+                "SF:/elsewhere/other.py",
+                "end_of_record",
+            ],
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.tmp)),
+            ["coverage.dat", "coverage_manifest.txt", "real", "runfiles"],
+        )
+
+    def test_without_manifest(self):
+        os.environ.pop("COVERAGE_MANIFEST")
+        lcov = self.tmp / "coverage.dat"
+        lcov.write_text("SF:{}\nend_of_record\n".format(self.real_linked))
+
+        stage2_bootstrap.unresolve_symlinks(str(lcov))
+
+        self.assertEqual(
+            lcov.read_text(), "SF:{}\nend_of_record\n".format(self.real_linked)
+        )
+
+
+class SelectCoverageCoreTest(unittest.TestCase):
+    def setUp(self):
+        env = mock.patch.dict(os.environ)
+        env.start()
+        self.addCleanup(env.stop)
+        os.environ.pop("COVERAGE_CORE", None)
+
+    def select_coverage_core(self, version_info, implementation="cpython"):
+        implementation = types.SimpleNamespace(name=implementation)
+        with mock.patch.object(sys, "version_info", version_info):
+            with mock.patch.object(sys, "implementation", implementation):
+                # sys.monitoring only exists on 3.12+.
+                with mock.patch.object(sys, "monitoring", object(), create=True):
+                    stage2_bootstrap._select_coverage_core()
+        return os.environ.get("COVERAGE_CORE")
+
+    def test_default_core_before_3_14(self):
+        self.assertIsNone(self.select_coverage_core((3, 12, 0)))
+        self.assertIsNone(self.select_coverage_core((3, 13, 5)))
+
+    def test_sysmon_on_3_14(self):
+        self.assertEqual(self.select_coverage_core((3, 14, 0)), "sysmon")
+
+    def test_sysmon_on_later_versions(self):
+        self.assertEqual(self.select_coverage_core((3, 15, 0)), "sysmon")
+
+    def test_default_core_on_other_implementations(self):
+        self.assertIsNone(self.select_coverage_core((3, 14, 0), "pypy"))
+
+    def test_explicit_core_is_kept(self):
+        for version_info in [(3, 13, 0), (3, 14, 0)]:
+            os.environ["COVERAGE_CORE"] = "ctrace"
+            self.assertEqual(self.select_coverage_core(version_info), "ctrace")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from python.runfiles import runfiles
+
+
+class StartupProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.bin = runfiles.Create().Rlocation(os.environ["BIN_RLOCATION"])
+        self.outputs_dir = Path(tempfile.mkdtemp(dir=os.environ.get("TEST_TMPDIR")))
+        self.env = dict(os.environ, TEST_UNDECLARED_OUTPUTS_DIR=str(self.outputs_dir))
+        self.env.pop("RULES_PYTHON_STARTUP_PROFILE", None)
+
+    def run_bin(self, **env):
+        subprocess.run(
+            [self.bin], env=dict(self.env, **env), check=True, capture_output=True
+        )
+
+    def read_profile(self, directory):
+        profiles = list(directory.glob("rules_python_startup_profile.*.json"))
+        self.assertEqual(len(profiles), 1, profiles)
+        with profiles[0].open() as f:
+            return json.load(f)
+
+    def test_disabled_by_default(self):
+        self.run_bin()
+        self.assertEqual(list(self.outputs_dir.iterdir()), [])
+
+    def test_writes_to_test_outputs(self):
+        self.run_bin(RULES_PYTHON_STARTUP_PROFILE="1")
+        self.read_profile(self.outputs_dir)
+
+    def test_trace_event_format(self):
+        profile_dir = Path(tempfile.mkdtemp(dir=os.environ.get("TEST_TMPDIR")))
+        self.run_bin(RULES_PYTHON_STARTUP_PROFILE=str(profile_dir))
+        self.assertEqual(list(self.outputs_dir.iterdir()), [])
+        profile = self.read_profile(profile_dir)
+
+        self.assertTrue(
+            profile["otherData"]["main"].endswith("startup_profile_bin.py"),
+            profile["otherData"],
+        )
+        events = profile["traceEvents"]
+        for event in events:
+            self.assertEqual(
+                set(event), {"name", "cat", "ph", "ts", "dur", "pid", "tid"}
+            )
+            self.assertEqual(event["ph"], "X")
+            self.assertIn(event["cat"], ("phase", "import"))
+            self.assertGreaterEqual(event["dur"], 0)
+        # All events are from the same process, the binary's.
+        self.assertEqual(len({event["pid"] for event in events}), 1)
+
+        phases = {e["name"]: e for e in events if e["cat"] == "phase"}
+        self.assertTrue(
+            {
+                "site_init: setup_sys_path",
+                "stage2: bootstrap init",
+                "stage2: find_runfiles_root",
+                "main",
+            }.issubset(phases),
+            phases,
+        )
+        imports = {e["name"]: e for e in events if e["cat"] == "import"}
+        self.assertIn("email.message", imports)
+        self.assertIn("xml.dom [minidom]", imports)
+
+        # Imports by the main module are nested within the main phase.
+        main = phases["main"]
+        email_import = imports["email.message"]
+        self.assertGreaterEqual(email_import["ts"], main["ts"])
+        self.assertLessEqual(
+            email_import["ts"] + email_import["dur"], main["ts"] + main["dur"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import multiprocessing
+import os
+import subprocess
+import unittest
+
+import lib
+
+from python.runfiles import runfiles
+
+
+class ParentTest(unittest.TestCase):
+    def test_subprocesses(self):
+        lib.called_by_parent()
+
+        child = runfiles.Create().Rlocation(os.environ["CHILD_RLOCATION"])
+        subprocess.run([child], check=True)
+
+        process = multiprocessing.get_context("spawn").Process(
+            target=lib.called_by_multiprocessing_child
+        )
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
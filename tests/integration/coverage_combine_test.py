@@ -0,0 +1,56 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import unittest
+
+from tests.integration import runner
+
+
+def _read_lcov(path):
+    """Returns the execution counts of the lines of each source file."""
+    counts = collections.defaultdict(dict)
+    source = None
+    for line in path.read_text().splitlines():
+        if line.startswith("SF:"):
+            source = line.removeprefix("SF:")
+        elif line.startswith("DA:"):
+            lineno, count = line.removeprefix("DA:").split(",")[:2]
+            counts[source][int(lineno)] = int(count)
+    return counts
+
+
+class CoverageCombineTest(runner.TestCase):
+    def test_subprocess_coverage_is_combined(self):
+        self.run_bazel(
+            "coverage",
+            "--combined_report=lcov",
+            "--instrumentation_filter=^//",
+            "--test_env=RULES_PYTHON_COVERAGE_COMBINE=1",
+            "//:parent_test",
+        )
+        testlogs = self.run_bazel("info", "bazel-testlogs").stdout.strip()
+        counts = _read_lcov(self.repo_root / testlogs / "parent_test" / "coverage.dat")
+
+        # Lines run by the test's process, the binary it runs as a subprocess,
+        # and a multiprocessing child are all in the test's report.
+        lib_lines = (self.repo_root / "lib.py").read_text().splitlines()
+        for function in ("parent", "child", "multiprocessing child"):
+            lineno = lib_lines.index(f'    return "{function}"') + 1
+            self.assertGreater(counts["lib.py"].get(lineno, 0), 0, function)
+        self.assertIn("child.py", counts)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+"""Reports where the modules of a zipapp are imported from."""
+
+import json
+import subprocess
+import sys
+
+import pkgdep.pkgmod
+import runfiles_user
+import some_dep
+
+from python.runfiles import runfiles
+
+
+def main():
+    child = subprocess.check_output(
+        [sys.executable, "-c", "import some_dep; print(some_dep.__file__)"],
+    )
+    print(
+        json.dumps(
+            {
+                "some_dep": some_dep.__file__,
+                "pkgmod": pkgdep.pkgmod.__file__,
+                "pkgdep_path": list(pkgdep.__path__),
+                "subprocess": child.decode("utf-8").strip(),
+                "runfiles_user": runfiles_user.__file__,
+                # This module is extracted, so it is found in the runfiles.
+                "current_repository": runfiles.Create().CurrentRepository(),
+                "zip_current_repository": runfiles_user.current_repository(),
+                "zip_data": runfiles_user.read_data(),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
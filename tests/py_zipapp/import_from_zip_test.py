@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+class ImportFromZipTest(unittest.TestCase):
+    def test_imports_from_zip(self):
+        zipapp_path = os.path.abspath(os.environ["TEST_ZIPAPP"])
+        extract_root = tempfile.mkdtemp(dir=os.environ.get("TEST_TMPDIR"))
+        env = dict(os.environ)
+        env["RULES_PYTHON_ZIPAPP_IMPORT_FROM_ZIP"] = "1"
+        env["RULES_PYTHON_EXTRACT_ROOT"] = extract_root
+
+        output = subprocess.check_output(
+            [sys.executable, zipapp_path], env=env, stderr=subprocess.PIPE
+        )
+        result = json.loads(output.decode("utf-8").splitlines()[-1])
+
+        # Modules are imported from inside the zip, in this process and in
+        # a Python subprocess.
+        zip_prefix = zipapp_path + os.sep
+        self.assertTrue(result["some_dep"].startswith(zip_prefix), result)
+        self.assertTrue(result["pkgmod"].startswith(zip_prefix), result)
+        self.assertEqual(result["subprocess"], result["some_dep"])
+        self.assertTrue(result["runfiles_user"].startswith(zip_prefix), result)
+        # The runfiles library finds the repository of modules in the zip.
+        self.assertEqual(result["zip_current_repository"], result["current_repository"])
+        self.assertEqual(result["zip_data"], "data from runfiles")
+        # A package's __path__ is its extracted directory.
+        for path in result["pkgdep_path"]:
+            self.assertTrue(os.path.isdir(path), path)
+
+        # The modules were left in the zip.
+        extracted = set()
+        for _, _, files in os.walk(extract_root):
+            extracted.update(files)
+        self.assertNotIn("some_dep.py", extracted)
+        self.assertNotIn("pkgmod.py", extracted)
+        self.assertNotIn("runfiles_user.py", extracted)
+        self.assertIn("import_from_zip_main.py", extracted)
+
+
+if __name__ == "__main__":
+    unittest.main()
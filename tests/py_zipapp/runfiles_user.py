@@ -0,0 +1,31 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Uses the runfiles library from a module that is imported from a zipapp."""
+
+from python.runfiles import runfiles
+
+
+def current_repository():
+    return runfiles.Create().CurrentRepository()
+
+
+def read_data():
+    # Without source_repo, the repository mapping of this module's repository
+    # is used, which requires finding the repository of this module.
+    path = runfiles.Create().Rlocation(
+        "rules_python/tests/py_zipapp/import_from_zip_data.txt"
+    )
+    with open(path) as f:
+        return f.read().strip()
@@ -0,0 +1,266 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the functions of the zipapp `__main__.py` template."""
+
+import importlib.util
+import os
+import stat
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+from python.runfiles import runfiles
+
+
+def _load_zip_main():
+    path = runfiles.Create().Rlocation(os.environ["ZIP_MAIN_TEMPLATE"])
+    spec = importlib.util.spec_from_file_location("zip_main", path)
+    module = importlib.util.module_from_spec(spec)
+    # The template removes the first sys.path entry when it's loaded.
+    saved_path = list(sys.path)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path[:] = saved_path
+    return module
+
+
+zip_main = _load_zip_main()
+
+
+def _add_symlink(zf, name, target):
+    info = zipfile.ZipInfo(name)
+    info.external_attr = 0o120777 << 16
+    zf.writestr(info, target)
+
+
+class ZipImportFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(dir=os.environ.get("TEST_TMPDIR")))
+        self._patch("_STAGE2_BOOTSTRAP", "_main/bin_stage2_bootstrap.py")
+        self._patch("_MAIN_PATH", "_main/main.py")
+        self._patch("_PYTHON_BINARY_VENV", "_main/_bin.venv/bin/python3")
+        self._patch("_PYTHON_BINARY_ACTUAL", "python_3_11/bin/python3")
+
+        self.zip_path = self.tmp / "app.zip"
+        with zipfile.ZipFile(self.zip_path, "w") as zf:
+            for name in (
+                "__main__.py",
+                "runfiles/_main/bin_stage2_bootstrap.py",
+                "runfiles/_main/main.py",
+                "runfiles/_main/pkg/__init__.py",
+                "runfiles/_main/pkg/mod.py",
+                "runfiles/_main/pkg/data.txt",
+                "runfiles/_main/pkg/ext.so",
+                "runfiles/_main/_bin.venv/lib/python3.11/site-packages/_bazel_site_init.py",
+                "runfiles/python_3_11/lib/python3.11/os.py",
+                "runfiles/other/target/linked.py",
+            ):
+                zf.writestr(name, "")
+            _add_symlink(zf, "runfiles/_main/link", "../other/target")
+
+    def _patch(self, name, value):
+        old = getattr(zip_main, name)
+        setattr(zip_main, name, value)
+        self.addCleanup(setattr, zip_main, name, old)
+
+    def test_filter(self):
+        with zipfile.ZipFile(self.zip_path) as zf:
+            can_import_from_zip = zip_main.create_zip_import_filter(zf)
+            imported = sorted(
+                info.filename for info in zf.infolist() if can_import_from_zip(info)
+            )
+        self.assertEqual(
+            imported,
+            ["runfiles/_main/pkg/__init__.py", "runfiles/_main/pkg/mod.py"],
+        )
+
+    def test_extract_leaves_importable_files_in_zip(self):
+        dest = self.tmp / "dest"
+        zip_main.extract_zip(str(self.zip_path), str(dest), import_from_zip=True)
+
+        rf = dest / "runfiles"
+        # The directories are created even if all their files are in the zip.
+        self.assertTrue((rf / "_main/pkg").is_dir())
+        self.assertFalse((rf / "_main/pkg/__init__.py").exists())
+        self.assertFalse((rf / "_main/pkg/mod.py").exists())
+        for name in (
+            "_main/bin_stage2_bootstrap.py",
+            "_main/main.py",
+            "_main/pkg/data.txt",
+            "_main/pkg/ext.so",
+            "_main/_bin.venv/lib/python3.11/site-packages/_bazel_site_init.py",
+            "python_3_11/lib/python3.11/os.py",
+            "other/target/linked.py",
+        ):
+            self.assertTrue((rf / name).is_file(), name)
+        self.assertTrue((rf / "_main/link/linked.py").is_file())
+
+    def test_extract_everything_by_default(self):
+        dest = self.tmp / "dest"
+        zip_main.extract_zip(str(self.zip_path), str(dest))
+        self.assertTrue((dest / "runfiles/_main/pkg/mod.py").is_file())
+
+
+class ExtractZipCachedTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(dir=os.environ.get("TEST_TMPDIR")))
+        self.zip_path = self.tmp / "app.zip"
+        with zipfile.ZipFile(self.zip_path, "w") as zf:
+            zf.writestr("runfiles/_main/main.py", "main")
+        self.parent = self.tmp / "extract"
+        self.extract_root = self.parent / "hash"
+
+    def _extract(self):
+        zip_main.extract_zip_cached(str(self.zip_path), str(self.extract_root))
+
+    def _patch_extract_zip(self, func):
+        old = zip_main.extract_zip
+        zip_main.extract_zip = func
+        self.addCleanup(setattr, zip_main, "extract_zip", old)
+
+    def assertExtracted(self):
+        self.assertTrue((self.extract_root / zip_main.EXTRACTION_MARKER).exists())
+        self.assertEqual(
+            (self.extract_root / "runfiles/_main/main.py").read_text(), "main"
+        )
+        # No temporary directories are left behind.
+        self.assertEqual(os.listdir(self.parent), ["hash"])
+
+    def test_extracts_with_marker(self):
+        self._extract()
+        self.assertExtracted()
+
+    def test_reuses_marked_extraction(self):
+        self._extract()
+        (self.extract_root / "runfiles/_main/main.py").write_text("changed")
+
+        def fail(*args):
+            raise AssertionError("must not extract again")
+
+        self._patch_extract_zip(fail)
+        self._extract()
+        self.assertEqual(
+            (self.extract_root / "runfiles/_main/main.py").read_text(), "changed"
+        )
+
+    def test_replaces_unmarked_leftover(self):
+        (self.extract_root / "runfiles/_main").mkdir(parents=True)
+        (self.extract_root / "runfiles/_main/leftover.py").write_text("")
+        (self.extract_root / "runfiles/_main/main.py").write_text("partial")
+
+        self._extract()
+
+        self.assertExtracted()
+        self.assertFalse((self.extract_root / "runfiles/_main/leftover.py").exists())
+
+    def test_keeps_extraction_finished_concurrently(self):
+        extract_zip = zip_main.extract_zip
+
+        def extract_concurrently(zip_path, dest_dir, import_from_zip=False):
+            # Another process finishes extracting while this one extracts.
+            other = self.parent / "other"
+            extract_zip(zip_path, str(other))
+            (other / zip_main.EXTRACTION_MARKER).write_text("")
+            (other / "other").write_text("")
+            os.rename(other, self.extract_root)
+            extract_zip(zip_path, dest_dir, import_from_zip)
+
+        self._patch_extract_zip(extract_concurrently)
+        self._extract()
+
+        self.assertExtracted()
+        self.assertTrue((self.extract_root / "other").exists())
+
+    def test_failed_extraction_leaves_nothing(self):
+        def fail(zip_path, dest_dir, import_from_zip=False):
+            Path(dest_dir, "partial").write_text("")
+            raise OSError("disk full")
+
+        self._patch_extract_zip(fail)
+        with self.assertRaises(OSError):
+            self._extract()
+        self.assertEqual(os.listdir(self.parent), [])
+
+
+class ParallelExtractTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(dir=os.environ.get("TEST_TMPDIR")))
+        self.zip_path = self.tmp / "app.zip"
+        with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(zipfile.ZipInfo("runfiles/empty_dir/"), "")
+            for i in range(200):
+                info = zipfile.ZipInfo(f"runfiles/_main/pkg{i % 7}/file{i}.py")
+                info.external_attr = (0o755 if i % 3 == 0 else 0o640) << 16
+                zf.writestr(info, os.urandom(i * 97))
+            _add_symlink(zf, "runfiles/_main/file_link", "pkg0/file0.py")
+            _add_symlink(zf, "runfiles/_main/dir_link", "pkg1")
+
+    def _extract(self, workers):
+        dest = self.tmp / "workers{}".format(workers)
+        with mock.patch.dict(
+            os.environ, {"RULES_PYTHON_ZIPAPP_EXTRACT_WORKERS": str(workers)}
+        ):
+            zip_main.extract_zip(str(self.zip_path), str(dest))
+        return dest
+
+    @staticmethod
+    def _snapshot(root):
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                rel_path = os.path.relpath(path, root)
+                if os.path.islink(path):
+                    snapshot[rel_path] = ("link", os.readlink(path))
+                elif os.path.isdir(path):
+                    snapshot[rel_path] = ("dir",)
+                else:
+                    with open(path, "rb") as f:
+                        content = f.read()
+                    mode = stat.S_IMODE(os.stat(path).st_mode)
+                    snapshot[rel_path] = ("file", mode, content)
+        return snapshot
+
+    def test_parallel_matches_serial(self):
+        serial = self._snapshot(self._extract(workers=1))
+        parallel = self._snapshot(self._extract(workers=4))
+
+        self.assertEqual(serial.keys(), parallel.keys())
+        self.assertEqual(serial, parallel)
+        self.assertEqual(serial[os.path.join("runfiles", "empty_dir")], ("dir",))
+        self.assertEqual(
+            serial[os.path.join("runfiles", "_main", "file_link")],
+            ("link", "pkg0/file0.py"),
+        )
+        self.assertEqual(
+            serial[os.path.join("runfiles", "_main", "dir_link")], ("link", "pkg1")
+        )
+        if os.name != "nt":
+            self.assertEqual(
+                serial[os.path.join("runfiles", "_main", "pkg0", "file0.py")][1],
+                0o755,
+            )
+            self.assertEqual(
+                serial[os.path.join("runfiles", "_main", "pkg1", "file1.py")][1],
+                0o640,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -358,6 +358,37 @@ def _test_sha256_fragment_digest(env):
 
 _tests.append(_test_sha256_fragment_digest)
 
+def _test_versions(env):
+    html = _generate_html(
+        struct(
+            attrs = ['href="https://example.org/foo-0.0.1.tar.gz#sha256=deadbeef1"'],
+            filename = "foo-0.0.1.tar.gz",
+        ),
+        struct(
+            attrs = ['href="https://example.org/foo-0.0.2-py3-none-any.whl#sha256=deadbeef2"'],
+            filename = "foo-0.0.2-py3-none-any.whl",
+        ),
+        struct(
+            attrs = ['href="https://example.org/foo-0.0.3.tar.gz#sha256=deadbeef3"'],
+            filename = "foo-0.0.3.tar.gz",
+        ),
+    )
+
+    got = parse_simpleapi_html(content = html, versions = ["0.0.2", "0.0.3"])
+
+    env.expect.that_dict(got.sdists).keys().contains_exactly(["sha256:deadbeef3"])
+    env.expect.that_dict(got.whls).keys().contains_exactly(["sha256:deadbeef2"])
+    env.expect.that_dict(got.hashes_by_version).contains_exactly({
+        "0.0.2": ["sha256:deadbeef2"],
+        "0.0.3": ["sha256:deadbeef3"],
+    })
+
+    # All of the versions are returned without the filter
+    got = parse_simpleapi_html(content = html, versions = [])
+    env.expect.that_dict(got.hashes_by_version).keys().contains_exactly(["0.0.1", "0.0.2", "0.0.3"])
+
+_tests.append(_test_versions)
+
 def parse_simpleapi_html_test_suite(name):
     """Create the test suite.
 
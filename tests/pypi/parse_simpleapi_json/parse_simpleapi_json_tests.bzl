@@ -0,0 +1,150 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""
+
+load("@rules_testing//lib:test_suite.bzl", "test_suite")
+load("//python/private/pypi:parse_simpleapi_json.bzl", "is_simpleapi_json", "parse_simpleapi_json")  # buildifier: disable=bzl-visibility
+
+_tests = []
+
+def _test_is_simpleapi_json(env):
+    env.expect.that_bool(is_simpleapi_json('\n  {"meta": {"api-version": "1.1"}}')).equals(True)
+    env.expect.that_bool(is_simpleapi_json("<!DOCTYPE html>\n<html></html>")).equals(False)
+
+_tests.append(_test_is_simpleapi_json)
+
+def _test_index(env):
+    content = json.encode({
+        "meta": {"api-version": "1.1"},
+        "projects": [
+            {"name": "foo"},
+            {"name": "b-._.-aR"},
+        ],
+    })
+
+    got = parse_simpleapi_json(content = content, parse_index = True)
+
+    env.expect.that_dict(got).contains_exactly({
+        "b_ar": "b-ar/",
+        "foo": "foo/",
+    })
+
+_tests.append(_test_index)
+
+def _test_files(env):
+    content = json.encode({
+        "files": [
+            {
+                "filename": "foo-0.0.1.tar.gz",
+                "hashes": {"sha256": "deadbeefasource"},
+                "requires-python": ">=3.7",
+                "url": "https://example.org/full-url/foo-0.0.1.tar.gz",
+                "yanked": True,
+            },
+            {
+                "core-metadata": {"sha256": "deadb00f"},
+                "filename": "foo-0.0.2-py3-none-any.whl",
+                "hashes": {"sha256": "deadbeef", "sha512": "cafe"},
+                "url": "https://example.org/full-url/foo-0.0.2-py3-none-any.whl",
+            },
+            {
+                "dist-info-metadata": True,
+                "filename": "foo-0.0.3-py3-none-any.whl",
+                "hashes": {"blake2b": "b1a4e"},
+                "url": "../../foo-0.0.3-py3-none-any.whl",
+                "yanked": "Security issue",
+            },
+        ],
+        "meta": {"api-version": "1.1"},
+        "name": "foo",
+        "versions": ["0.0.1", "0.0.2", "0.0.3"],
+    })
+
+    got = parse_simpleapi_json(content = content)
+
+    env.expect.that_dict(got.sdists).contains_exactly({
+        "sha256:deadbeefasource": struct(
+            filename = "foo-0.0.1.tar.gz",
+            version = "0.0.1",
+            url = "https://example.org/full-url/foo-0.0.1.tar.gz",
+            digest = "sha256:deadbeefasource",
+            metadata_sha256 = "",
+            metadata_url = "",
+            yanked = "",
+        ),
+    })
+    env.expect.that_dict(got.whls).contains_exactly({
+        "blake2b:b1a4e": struct(
+            filename = "foo-0.0.3-py3-none-any.whl",
+            version = "0.0.3",
+            url = "../../foo-0.0.3-py3-none-any.whl",
+            digest = "blake2b:b1a4e",
+            metadata_sha256 = "",
+            metadata_url = "../../foo-0.0.3-py3-none-any.whl.metadata",
+            yanked = "Security issue",
+        ),
+        "sha256:deadbeef": struct(
+            filename = "foo-0.0.2-py3-none-any.whl",
+            version = "0.0.2",
+            url = "https://example.org/full-url/foo-0.0.2-py3-none-any.whl",
+            digest = "sha256:deadbeef",
+            metadata_sha256 = "deadb00f",
+            metadata_url = "https://example.org/full-url/foo-0.0.2-py3-none-any.whl.metadata",
+            yanked = None,
+        ),
+    })
+    env.expect.that_dict(got.hashes_by_version).contains_exactly({
+        "0.0.1": ["sha256:deadbeefasource"],
+        "0.0.2": ["sha256:deadbeef"],
+        "0.0.3": ["blake2b:b1a4e"],
+    })
+
+_tests.append(_test_files)
+
+def _test_versions(env):
+    content = json.encode({
+        "files": [
+            {
+                "filename": "foo-0.0.1.tar.gz",
+                "hashes": {"sha256": "deadbeef1"},
+                "url": "https://example.org/foo-0.0.1.tar.gz",
+            },
+            {
+                "filename": "foo-0.0.2-py3-none-any.whl",
+                "hashes": {"sha256": "deadbeef2"},
+                "url": "https://example.org/foo-0.0.2-py3-none-any.whl",
+            },
+        ],
+        "meta": {"api-version": "1.1"},
+        "name": "foo",
+    })
+
+    got = parse_simpleapi_json(content = content, versions = ["0.0.2"])
+
+    env.expect.that_dict(got.sdists).contains_exactly({})
+    env.expect.that_dict(got.whls).keys().contains_exactly(["sha256:deadbeef2"])
+    env.expect.that_dict(got.hashes_by_version).contains_exactly({
+        "0.0.2": ["sha256:deadbeef2"],
+    })
+
+_tests.append(_test_versions)
+
+def parse_simpleapi_json_test_suite(name):
+    """Create the test suite.
+
+    Args:
+        name: the name of the test suite
+    """
+    test_suite(name = name, basic_tests = _tests)
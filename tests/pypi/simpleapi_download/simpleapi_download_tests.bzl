@@ -349,6 +349,52 @@ def _test_download_envsubst_url(env):
 
 _tests.append(_test_download_envsubst_url)
 
+def _test_download_json(env):
+    accept = {}
+
+    def download(url, output, headers = {}, **kwargs):
+        _ = output, kwargs  # buildifier: disable=unused-variable
+        accept[url[0]] = headers.get("Accept", "")
+        return struct(success = True)
+
+    got = simpleapi_download(
+        ctx = struct(
+            getenv = {}.get,
+            download = download,
+            report_progress = lambda _: None,
+            read = lambda i: json.encode({
+                "files": [
+                    {
+                        "filename": "foo-1.0-py3-none-any.whl",
+                        "hashes": {"sha256": "deadbeef"},
+                        "url": "https://example.com/files/foo-1.0-py3-none-any.whl",
+                    },
+                ],
+                "meta": {"api-version": "1.1"},
+                "name": "foo",
+            }),
+            path = lambda i: "path/for/" + i,
+        ),
+        attr = struct(
+            index_url_overrides = {},
+            index_url = "https://example.com/main/simple/",
+            extra_index_urls = [],
+            sources = {"foo": ["1.0"]},
+            envsubst = [],
+        ),
+        cache = pypi_cache(),
+        parallel_download = False,
+        get_auth = lambda ctx, urls, ctx_attr: struct(),
+    )
+
+    env.expect.that_str(
+        accept["https://example.com/main/simple/foo/"],
+    ).contains("application/vnd.pypi.simple.v1+json")
+    env.expect.that_dict(got["foo"].whls).keys().contains_exactly(["sha256:deadbeef"])
+    env.expect.that_str(got["foo"].index_url).equals("https://example.com/main/simple/foo/")
+
+_tests.append(_test_download_json)
+
 def simpleapi_download_test_suite(name):
     """Create the test suite.
 
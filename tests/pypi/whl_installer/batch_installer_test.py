@@ -0,0 +1,221 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from python.private.pypi.whl_installer import batch_installer, wheel_installer
+
+
+class RequirementNameTest(unittest.TestCase):
+    def test_requirement_name(self) -> None:
+        for requirement, want in [
+            ("foo==1.0.0", "foo"),
+            ("Foo_Bar.baz==1.0.0 --hash=sha256:deadbeef", "foo-bar-baz"),
+            ("foo[extra] @ https://example.org/foo-1.0.0.tar.gz", "foo"),
+        ]:
+            with self.subTest(requirement=requirement):
+                self.assertEqual(batch_installer._requirement_name(requirement), want)
+
+
+class RunsTest(unittest.TestCase):
+    def runs(self, requirements):
+        requests = [batch_installer._Request({"requirement": r}) for r in requirements]
+        return [
+            [request.requirement for request in run]
+            for run in batch_installer._runs(requests)
+        ]
+
+    def test_projects_are_requested_once_per_run(self) -> None:
+        self.assertEqual(
+            self.runs(["foo==1.0.0", "bar==1.0.0", "Foo==2.0.0", "foo==3.0.0"]),
+            [["foo==1.0.0", "bar==1.0.0"], ["Foo==2.0.0"], ["foo==3.0.0"]],
+        )
+
+    def test_hashed_and_unhashed_are_not_mixed(self) -> None:
+        self.assertEqual(
+            self.runs(
+                ["foo==1.0.0 --hash=sha256:deadbeef", "bar==1.0.0", "baz==1.0.0"]
+            ),
+            [["foo==1.0.0 --hash=sha256:deadbeef"], ["bar==1.0.0", "baz==1.0.0"]],
+        )
+
+
+def _fake_pip(runs):
+    """Return a fake `pip wheel` that builds a wheel for each requirement.
+
+    Each wheel contains its requirement line, and the lines of each run are
+    appended to `runs`.
+    """
+
+    def fake_pip(args, **kwargs):
+        requirement_file = Path(args[args.index("-r") + 1])
+        lines = requirement_file.read_text().splitlines()
+        runs.append(lines)
+        # Like pip, fail the whole run if only some requirements are hashed.
+        hashed = ["--hash" in line for line in lines]
+        if any(hashed) and not all(hashed):
+            raise subprocess.CalledProcessError(1, args)
+        wheel_dir = Path(args[args.index("--wheel-dir") + 1])
+        wheel_dir.mkdir()
+        for line in lines:
+            name, version = line.split()[0].split("==")
+            whl = wheel_dir / f"{name}-{version}-py3-none-any.whl"
+            # Like pip, a later wheel of the same project and version wins.
+            whl.write_text(line)
+
+    return fake_pip
+
+
+class MainTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def main(self, requests) -> None:
+        requests_file = self.tmpdir / "requests.json"
+        requests_file.write_text(json.dumps(requests))
+        argv = [
+            "batch_installer",
+            "--requests",
+            str(requests_file),
+            "--wheel_cache_dir",
+            str(self.tmpdir / "cache"),
+        ]
+        # Each run is a separate process, keep the changes main makes to the
+        # environment from leaking into the next one.
+        with mock.patch.object(sys, "argv", argv), mock.patch.dict(os.environ):
+            batch_installer.main()
+
+    def test_cached_wheels_are_not_rebuilt(self) -> None:
+        directory = self.tmpdir / "foo"
+        directory.mkdir()
+        (directory / "foo-1.0.0.tar.gz").write_bytes(b"sdist")
+        built = self.tmpdir / "wheels" / "foo-1.0.0-py3-none-any.whl"
+        built.parent.mkdir()
+        built.write_bytes(b"wheel")
+
+        def fake_pip(args, **kwargs):
+            wheel_dir = Path(args[args.index("--wheel-dir") + 1])
+            wheel_dir.mkdir()
+            shutil.copyfile(built, wheel_dir / built.name)
+
+        requests = [{"requirement": "foo==1.0.0", "directory": str(directory)}]
+        with mock.patch("subprocess.run", side_effect=fake_pip) as run:
+            self.main(requests)
+            self.assertEqual(run.call_count, 1)
+
+        whl_file = json.loads((directory / "whl_file.json").read_text())["whl_file"]
+        self.assertEqual(Path(whl_file).read_bytes(), b"wheel")
+
+        # A second build of the same sdist elsewhere is served from the cache.
+        other = self.tmpdir / "other"
+        other.mkdir()
+        shutil.copyfile(directory / "foo-1.0.0.tar.gz", other / "foo-1.0.0.tar.gz")
+        with mock.patch("subprocess.run") as run:
+            self.main([{"requirement": "foo==1.0.0", "directory": str(other)}])
+            run.assert_not_called()
+        self.assertTrue((other / built.name).exists())
+
+    def test_batch_built_wheel_is_a_cache_hit_for_pip_archive(self) -> None:
+        # A standalone interpreter repository and the host platform repository
+        # that symlinks to it, which `pip.parse` passes to `pip_archive`.
+        external = self.tmpdir / "output_base" / "external"
+        interpreter = external / "python_3_x_x86_64-unknown-linux-gnu"
+        version = f"python{sys.version_info[0]}.{sys.version_info[1]}"
+        (interpreter / "include" / version).mkdir(parents=True)
+        (interpreter / "STANDALONE_INTERPRETER").write_text("")
+        host = external / "python_3_x_host"
+        host.mkdir()
+        for name in ["include", "STANDALONE_INTERPRETER"]:
+            (host / name).symlink_to(interpreter / name)
+
+        downloads = self.tmpdir / "downloads"
+        downloads.mkdir()
+        (downloads / "foo-1.0.0.tar.gz").write_bytes(b"sdist")
+
+        def fake_pip(args, **kwargs):
+            wheel_dir = Path(args[args.index("--wheel-dir") + 1])
+            wheel_dir.mkdir()
+            (wheel_dir / "foo-1.0.0-py3-none-any.whl").write_bytes(b"wheel")
+
+        with mock.patch.object(sys, "prefix", str(interpreter)):
+            with mock.patch.object(sys, "exec_prefix", str(interpreter)):
+                with mock.patch.object(sys, "platform", "linux"):
+                    with mock.patch("subprocess.run", side_effect=fake_pip):
+                        self.main(
+                            [{"requirement": "foo==1.0.0", "directory": str(downloads)}]
+                        )
+
+                    # `pip_archive` runs the `wheel_installer` in its repository,
+                    # where it downloaded the sdist to, with the `CPPFLAGS` of
+                    # the interpreter it was given.
+                    repo = external / "pypi_foo"
+                    repo.mkdir()
+                    (repo / "foo-1.0.0.tar.gz").write_bytes(b"sdist")
+                    argv = [
+                        "wheel_installer",
+                        "--requirement",
+                        "foo==1.0.0",
+                        "--extra_pip_args",
+                        json.dumps({"arg": ["--find-links", "."]}),
+                        "--environment",
+                        json.dumps({"arg": {}}),
+                        "--wheel_cache_dir",
+                        str(self.tmpdir / "cache"),
+                    ]
+                    env = {"CPPFLAGS": f"-isystem {host}/include/{version}"}
+                    self.addCleanup(os.chdir, os.getcwd())
+                    os.chdir(repo)
+                    with mock.patch.object(sys, "argv", argv):
+                        with mock.patch.dict(os.environ, env):
+                            with mock.patch("subprocess.run") as run:
+                                wheel_installer.main()
+                                run.assert_not_called()
+
+        whl_file = json.loads((repo / "whl_file.json").read_text())["whl_file"]
+        self.assertEqual(Path(whl_file).read_bytes(), b"wheel")
+
+    def test_mixed_hashed_and_unhashed_requirements(self) -> None:
+        requests = []
+        for requirement in ["foo==1.0.0 --hash=sha256:deadbeef", "bar==1.0.0"]:
+            directory = self.tmpdir / requirement.split("=")[0]
+            directory.mkdir()
+            requests.append({"requirement": requirement, "directory": str(directory)})
+
+        runs = []
+        with mock.patch("subprocess.run", side_effect=_fake_pip(runs)):
+            self.main(requests)
+
+        self.assertEqual(runs, [[requests[0]["requirement"]], ["bar==1.0.0"]])
+        for request in requests:
+            whl_file = Path(request["directory"]) / "whl_file.json"
+            whl = json.loads(whl_file.read_text())["whl_file"]
+            self.assertEqual(Path(whl).read_text(), request["requirement"])
+
+    def test_same_project_requested_twice(self) -> None:
+        requests = []
+        for version in ["1.0.0", "2.0.0"]:
+            directory = self.tmpdir / version
+            directory.mkdir()
+            requests.append(
+                {"requirement": f"foo=={version}", "directory": str(directory)}
+            )
+
+        runs = []
+        with mock.patch("subprocess.run", side_effect=_fake_pip(runs)):
+            self.main(requests)
+
+        self.assertEqual(len(runs), 2)
+        for request in requests:
+            whl_file = Path(request["directory"]) / "whl_file.json"
+            whl = json.loads(whl_file.read_text())["whl_file"]
+            self.assertEqual(Path(whl).read_text(), request["requirement"])
+
+
+if __name__ == "__main__":
+    unittest.main()
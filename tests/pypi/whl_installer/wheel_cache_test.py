@@ -0,0 +1,115 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from python.private.pypi.whl_installer import wheel_cache
+
+
+class CacheKeyTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.kwargs = dict(
+            requirement="foo==1.0.0 --hash=sha256:deadbeef",
+            directory=self.tmpdir,
+            isolated=False,
+            extra_pip_args=["--index-url=https://example.org/simple"],
+            environment={"FOO": "1"},
+            env={"FOO": "1", "CFLAGS": "-g0", "HOME": "/home/user"},
+        )
+
+    def key(self, **kwargs) -> str:
+        return wheel_cache.cache_key(**{**self.kwargs, **kwargs})
+
+    def test_unpinned_requirement_is_not_cached(self) -> None:
+        self.assertIsNone(self.key(requirement="foo==1.0.0"))
+
+    def test_key_is_stable(self) -> None:
+        self.assertEqual(self.key(), self.key())
+
+    def test_key_ignores_unrelated_environment(self) -> None:
+        env = dict(self.kwargs["env"], HOME="/home/other")
+        self.assertEqual(self.key(), self.key(env=env))
+
+    def test_key_depends_on_build_configuration(self) -> None:
+        key = self.key()
+        self.assertNotEqual(key, self.key(requirement="foo==1.0.0 --hash=sha256:cafe"))
+        self.assertNotEqual(key, self.key(extra_pip_args=[]))
+        self.assertNotEqual(key, self.key(isolated=True))
+        self.assertNotEqual(key, self.key(env=dict(self.kwargs["env"], FOO="2")))
+        self.assertNotEqual(key, self.key(env=dict(self.kwargs["env"], CFLAGS="")))
+
+    def test_key_ignores_output_base(self) -> None:
+        def key_in(output_base: str) -> str:
+            directory = self.tmpdir / output_base / "external" / "pypi_foo"
+            directory.mkdir(parents=True)
+            flags = f"-isystem {sys.prefix}/include -I{directory.parent}/zlib/include"
+            env = dict(self.kwargs["env"], CPPFLAGS=flags)
+            return self.key(directory=directory, env=env)
+
+        self.assertEqual(key_in("output_base_a"), key_in("output_base_b"))
+
+    def test_key_resolves_symlinks_to_the_interpreter(self) -> None:
+        include = self.tmpdir / "include"
+        include.symlink_to(Path(sys.prefix) / "include")
+        self.assertEqual(
+            self.key(env=dict(self.kwargs["env"], CPPFLAGS=f"-isystem {include}")),
+            self.key(
+                env=dict(self.kwargs["env"], CPPFLAGS=f"-isystem {sys.prefix}/include")
+            ),
+        )
+
+    def test_key_depends_on_paths_outside_output_base(self) -> None:
+        key = self.key(env=dict(self.kwargs["env"], CPPFLAGS="-I/opt/a/include"))
+        self.assertNotEqual(
+            key, self.key(env=dict(self.kwargs["env"], CPPFLAGS="-I/opt/b/include"))
+        )
+
+    def test_key_uses_local_sdist_content(self) -> None:
+        sdist = self.tmpdir / "foo-1.0.0.tar.gz"
+        sdist.write_bytes(b"one")
+        key = self.key(requirement="foo==1.0.0")
+        self.assertIsNotNone(key)
+        sdist.write_bytes(b"two")
+        self.assertNotEqual(key, self.key(requirement="foo==1.0.0"))
+
+
+class WheelCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache = wheel_cache.WheelCache(self.tmpdir / "cache")
+
+    def test_miss(self) -> None:
+        self.assertIsNone(self.cache.get("abcd", self.tmpdir))
+
+    def test_put_then_get(self) -> None:
+        whl = self.tmpdir / "foo-1.0.0-py3-none-any.whl"
+        whl.write_bytes(b"wheel")
+        self.cache.put("abcd", whl)
+
+        dest = self.tmpdir / "dest"
+        dest.mkdir()
+        got = self.cache.get("abcd", dest)
+        self.assertEqual(got, dest / whl.name)
+        self.assertEqual(got.read_bytes(), b"wheel")
+
+    def test_put_keeps_existing_entry(self) -> None:
+        whl = self.tmpdir / "foo-1.0.0-py3-none-any.whl"
+        whl.write_bytes(b"first")
+        self.cache.put("abcd", whl)
+        whl.write_bytes(b"second")
+        self.cache.put("abcd", whl)
+
+        dest = self.tmpdir / "dest"
+        dest.mkdir()
+        self.assertEqual(self.cache.get("abcd", dest).read_bytes(), b"first")
+        self.assertEqual(
+            [p.name for p in (self.tmpdir / "cache" / "ab").iterdir()], ["abcd"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+# Copyright 2026 The Bazel Authors. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Micro-benchmark for prefix-based repository mapping lookups.
+
+Compares `_RepositoryMapping.lookup` against a linear scan over the prefixed
+mappings, which is how lookups were implemented before they were indexed by
+prefix. Run with:
+
+    bazel run //tests/runfiles:repo_mapping_benchmark
+
+or, without Bazel, from the repository root so that `python.runfiles` is
+importable:
+
+    PYTHONPATH=. python tests/runfiles/repo_mapping_benchmark.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+from collections import defaultdict
+
+from python.runfiles.runfiles import _RepositoryMapping
+
+
+def _make_mappings(num_entries: int, num_targets: int) -> dict[tuple[str, str], str]:
+    """Creates prefixed mappings like those of many module extension repos."""
+    prefixed_mappings = {}
+    for i in range(num_entries):
+        target_app = "dep_{}".format(i % num_targets)
+        prefix = "ext_{}+".format(i // num_targets)
+        prefixed_mappings[(prefix, target_app)] = "{}{}".format(prefix, target_app)
+    return prefixed_mappings
+
+
+class _LinearRepositoryMapping:
+    """Repository mapping that scans the prefixed mappings linearly."""
+
+    def __init__(self, prefixed_mappings: dict[tuple[str, str], str]) -> None:
+        self._grouped_prefixed_mappings = defaultdict(list)
+        for (prefix, target_app), target_canonical in prefixed_mappings.items():
+            self._grouped_prefixed_mappings[target_app].append(
+                (prefix, target_canonical)
+            )
+
+    def lookup(self, source_repo: str, target_apparent: str) -> str | None:
+        for prefix, target_canonical in self._grouped_prefixed_mappings.get(
+            target_apparent, []
+        ):
+            if source_repo.startswith(prefix):
+                return target_canonical
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--targets", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    prefixed_mappings = _make_mappings(args.entries, args.targets)
+    indexed = _RepositoryMapping({}, prefixed_mappings)
+    linear = _LinearRepositoryMapping(prefixed_mappings)
+
+    rng = random.Random(0)
+    num_prefixes = max(args.entries // args.targets, 1)
+    queries = [
+        (
+            "ext_{}+repo_{}".format(rng.randrange(num_prefixes), i),
+            "dep_{}".format(rng.randrange(args.targets)),
+        )
+        for i in range(args.lookups)
+    ]
+    for source_repo, target_app in queries:
+        assert indexed.lookup(source_repo, target_app) == linear.lookup(
+            source_repo, target_app
+        )
+
+    for name, mapping in [("linear", linear), ("indexed", indexed)]:
+        seconds = min(
+            timeit.repeat(
+                lambda: [mapping.lookup(s, t) for s, t in queries],
+                number=1,
+                repeat=5,
+            )
+        )
+        print("{:>8}: {:.3f} us/lookup".format(name, seconds / len(queries) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
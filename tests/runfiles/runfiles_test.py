@@ -20,9 +20,10 @@ import pathlib
 import tempfile
 import unittest
 from typing import Any
+from unittest import mock
 
-from python.runfiles import runfiles
-from python.runfiles.runfiles import _RepositoryMapping
+from python.runfiles import __main__ as runfiles_main, runfiles
+from python.runfiles.runfiles import _ManifestIndex, _RepositoryMapping
 
 
 class RunfilesTest(unittest.TestCase):
@@ -288,6 +289,171 @@ class RunfilesTest(unittest.TestCase):
             else:
                 self.assertEqual(r.Rlocation("/foo"), "/foo")
 
+    def testLazyManifestBasedRlocation(self) -> None:
+        with _MockFile(
+            contents=[
+                " Foo\\sBar\\bDir\\nNewline/runfile5 F:\\bActual Path\\bwith\\nnewline/runfile5",
+                "Foo/Bar/Dir E:\\Actual Path\\Directory",
+                "Foo/Bar/runfile3 D:\\the path\\run file 3.txt",
+                "Foo/runfile1 ",
+                "Foo/runfile2 C:/Actual Path\\runfile2",
+            ]
+        ) as mf:
+            r = runfiles.CreateManifestBased(mf.Path(), lazy=True)
+            self.assertEqual(r.Rlocation("Foo/runfile1"), "Foo/runfile1")
+            self.assertEqual(r.Rlocation("Foo/runfile2"), "C:/Actual Path\\runfile2")
+            self.assertEqual(
+                r.Rlocation("Foo/Bar/runfile3"), "D:\\the path\\run file 3.txt"
+            )
+            self.assertEqual(
+                r.Rlocation("Foo/Bar/Dir/Deeply/Nested/runfile4"),
+                "E:\\Actual Path\\Directory/Deeply/Nested/runfile4",
+            )
+            self.assertEqual(
+                r.Rlocation("Foo Bar\\Dir\nNewline/runfile5"),
+                "F:\\Actual Path\\with\nnewline/runfile5",
+            )
+            self.assertIsNone(r.Rlocation("A"))
+            self.assertIsNone(r.Rlocation("Foo/Bar"))
+            self.assertIsNone(r.Rlocation("unknown"))
+
+            # Lookups are answered from the cache once they're resolved.
+            self.assertEqual(r.Rlocation("Foo/runfile1"), "Foo/runfile1")
+            self.assertIsNone(r.Rlocation("unknown"))
+
+        with _MockFile(contents=[]) as mf:
+            r = runfiles.Create({"RUNFILES_MANIFEST_FILE": mf.Path()}, lazy=True)
+            assert r is not None  # type assert
+            self.assertIsNone(r.Rlocation("a/b"))
+
+    def testLazyManifestBasedRlocationWithUnsortedManifest(self) -> None:
+        # Sorted case-insensitively, like on Windows.
+        with _MockFile(
+            contents=[
+                "foo/a /a",
+                "Foo/B /B",
+                "foo/c /c",
+                "foo/dir /dir",
+            ]
+        ) as mf:
+            r = runfiles.CreateManifestBased(mf.Path(), lazy=True)
+            self.assertEqual(r.Rlocation("foo/c"), "/c")
+            self.assertEqual(r.Rlocation("Foo/B"), "/B")
+            self.assertEqual(r.Rlocation("foo/a"), "/a")
+            self.assertEqual(r.Rlocation("foo/dir/file"), "/dir/file")
+            self.assertIsNone(r.Rlocation("foo/B"))
+            self.assertIsNone(r.Rlocation("unknown"))
+
+    def testLazyManifestBasedRlocationMissDoesNotParseManifest(self) -> None:
+        num_entries = 10000
+        with _MockFile(
+            contents=[
+                "pkg/file{:05d} /file{:05d}".format(i, i) for i in range(num_entries)
+            ]
+        ) as mf:
+            r = runfiles.CreateManifestBased(mf.Path(), lazy=True)
+            parse_line = runfiles._ManifestBased._ParseLine
+            with mock.patch.object(
+                runfiles._ManifestBased,
+                "_ParseLine",
+                side_effect=parse_line,
+            ) as mock_parse_line:
+                self.assertIsNone(r.Rlocation("_repo_mapping"))
+                self.assertIsNone(r.Rlocation("pkg/file00042x"))
+                self.assertEqual(
+                    r.Rlocation("pkg/file00042/sub/file"), "/file00042/sub/file"
+                )
+                self.assertIsNone(r.Rlocation("unknown/dir/file"))
+            # Each lookup bisects the manifest and checks the order of a few
+            # entries around a miss, but never parses the whole manifest.
+            self.assertLess(mock_parse_line.call_count, 200)
+
+    def testManifestBasedRlocationWithIndex(self) -> None:
+        with _MockFile(
+            contents=[
+                "Foo/runfile1 ",
+                "Foo/runfile2 C:/Actual Path\\runfile2",
+                "Foo/Bar/Dir E:\\Actual Path\\Directory",
+                " Foo\\sBar\\bDir\\nNewline/runfile5 F:\\bActual Path\\bwith\\nnewline/runfile5",
+                "Foo/\u00e9t\u00e9 /\u00e9t\u00e9",
+            ]
+        ) as mf:
+            index_path = mf.Path() + _ManifestIndex.SUFFIX
+            runfiles.WriteManifestIndex(mf.Path())
+            try:
+                index = _ManifestIndex.Open(mf.Path())
+                self.assertIsNotNone(index)
+                r = runfiles.CreateManifestBased(mf.Path())
+                self.assertEqual(r.Rlocation("Foo/runfile1"), "Foo/runfile1")
+                self.assertEqual(
+                    r.Rlocation("Foo/runfile2"), "C:/Actual Path\\runfile2"
+                )
+                self.assertEqual(
+                    r.Rlocation("Foo/Bar/Dir/Deeply/Nested/runfile4"),
+                    "E:\\Actual Path\\Directory/Deeply/Nested/runfile4",
+                )
+                self.assertEqual(
+                    r.Rlocation("Foo Bar\\Dir\nNewline/runfile5"),
+                    "F:\\Actual Path\\with\nnewline/runfile5",
+                )
+                self.assertEqual(r.Rlocation("Foo/\u00e9t\u00e9"), "/\u00e9t\u00e9")
+                self.assertIsNone(r.Rlocation("Foo"))
+                self.assertIsNone(r.Rlocation("Foo/runfile0"))
+                self.assertIsNone(r.Rlocation("unknown"))
+                self.assertIsNone(r.Rlocation("zzz"))
+
+                # An index that doesn't match the manifest is ignored.
+                with open(mf.Path(), "a", encoding="utf-8", newline="\n") as f:
+                    f.write("Foo/runfile6 /runfile6\n")
+                self.assertIsNone(_ManifestIndex.Open(mf.Path()))
+                r = runfiles.CreateManifestBased(mf.Path())
+                self.assertEqual(r.Rlocation("Foo/runfile6"), "/runfile6")
+            finally:
+                os.remove(index_path)
+
+    def testManifestIndexFreshness(self) -> None:
+        with _MockFile(contents=["Foo/runfile1 /runfile1"]) as mf:
+            index_path = mf.Path() + _ManifestIndex.SUFFIX
+            runfiles.WriteManifestIndex(mf.Path())
+            try:
+                st = os.stat(mf.Path())
+                self.assertIsNotNone(_ManifestIndex.Open(mf.Path()))
+
+                # Same content with another modification time, e.g. a copy.
+                os.utime(mf.Path(), ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+                self.assertIsNotNone(_ManifestIndex.Open(mf.Path()))
+
+                # Same size, but different content.
+                with open(mf.Path(), "w", encoding="utf-8", newline="\n") as f:
+                    f.write("Foo/runfile2 /runfile2\n")
+                os.utime(mf.Path(), ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+                self.assertIsNone(_ManifestIndex.Open(mf.Path()))
+                r = runfiles.CreateManifestBased(mf.Path())
+                self.assertIsNone(r.Rlocation("Foo/runfile1"))
+                self.assertEqual(r.Rlocation("Foo/runfile2"), "/runfile2")
+
+                # An index of another version is ignored.
+                with open(index_path, "r+b") as f:
+                    f.write(b"RFMIDX01")
+                self.assertIsNone(_ManifestIndex.Open(mf.Path()))
+            finally:
+                os.remove(index_path)
+
+    def testManifestIndexCommandLine(self) -> None:
+        with _MockFile(contents=["Foo/runfile1 /runfile1"]) as mf:
+            index_path = mf.Path() + _ManifestIndex.SUFFIX
+            self.assertEqual(runfiles_main.main([mf.Path()]), 0)
+            try:
+                # No temporary file is left behind.
+                self.assertEqual(
+                    sorted(os.listdir(os.path.dirname(mf.Path()))), ["x", "x.index"]
+                )
+                index = _ManifestIndex.Open(mf.Path())
+                assert index is not None  # type assert
+                self.assertEqual(index.get("Foo/runfile1"), "/runfile1")
+            finally:
+                os.remove(index_path)
+
     def testManifestBasedRlocationWithRepoMappingFromMain(self) -> None:
         with _MockFile(
             contents=[
@@ -755,6 +921,39 @@ class RunfilesTest(unittest.TestCase):
         self.assertFalse(repo_mapping.is_empty())  # Should have mappings
         self.assertTrue(empty_mapping.is_empty())  # Should be empty
 
+    def testRepositoryMappingLookupFirstMatchingPrefixWins(self) -> None:
+        repo_mapping = _RepositoryMapping(
+            {},
+            {
+                ("deps+", "lib"): "lib~general",
+                ("deps+specific+", "lib"): "lib~specific",
+                ("deps+specific+repo", "lib"): "lib~exact_prefix",
+                ("other+", "lib"): "lib~other",
+                ("", "any"): "any~1.0",
+            },
+        )
+        self.assertEqual(
+            repo_mapping.lookup("deps+specific+repo", "lib"), "lib~general"
+        )
+        self.assertEqual(repo_mapping.lookup("other+repo", "lib"), "lib~other")
+        self.assertEqual(repo_mapping.lookup("other+", "lib"), "lib~other")
+        self.assertIsNone(repo_mapping.lookup("other", "lib"))
+        self.assertIsNone(repo_mapping.lookup("", "lib"))
+        self.assertEqual(repo_mapping.lookup("", "any"), "any~1.0")
+        self.assertEqual(repo_mapping.lookup("whatever", "any"), "any~1.0")
+
+        repo_mapping = _RepositoryMapping(
+            {},
+            {
+                ("deps+specific+", "lib"): "lib~specific",
+                ("deps+", "lib"): "lib~general",
+            },
+        )
+        self.assertEqual(
+            repo_mapping.lookup("deps+specific+repo", "lib"), "lib~specific"
+        )
+        self.assertEqual(repo_mapping.lookup("deps+repo", "lib"), "lib~general")
+
     def testCurrentRepository(self) -> None:
         # Under bzlmod, the current repository name is the empty string instead
         # of the name in the workspace file.
@@ -766,6 +965,93 @@ class RunfilesTest(unittest.TestCase):
         assert r is not None  # type assert
         self.assertEqual(r.CurrentRepository(), expected)
 
+    def testRlocationMany(self) -> None:
+        with _MockFile(
+            name="_repo_mapping",
+            contents=[
+                ",my_module,_main",
+                ",my_protobuf,protobuf~3.19.2",
+                "deps+*,external_dep,external_dep~1.0.0",
+            ],
+        ) as rm:
+            dir = os.path.dirname(rm.Path())
+            r = runfiles.CreateDirectoryBased(dir)
+            paths = [
+                "my_module/bar/runfile",
+                "my_protobuf/foo/runfile",
+                "my_module/baz/runfile",
+                "external_dep/foo/file",
+                "config.json",
+                "/foo" if not RunfilesTest.IsWindows() else "c:/foo",
+            ]
+            for source_repo in ["", "deps+dep1", "other"]:
+                self.assertEqual(
+                    r.RlocationMany(paths, source_repo),
+                    [r.Rlocation(path, source_repo) for path in paths],
+                )
+            self.assertEqual(r.RlocationMany([], ""), [])
+            self.assertRaisesRegex(
+                ValueError,
+                "is not normalized",
+                lambda: r.RlocationMany(["my_module/a", "../foo"], ""),
+            )
+            self.assertRaises(TypeError, lambda: r.RlocationMany([1], ""))  # pyrefly: ignore[bad-argument-type]
+
+    def testCurrentRepositoryOfZipappModule(self) -> None:
+        archive = os.path.join(tempfile.gettempdir(), "app.zip")
+        r = runfiles.CreateDirectoryBased(os.path.join(tempfile.gettempdir(), "root"))
+        for repo_dir, expected in [("_main", ""), ("other_repo+", "other_repo+")]:
+            # Modules imported from the zip have a path inside the zip.
+            caller_path = os.path.join(archive, "runfiles", repo_dir, "pkg", "mod.py")
+            code = compile("repository = r.CurrentRepository()", caller_path, "exec")
+            scope: dict[str, Any] = {"r": r}
+            with mock.patch.dict(os.environ, {"RULES_PYTHON_ZIPAPP_ARCHIVE": archive}):
+                exec(code, scope)
+            self.assertEqual(scope["repository"], expected)
+
+    def testCurrentRepositoryIsCachedPerFile(self) -> None:
+        # Use the directory above the repository containing this file as the
+        # runfiles root, so that this file lies in a known repository.
+        repo_dir = os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        expected = os.path.basename(repo_dir)
+        if expected == "_main":
+            expected = ""
+        r = runfiles.CreateDirectoryBased(os.path.dirname(repo_dir))
+
+        self.assertEqual(r.CurrentRepository(), expected)
+        self.assertEqual(r.CurrentRepository(), expected)
+        # pylint: disable-next=protected-access
+        self.assertEqual(
+            list(r._current_repository_cache.values()),  # pyrefly: ignore[missing-attribute]
+            [expected],
+        )
+
+    def testRlocationResultsAreCached(self) -> None:
+        with _MockFile(
+            name="_repo_mapping",
+            contents=[
+                ",my_module,_main",
+                "deps+*,external_dep,external_dep~1.0.0",
+            ],
+        ) as rm:
+            dir = os.path.dirname(rm.Path())
+            r = runfiles.CreateDirectoryBased(dir)
+            for _ in range(3):
+                self.assertEqual(
+                    r.Rlocation("external_dep/foo/file", "deps+dep1"),
+                    dir + "/external_dep~1.0.0/foo/file",
+                )
+                self.assertEqual(
+                    r.Rlocation("my_module/bar/runfile", ""),
+                    dir + "/_main/bar/runfile",
+                )
+            # pylint: disable-next=protected-access
+            cache_info = r._resolve_cached.cache_info()  # pyrefly: ignore[missing-attribute]
+            self.assertEqual(cache_info.misses, 2)
+            self.assertEqual(cache_info.hits, 4)
+
     @staticmethod
     def IsWindows() -> bool:
         return os.name == "nt"
@@ -258,6 +258,7 @@ def _mctx_new(
         modules = list(modules),
         path = lambda *a, **k: _mctx_path(self, *a, **k),
         read = lambda *a, **k: _mctx_read(self, *a, **k),
+        file = lambda *a, **k: _rctx_file(self, *a, **k),
         download = lambda *a, **k: _mctx_download(self, *a, **k),
         report_progress = lambda *a, **k: _mrctx_report_progress(self, *a, **k),
         add_module = lambda **k: _mctx_add_module(self, **k),
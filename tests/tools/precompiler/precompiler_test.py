@@ -0,0 +1,226 @@
+import importlib.util
+import json
+import py_compile
+import subprocess
+import sys
+
+import pytest
+
+from tools.precompiler import precompiler
+
+
+class _Worker:
+    """A persistent worker process that is sent JSON work requests."""
+
+    def __init__(self, *args):
+        self._process = subprocess.Popen(
+            [sys.executable, precompiler.__file__, "--persistent_worker", *args],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+
+    def send(self, request):
+        self._process.stdin.write(json.dumps(request) + "\n")
+        self._process.stdin.flush()
+
+    def receive(self):
+        line = self._process.stdout.readline()
+        assert line, "worker exited"
+        return json.loads(line)
+
+    def close(self):
+        # On EOF the worker exits, shutting down its processes.
+        self._process.stdin.close()
+        try:
+            self._process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+
+@pytest.fixture
+def pool_worker():
+    worker = _Worker("--worker_impl=async", "--worker_processes=2")
+    yield worker
+    worker.close()
+
+
+def _compile_request(request_id, srcs, pycs):
+    arguments = []
+    for src, pyc in zip(srcs, pycs):
+        arguments += ["--src", str(src), "--src_name", src.name, "--pyc", str(pyc)]
+    return {"requestId": request_id, "arguments": arguments}
+
+
+def _write_srcs(directory, count, content=None):
+    directory.mkdir(exist_ok=True)
+    srcs = []
+    for i in range(count):
+        src = directory / f"mod{i}.py"
+        src.write_text(f"x = {i}\n" if content is None else content)
+        srcs.append(src)
+    return srcs, [directory / f"mod{i}.pyc" for i in range(count)]
+
+
+def test_worker_processes_compile(tmp_path, pool_worker):
+    srcs, pycs = _write_srcs(tmp_path, 5)
+    pool_worker.send(_compile_request(1, srcs, pycs))
+
+    response = pool_worker.receive()
+    assert response == {"requestId": 1, "exitCode": 0}
+    for pyc in pycs:
+        assert pyc.read_bytes()[:4] == importlib.util.MAGIC_NUMBER
+
+
+def test_worker_processes_propagate_errors(tmp_path, pool_worker):
+    srcs, pycs = _write_srcs(tmp_path, 3)
+    srcs[1].write_text("def broken(:\n")
+    pool_worker.send(_compile_request(1, srcs, pycs))
+
+    response = pool_worker.receive()
+    assert response["requestId"] == 1
+    assert response["exitCode"] == 3
+    assert "SyntaxError" in response["output"]
+    assert "mod1.py" in response["output"]
+
+    # The worker and its processes keep serving requests.
+    srcs, pycs = _write_srcs(tmp_path / "ok", 2)
+    pool_worker.send(_compile_request(2, srcs, pycs))
+    assert pool_worker.receive() == {"requestId": 2, "exitCode": 0}
+
+
+def test_worker_processes_cancellation(tmp_path, pool_worker):
+    # Large enough that compiling doesn't finish before the cancel request is
+    # processed.
+    content = "".join(f"v{i} = [{i}, {{'k': {i}}}]\n" for i in range(50000))
+    srcs, pycs = _write_srcs(tmp_path, 2, content)
+    pool_worker.send(_compile_request(1, srcs, pycs))
+    pool_worker.send({"requestId": 1, "cancel": True})
+
+    assert pool_worker.receive() == {"requestId": 1, "wasCancelled": True}
+
+    # Later requests are still served.
+    small_srcs, small_pycs = _write_srcs(tmp_path / "small", 1)
+    pool_worker.send(_compile_request(2, small_srcs, small_pycs))
+    assert pool_worker.receive() == {"requestId": 2, "exitCode": 0}
+
+    # No response is sent for the cancelled request: the files of this request
+    # are compiled after those already started for it.
+    big_pycs = [tmp_path / "big" / pyc.name for pyc in pycs]
+    (tmp_path / "big").mkdir()
+    pool_worker.send(_compile_request(3, srcs, big_pycs))
+    assert pool_worker.receive() == {"requestId": 3, "exitCode": 0}
+
+
+@pytest.fixture
+def pyc_cache_module(monkeypatch):
+    # The worker only imports the modules the cache uses in `main`.
+    for name in ("collections", "hashlib", "importlib", "os", "threading"):
+        monkeypatch.setattr(
+            precompiler, name, importlib.import_module(name), raising=False
+        )
+    return precompiler
+
+
+def _job(src, pyc, optimize=-1, mode=py_compile.PycInvalidationMode.CHECKED_HASH):
+    return (str(src), src.name, str(pyc), optimize, mode)
+
+
+def _compile_and_store(cache, jobs):
+    misses, keys = cache.restore(jobs)
+    precompiler._compile_files(misses)
+    cache.store(misses, keys)
+    return misses
+
+
+def test_pyc_cache_restores_cached_pycs(tmp_path, pyc_cache_module):
+    cache = precompiler._PycCache(1 << 20)
+    srcs, pycs = _write_srcs(tmp_path, 2)
+    jobs = [_job(src, pyc) for src, pyc in zip(srcs, pycs)]
+    assert _compile_and_store(cache, jobs) == jobs
+    expected = [pyc.read_bytes() for pyc in pycs]
+
+    restored_pycs = [tmp_path / "restored" / pyc.name for pyc in pycs]
+    misses, _ = cache.restore([_job(src, pyc) for src, pyc in zip(srcs, restored_pycs)])
+    assert misses == []
+    assert [pyc.read_bytes() for pyc in restored_pycs] == expected
+
+
+def test_pyc_cache_key(tmp_path, monkeypatch, pyc_cache_module):
+    cache = precompiler._PycCache(1 << 20)
+    (src,), (pyc,) = _write_srcs(tmp_path, 1)
+    _compile_and_store(cache, [_job(src, pyc)])
+    assert cache.restore([_job(src, pyc)])[0] == []
+
+    differing_jobs = [
+        _job(src, pyc, optimize=2),
+        _job(src, pyc, mode=py_compile.PycInvalidationMode.UNCHECKED_HASH),
+        (
+            str(src),
+            "other.py",
+            str(pyc),
+            -1,
+            py_compile.PycInvalidationMode.CHECKED_HASH,
+        ),
+    ]
+    for job in differing_jobs:
+        assert cache.restore([job])[0] == [job]
+
+    src.write_text("x = 'changed'\n")
+    assert cache.restore([_job(src, pyc)])[0] == [_job(src, pyc)]
+    src.write_text("x = 0\n")
+
+    monkeypatch.setattr(importlib.util, "MAGIC_NUMBER", b"\0\0\r\n")
+    assert cache.restore([_job(src, pyc)])[0] == [_job(src, pyc)]
+
+
+def test_pyc_cache_skips_timestamp_pycs(tmp_path, pyc_cache_module):
+    cache = precompiler._PycCache(1 << 20)
+    (src,), (pyc,) = _write_srcs(tmp_path, 1)
+    job = _job(src, pyc, mode=py_compile.PycInvalidationMode.TIMESTAMP)
+    misses, keys = cache.restore([job])
+    assert keys == [None]
+
+    _compile_and_store(cache, [job])
+    assert cache.restore([job]) == ([job], [None])
+
+
+def test_pyc_cache_evicts_least_recently_used(tmp_path, pyc_cache_module):
+    srcs, pycs = _write_srcs(tmp_path, 3)
+    jobs = [_job(src, pyc) for src, pyc in zip(srcs, pycs)]
+    precompiler._compile_files(jobs)
+    pyc_size = max(len(pyc.read_bytes()) for pyc in pycs)
+
+    # Room for two of the pycs.
+    cache = precompiler._PycCache(2 * pyc_size)
+    _compile_and_store(cache, jobs[:2])
+    # Using the first pyc makes the second the least recently used.
+    assert cache.restore(jobs[:1])[0] == []
+    _compile_and_store(cache, jobs[2:])
+
+    assert cache.restore([jobs[0]])[0] == []
+    assert cache.restore([jobs[1]])[0] == [jobs[1]]
+    assert cache.restore([jobs[2]])[0] == []
+
+
+def test_pyc_cache_reports_hits(tmp_path):
+    worker = _Worker("--worker_impl=serial", "--cache_size_mb=1")
+    try:
+        srcs, pycs = _write_srcs(tmp_path, 3)
+        worker.send(_compile_request(1, srcs, pycs))
+        assert worker.receive() == {
+            "requestId": 1,
+            "exitCode": 0,
+            "output": "pyc cache: 0 hits, 3 misses\n",
+        }
+
+        srcs[2].write_text("x = 'changed'\n")
+        worker.send(_compile_request(2, srcs, pycs))
+        assert worker.receive() == {
+            "requestId": 2,
+            "exitCode": 0,
+            "output": "pyc cache: 2 hits, 1 misses\n",
+        }
+    finally:
+        worker.close()
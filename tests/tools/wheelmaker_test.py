@@ -1,6 +1,10 @@
 import io
+import os
+import tempfile
 import unittest
+import zipfile
 from dataclasses import dataclass, field
+from unittest import mock
 
 import tools.wheelmaker as wheelmaker
 
@@ -41,6 +45,63 @@ class QuoteAllFilenamesTest(unittest.TestCase):
         self.assertEqual(whl._quote_filename("foo,bar/baz.py"), '"foo,bar/baz.py"')
 
 
+class AddFilesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.files = []
+        for i in range(20):
+            path = os.path.join(self.tmpdir.name, f"file{i}.txt")
+            with open(path, "wb") as f:
+                f.write(f"content {i}\n".encode() * (i * 5000))
+            self.files.append((f"pkg/file{i}.txt", path))
+        path = os.path.join(self.tmpdir.name, "data.gz")
+        with open(path, "wb") as f:
+            f.write(os.urandom(1000))
+        self.files.append(("pkg/data.gz", path))
+
+    def _make_wheel(self, **kwargs) -> bytes:
+        buf = io.BytesIO()
+        with wheelmaker._WhlFile(
+            buf, mode="w", distribution_prefix="test-1.0.0", **kwargs
+        ) as whl:
+            whl.add_files(self.files)
+            whl.add_recordfile()
+        return buf.getvalue()
+
+    def test_parallel_matches_serial(self) -> None:
+        serial = self._make_wheel(workers=1)
+        parallel = self._make_wheel(workers=4)
+        self.assertEqual(serial, parallel)
+
+    def test_can_swap_compressor(self) -> None:
+        self.assertTrue(wheelmaker._can_swap_compressor())
+
+    def test_parallel_without_compressor_swap_matches_serial(self) -> None:
+        serial = self._make_wheel(workers=1)
+        with mock.patch.object(wheelmaker, "_can_swap_compressor", return_value=False):
+            parallel = self._make_wheel(workers=4)
+        self.assertEqual(serial, parallel)
+
+    def test_stored_extensions(self) -> None:
+        compressed = self._make_wheel()
+        stored = self._make_wheel(workers=4, stored_extensions=[".GZ"])
+        compressed_zip = zipfile.ZipFile(io.BytesIO(compressed))
+        stored_zip = zipfile.ZipFile(io.BytesIO(stored))
+        self.assertEqual(
+            stored_zip.getinfo("pkg/data.gz").compress_type, zipfile.ZIP_STORED
+        )
+        self.assertEqual(
+            stored_zip.getinfo("pkg/file1.txt").compress_type, zipfile.ZIP_DEFLATED
+        )
+        self.assertEqual(
+            stored_zip.read("test-1.0.0.dist-info/RECORD"),
+            compressed_zip.read("test-1.0.0.dist-info/RECORD"),
+        )
+        for name in compressed_zip.namelist():
+            self.assertEqual(stored_zip.read(name), compressed_zip.read(name))
+
+
 @dataclass
 class ArcNameTestCase:
     name: str
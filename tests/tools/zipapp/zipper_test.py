@@ -2,6 +2,8 @@ import os
 import shutil
 import zipfile
 
+import pytest
+
 from tools.private.zipapp import zipper
 
 
@@ -269,6 +271,156 @@ def test_output_deterministic(tmp_path):
         ]
 
 
+def test_parallel_compression_matches_serial(tmp_path):
+    manifest_path = tmp_path / "manifest.txt"
+
+    manifest_content = ["rf-empty|empty"]
+    for i in range(20):
+        src = tmp_path / f"file{i}"
+        src.write_bytes(os.urandom(100) + b"compressible" * 1000 * i)
+        manifest_content.append(f"rf-file|0|file{i}|{src}")
+    manifest_content.append("symlink|my_ws/link|my_ws/file1")
+    manifest_path.write_text("\n".join(manifest_content))
+
+    serial_zip = tmp_path / "serial.zip"
+    create_zip(manifest_path, serial_zip, compress_level=6, workers=1)
+    parallel_zip = tmp_path / "parallel.zip"
+    create_zip(manifest_path, parallel_zip, compress_level=6, workers=4)
+
+    assert serial_zip.read_bytes() == parallel_zip.read_bytes()
+    with zipfile.ZipFile(parallel_zip, "r") as zf:
+        assert zf.testzip() is None
+        assert zf.read("runfiles/my_ws/file3") == (tmp_path / "file3").read_bytes()
+
+
+def test_can_write_precompressed():
+    assert zipper._can_write_precompressed()
+
+
+def test_falls_back_to_serial_writes(tmp_path, monkeypatch):
+    manifest_path = _reuse_manifest(tmp_path)
+    expected_zip = tmp_path / "expected.zip"
+    create_zip(manifest_path, expected_zip, compress_level=6, workers=4)
+
+    def unexpected_write_precompressed(*args, **kwargs):
+        raise AssertionError("write_precompressed must not be used")
+
+    monkeypatch.setattr(zipper, "_can_write_precompressed", lambda: False)
+    monkeypatch.setattr(zipper, "write_precompressed", unexpected_write_precompressed)
+    output_zip = tmp_path / "output.zip"
+    create_zip(
+        manifest_path,
+        output_zip,
+        compress_level=6,
+        workers=4,
+        reuse_zip=str(expected_zip),
+        cache_dir=str(tmp_path / "cache"),
+    )
+    assert output_zip.read_bytes() == expected_zip.read_bytes()
+    assert not (tmp_path / "cache").exists()
+
+
+def test_reuse_compressed_members(tmp_path):
+    manifest_path = tmp_path / "manifest.txt"
+    unchanged = tmp_path / "unchanged"
+    unchanged.write_bytes(b"unchanged" * 1000)
+    changed = tmp_path / "changed"
+    changed.write_bytes(b"before" * 1000)
+    manifest_path.write_text(
+        "\n".join(
+            [
+                f"rf-file|0|unchanged|{unchanged}",
+                f"rf-file|0|changed|{changed}",
+            ]
+        )
+    )
+    output_zip = tmp_path / "output.zip"
+    cache_dir = tmp_path / "cache"
+    create_zip(manifest_path, output_zip, compress_level=6, cache_dir=str(cache_dir))
+    assert len(list(cache_dir.glob("*/*/*"))) == 2
+
+    changed.write_bytes(b"after" * 1000)
+    expected_zip = tmp_path / "expected.zip"
+    create_zip(manifest_path, expected_zip, compress_level=6)
+
+    # The output is reused in place, and must not be truncated before its
+    # members are read.
+    create_zip(manifest_path, output_zip, compress_level=6, reuse_zip=str(output_zip))
+    assert output_zip.read_bytes() == expected_zip.read_bytes()
+
+    cached_zip = tmp_path / "cached.zip"
+    create_zip(manifest_path, cached_zip, compress_level=6, cache_dir=str(cache_dir))
+    assert cached_zip.read_bytes() == expected_zip.read_bytes()
+    assert len(list(cache_dir.glob("*/*/*"))) == 3
+
+
+def _reuse_manifest(tmp_path):
+    manifest_path = tmp_path / "manifest.txt"
+    for name in ["unchanged", "changed"]:
+        (tmp_path / name).write_bytes(name.encode() * 1000)
+    manifest_path.write_text(
+        "\n".join(
+            [
+                f"rf-file|0|unchanged|{tmp_path / 'unchanged'}",
+                f"rf-file|0|changed|{tmp_path / 'changed'}",
+            ]
+        )
+    )
+    return manifest_path
+
+
+def test_reused_members_are_not_compressed(tmp_path, monkeypatch):
+    manifest_path = _reuse_manifest(tmp_path)
+    output_zip = tmp_path / "output.zip"
+    cache_dir = tmp_path / "cache"
+    create_zip(manifest_path, output_zip, compress_level=6, cache_dir=str(cache_dir))
+    (tmp_path / "changed").write_bytes(b"after" * 1000)
+
+    compressed = []
+    deflate_file = zipper.deflate_file
+
+    def recording_deflate_file(zi, path, *args, **kwargs):
+        compressed.append(zi.filename)
+        return deflate_file(zi, path, *args, **kwargs)
+
+    monkeypatch.setattr(zipper, "deflate_file", recording_deflate_file)
+
+    create_zip(manifest_path, output_zip, compress_level=6, reuse_zip=str(output_zip))
+    assert compressed == ["runfiles/my_ws/changed"]
+
+    compressed.clear()
+    (tmp_path / "changed").write_bytes(b"again" * 1000)
+    create_zip(
+        manifest_path,
+        tmp_path / "cached.zip",
+        compress_level=6,
+        cache_dir=str(cache_dir),
+    )
+    assert compressed == ["runfiles/my_ws/changed"]
+
+
+def test_failed_reuse_build_removes_tmp_output(tmp_path, monkeypatch):
+    manifest_path = _reuse_manifest(tmp_path)
+    output_zip = tmp_path / "output.zip"
+    create_zip(manifest_path, output_zip, compress_level=6)
+    previous = output_zip.read_bytes()
+
+    def failing_write_precompressed(zf, zi, precompressed, **kwargs):
+        if zi.filename.endswith("unchanged"):
+            raise OSError("disk full")
+        return write_precompressed(zf, zi, precompressed, **kwargs)
+
+    write_precompressed = zipper.write_precompressed
+    monkeypatch.setattr(zipper, "write_precompressed", failing_write_precompressed)
+
+    with pytest.raises(OSError, match="disk full"):
+        create_zip(
+            manifest_path, output_zip, compress_level=6, reuse_zip=str(output_zip)
+        )
+    assert output_zip.read_bytes() == previous
+    assert not (tmp_path / "output.zip.tmp").exists()
+
+
 def test_symlink_extraction(tmp_path):
     manifest_path = tmp_path / "manifest.txt"
     output_zip = tmp_path / "output.zip"
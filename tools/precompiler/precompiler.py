@@ -34,6 +34,22 @@ def _create_parser() -> "argparse.Namespace":
 
     parser.add_argument("--persistent_worker", action="store_true")
     parser.add_argument("--log_level", default="ERROR")
+    # Compiling is CPU bound and holds the GIL, so compiling in threads of the
+    # worker process doesn't scale across cores.
+    parser.add_argument(
+        "--worker_processes",
+        type=int,
+        default=0,
+        help="Number of processes the async worker compiles in. If 0, files "
+        + "are compiled in threads of the worker process.",
+    )
+    parser.add_argument(
+        "--cache_size_mb",
+        type=int,
+        default=0,
+        help="Size of the persistent worker's in-memory cache of compiled "
+        + "files. If 0, nothing is cached.",
+    )
     # Bazel workers use anonymous pipes for stdio, which don't support
     # overlapped I/O required by asyncio on Windows.
     parser.add_argument(
@@ -42,7 +58,8 @@ def _create_parser() -> "argparse.Namespace":
     return parser
 
 
-def _compile(options: "argparse.Namespace") -> None:
+def _compile_jobs(options: "argparse.Namespace") -> "list[tuple]":
+    """Returns the `_compile_file` args for each file to compile."""
     try:
         invalidation_mode = py_compile.PycInvalidationMode[
             options.invalidation_mode.upper()
@@ -57,18 +74,135 @@ def _compile(options: "argparse.Namespace") -> None:
             "Mismatched number of --src, --src_name, and/or --pyc args"
         )
 
-    for src, src_name, pyc in zip(options.srcs, options.src_names, options.pycs):
-        py_compile.compile(
-            src,
-            pyc,
-            doraise=True,
-            dfile=src_name,
-            optimize=options.optimize,
-            invalidation_mode=invalidation_mode,
-        )
+    return [
+        (src, src_name, pyc, options.optimize, invalidation_mode)
+        for src, src_name, pyc in zip(options.srcs, options.src_names, options.pycs)
+    ]
+
+
+def _compile_file(
+    src: str,
+    src_name: str,
+    pyc: str,
+    optimize: int,
+    invalidation_mode: "py_compile.PycInvalidationMode",
+) -> None:
+    py_compile.compile(
+        src,
+        pyc,
+        doraise=True,
+        dfile=src_name,
+        optimize=optimize,
+        invalidation_mode=invalidation_mode,
+    )
+
+
+def _compile_file_in_process(*job) -> None:
+    """Runs `_compile_file` in a process of a process pool.
+
+    `py_compile.PyCompileError` can't be unpickled, which breaks the whole
+    pool, so it is re-raised as an exception that can.
+    """
+    try:
+        _compile_file(*job)
+    except py_compile.PyCompileError as e:
+        raise RuntimeError(e.msg) from None
+
+
+def _compile_files(jobs: "list[tuple]") -> None:
+    for job in jobs:
+        _compile_file(*job)
+
+
+def _compile(options: "argparse.Namespace") -> None:
+    _compile_files(_compile_jobs(options))
     return 0
 
 
+class _PycCache:
+    """Bounded in-memory cache of pyc files, keyed by what they're compiled from.
+
+    The key is the source digest, the `--src_name`, `--optimize`, the
+    invalidation mode, and the interpreter's magic number. Timestamp-based pycs
+    embed the source's mtime, so they aren't cached.
+    """
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries = collections.OrderedDict()
+        # Requests are processed in multiple threads by the async worker.
+        self._lock = threading.Lock()
+
+    def restore(self, jobs: "list[tuple]") -> "tuple[list[tuple], list[tuple]]":
+        """Writes the pycs of the cached jobs.
+
+        Args:
+            jobs: `_compile_file` args of the files to compile.
+
+        Returns:
+            A tuple of the jobs that weren't cached, and the cache keys to
+            `store` them under.
+        """
+        misses = []
+        keys = []
+        for job in jobs:
+            key = self._key(*job)
+            with self._lock:
+                pyc_data = self._entries.get(key) if key else None
+                if pyc_data is not None:
+                    self._entries.move_to_end(key)
+            if pyc_data is None:
+                misses.append(job)
+                keys.append(key)
+                continue
+            pyc = job[2]
+            os.makedirs(os.path.dirname(pyc), exist_ok=True)
+            with open(pyc, "wb") as f:
+                f.write(pyc_data)
+        return misses, keys
+
+    def store(self, jobs: "list[tuple]", keys: "list[tuple]") -> None:
+        """Caches the pycs of compiled jobs, as returned by `restore`."""
+        for job, key in zip(jobs, keys):
+            if not key:
+                continue
+            with open(job[2], "rb") as f:
+                pyc_data = f.read()
+            with self._lock:
+                if key in self._entries:
+                    continue
+                self._entries[key] = pyc_data
+                self._size += len(pyc_data)
+                while self._size > self._max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+
+    @staticmethod
+    def _key(
+        src: str,
+        src_name: str,
+        pyc: str,
+        optimize: int,
+        invalidation_mode: "py_compile.PycInvalidationMode",
+    ) -> "tuple | None":
+        if invalidation_mode == py_compile.PycInvalidationMode.TIMESTAMP:
+            return None
+        with open(src, "rb") as f:
+            digest = hashlib.sha256(f.read()).digest()
+        return (
+            digest,
+            src_name,
+            optimize,
+            invalidation_mode,
+            importlib.util.MAGIC_NUMBER,
+        )
+
+
+def _cache_stats_output(hits: int, misses: int) -> str:
+    return f"pyc cache: {hits} hits, {misses} misses\n"
+
+
 # A stub type alias for readability.
 # See the Bazel WorkRequest object definition:
 # https://github.com/bazelbuild/bazel/blob/master/src/main/protobuf/worker_protocol.proto
@@ -83,9 +217,15 @@ JsonWorkResponse = object
 class _SerialPersistentWorker:
     """Simple, synchronous, serial persistent worker."""
 
-    def __init__(self, instream: "typing.TextIO", outstream: "typing.TextIO"):  # noqa: F821
+    def __init__(
+        self,
+        instream: "typing.TextIO",  # noqa: F821
+        outstream: "typing.TextIO",  # noqa: F821
+        cache: "_PycCache | None" = None,
+    ):
         self._instream = instream
         self._outstream = outstream
+        self._cache = cache
         self._parser = _create_parser()
 
     def run(self) -> None:
@@ -127,11 +267,20 @@ class _SerialPersistentWorker:
         if request.get("cancel"):
             return None
         options = self._options_from_request(request)
-        _compile(options)
         response = {
             "requestId": request.get("requestId", 0),
             "exitCode": 0,
         }
+        if self._cache:
+            jobs = _compile_jobs(options)
+            misses, keys = self._cache.restore(jobs)
+            _compile_files(misses)
+            self._cache.store(misses, keys)
+            response["output"] = _cache_stats_output(
+                len(jobs) - len(misses), len(misses)
+            )
+        else:
+            _compile(options)
         return response
 
     def _options_from_request(
@@ -152,17 +301,47 @@ class _SerialPersistentWorker:
 class _AsyncPersistentWorker:
     """Asynchronous, concurrent, persistent worker."""
 
-    def __init__(self, reader: "typing.TextIO", writer: "typing.TextIO"):  # noqa: F821
+    def __init__(
+        self,
+        reader: "typing.TextIO",  # noqa: F821
+        writer: "typing.TextIO",  # noqa: F821
+        executor: "concurrent.futures.Executor | None" = None,  # noqa: F821
+        cache: "_PycCache | None" = None,
+    ):
         self._reader = reader
         self._writer = writer
+        self._executor = executor
+        self._cache = cache
         self._parser = _create_parser()
         self._request_id_to_task = {}
         self._task_to_request_id = {}
 
     @classmethod
-    async def main(cls, instream: "typing.TextIO", outstream: "typing.TextIO") -> None:  # noqa: F821
+    async def main(
+        cls,
+        instream: "typing.TextIO",  # noqa: F821
+        outstream: "typing.TextIO",  # noqa: F821
+        worker_processes: int = 0,
+        cache: "_PycCache | None" = None,
+    ) -> None:
         reader, writer = await cls._connect_streams(instream, outstream)
-        await cls(reader, writer).run()
+        if worker_processes > 0:
+            import concurrent.futures
+            import multiprocessing
+
+            # Forking a process that has threads (e.g. those of asyncio) is
+            # unsafe, so the processes are spawned instead.
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=worker_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            executor = None
+        try:
+            await cls(reader, writer, executor, cache).run()
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
 
     @classmethod
     async def _connect_streams(
@@ -191,6 +370,11 @@ class _AsyncPersistentWorker:
             task = asyncio.create_task(
                 self._process_request(request), name=f"request_{request_id}"
             )
+            if request.get("cancel", False):
+                # A cancel request has the id of the request it cancels, so
+                # it isn't tracked; it would replace, and then cancel, itself
+                # instead of the request.
+                continue
             self._request_id_to_task[request_id] = task
             self._task_to_request_id[task] = request_id
             task.add_done_callback(self._handle_task_done)
@@ -236,7 +420,7 @@ class _AsyncPersistentWorker:
     async def _process_cancel_request(self, request: "JsonWorkRequest") -> None:
         request_id = request.get("requestId", 0)
         task = self._request_id_to_task.get(request_id)
-        if not task:
+        if not task or task.done():
             # It must be already completed, so ignore the request, per spec
             return
 
@@ -245,14 +429,37 @@ class _AsyncPersistentWorker:
 
     async def _process_compile_request(self, request: "JsonWorkRequest") -> None:
         options = self._options_from_request(request)
-        # _compile performs a varity of blocking IO calls, so run it separately
-        await asyncio.to_thread(_compile, options)
-        self._send_response(
-            {
-                "requestId": request.get("requestId", 0),
-                "exitCode": 0,
-            }
-        )
+        response = {
+            "requestId": request.get("requestId", 0),
+            "exitCode": 0,
+        }
+        jobs = _compile_jobs(options)
+        if self._cache:
+            # Restoring and storing read and write files, so run them separately
+            misses, keys = await asyncio.to_thread(self._cache.restore, jobs)
+        else:
+            misses = jobs
+        if self._executor:
+            # Each file is a separate job so that a request's files are
+            # compiled in parallel, and cancelling the request (which cancels
+            # the gather) drops the jobs that haven't started yet.
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(self._executor, _compile_file_in_process, *job)
+                    for job in misses
+                )
+            )
+        else:
+            # _compile_files performs a varity of blocking IO calls, so run it
+            # separately
+            await asyncio.to_thread(_compile_files, misses)
+        if self._cache:
+            await asyncio.to_thread(self._cache.store, misses, keys)
+            response["output"] = _cache_stats_output(
+                len(jobs) - len(misses), len(misses)
+            )
+        self._send_response(response)
 
     def _options_from_request(self, request: "JsonWorkRequest") -> "argparse.Namespace":
         options = self._parser.parse_args(request["arguments"])
@@ -276,12 +483,17 @@ def main(args: "list[str]") -> int:
     # https://bazel.build/remote/multiplex
     # https://bazel.build/remote/creating
     if options.persistent_worker:
-        global asyncio, itertools, json, logging, os, traceback, _logger
+        global asyncio, collections, hashlib, importlib, itertools, json
+        global logging, os, threading, traceback, _logger
         import asyncio
+        import collections
+        import hashlib
+        import importlib.util
         import itertools
         import json
         import logging
         import os.path
+        import threading
         import traceback
 
         _logger = logging.getLogger("precompiler")
@@ -289,10 +501,18 @@ def main(args: "list[str]") -> int:
         # invocations from spamming stderr with logging info
         logging.basicConfig(level=getattr(logging, options.log_level))
         _logger.info("persistent worker: impl=%s", options.worker_impl)
+        if options.cache_size_mb > 0:
+            cache = _PycCache(options.cache_size_mb << 20)
+        else:
+            cache = None
         if options.worker_impl == "serial":
-            _SerialPersistentWorker(sys.stdin, sys.stdout).run()
+            _SerialPersistentWorker(sys.stdin, sys.stdout, cache).run()
         elif options.worker_impl == "async":
-            asyncio.run(_AsyncPersistentWorker.main(sys.stdin, sys.stdout))
+            asyncio.run(
+                _AsyncPersistentWorker.main(
+                    sys.stdin, sys.stdout, options.worker_processes, cache
+                )
+            )
         else:
             raise ValueError(f"Unknown worker impl: {options.worker_impl}")
     else:
@@ -1,9 +1,18 @@
 import argparse
+import collections
+import functools
+import hashlib
+import io
 import os
 import shutil
+import struct
 import sys
+import tempfile
+import threading
 import zipfile
-from os.path import dirname
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, join
 
 # Unix permission bit for symlink (S_IFLNK)
 # S_IFLNK is usually 0o120000
@@ -118,36 +127,40 @@ def normalize_zip_path(path):
     return path.replace("\\", "/")
 
 
-def _write_entry(zf, entry, compress_type, seen, platform_pathsep):
+def _new_zip_info(zip_path, compress_type):
+    zi = zipfile.ZipInfo(zip_path)
+    zi.date_time = (1980, 1, 1, 0, 0, 0)
+    zi.create_system = 3  # Unix
+    zi.compress_type = compress_type
+    return zi
+
+
+class _FileContent:
+    """The path of a file whose content is stored in the zip."""
+
+    def __init__(self, path):
+        self.path = path
+
+
+def _prepare_entry(entry, compress_type, platform_pathsep):
+    """Creates the ZipInfo for an entry.
+
+    Returns:
+        A tuple of the ZipInfo, and either the `str` content to store or the
+        path of the file to read the content from.
+    """
     type_, is_symlink_str, zip_path, content_path = entry
-    # Normalize slashes, otherwise the `seen` logic doesn't
-    # work correctly.
-    zip_path = normalize_zip_path(zip_path)
-    if zip_path in seen:
-        # This can occur because symlink entries have precedence
-        # over non-symlink entries.
-        return
-    seen.add(zip_path)
+    zi = _new_zip_info(normalize_zip_path(zip_path), compress_type)
 
     if type_ == "rf-empty":
-        zi = zipfile.ZipInfo(zip_path)
-        zi.date_time = (1980, 1, 1, 0, 0, 0)
-        zi.create_system = 3  # Unix
-        zi.compress_type = compress_type
         # Create empty file
         zi.external_attr = (0o644 & 0xFFFF) << 16
-        zf.writestr(zi, "")
-        return
+        return zi, ""
     if type_ == "symlink":
-        zi = zipfile.ZipInfo(zip_path)
-        zi.date_time = (1980, 1, 1, 0, 0, 0)
-        zi.create_system = 3  # Unix
-        zi.compress_type = compress_type
         target = convert_symlink_target(content_path, platform_pathsep)
         # Set permissions to 777 for symlink (standard)
         zi.external_attr = (S_IFLNK | 0o777) << 16
-        zf.writestr(zi, target)
-        return
+        return zi, target
 
     if is_symlink_str == "-1":
         if not os.path.exists(content_path):
@@ -158,24 +171,351 @@ def _write_entry(zf, entry, compress_type, seen, platform_pathsep):
     is_symlink = is_symlink_str == "1"
 
     if is_symlink:
-        zi = zipfile.ZipInfo(zip_path)
-        zi.date_time = (1980, 1, 1, 0, 0, 0)
-        zi.create_system = 3  # Unix
-        zi.compress_type = compress_type
         target = convert_symlink_target(os.readlink(content_path), platform_pathsep)
         # Set permissions to 777 for symlink (standard)
         zi.external_attr = (S_IFLNK | 0o777) << 16
-        zf.writestr(zi, target)
+        return zi, target
     else:
         st = os.stat(content_path)
-        zi = zipfile.ZipInfo(zip_path)
-        zi.date_time = (1980, 1, 1, 0, 0, 0)
-        zi.create_system = 3  # Unix
-        zi.compress_type = compress_type
         # Preserve permissions, otherwise execute is dropped.
         zi.external_attr = (st.st_mode & 0xFFFF) << 16
-        with open(content_path, "rb") as src, zf.open(zi, "w") as dst:
-            shutil.copyfileobj(src, dst)
+        return zi, _FileContent(content_path)
+
+
+# The size of the blocks files are read, hashed, and compressed in.
+_BLOCK_SIZE = 1 << 20
+
+# Compressed data up to this size is kept in memory, larger data is spooled
+# to a temporary file.
+_SPOOL_MAX_SIZE = 16 << 20
+
+
+def _compress_level(zi):
+    # Python 3.13 renamed this to `compress_level`, keeping an alias.
+    level = zi._compresslevel
+    return zlib.Z_DEFAULT_COMPRESSION if level is None else level
+
+
+def _new_compressor(zi):
+    return zlib.compressobj(_compress_level(zi), zlib.DEFLATED, -15)
+
+
+class Precompressed:
+    """Data compressed ahead of writing it with `write_precompressed`.
+
+    Attributes:
+        data: A file object with the raw deflate stream, positioned at its
+            start. Small data is kept in memory, larger data is spooled to
+            disk.
+        crc: The CRC-32 of the uncompressed data.
+        size: The size of the uncompressed data.
+    """
+
+    def __init__(self, data, crc, size):
+        self.data = data
+        self.crc = crc
+        self.size = size
+
+    def close(self):
+        self.data.close()
+
+
+def deflate_file(zi, path, hash=None):
+    """Compresses a file the same way `zipfile` does for the given ZipInfo.
+
+    The file is read in blocks, so memory usage doesn't depend on its size.
+
+    Args:
+        zi: The ZipInfo the data is compressed for.
+        path: The path of the file to compress.
+        hash: A `hashlib` hash object to update with the file content.
+
+    Returns:
+        The Precompressed data.
+    """
+    compressor = _new_compressor(zi)
+    data = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+    crc = 0
+    size = 0
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+                crc = zlib.crc32(block, crc)
+                size += len(block)
+                if hash is not None:
+                    hash.update(block)
+                data.write(compressor.compress(block))
+        data.write(compressor.flush())
+        data.seek(0)
+    except BaseException:
+        data.close()
+        raise
+    return Precompressed(data, crc, size)
+
+
+class _Flushed:
+    """Stands in for the compressor of an entry whose data is precompressed.
+
+    `write_precompressed` writes the compressed data itself, so there is
+    nothing left to flush when `zipfile` closes the entry.
+    """
+
+    def compress(self, data):
+        raise AssertionError("precompressed entries are not written through zipfile")
+
+    def flush(self):
+        return b""
+
+
+def write_precompressed(zf, zi, precompressed, **kwargs):
+    """Writes a deflated entry whose data was compressed by `deflate_file`.
+
+    The compressed data is copied as is, and `zipfile` is told the CRC and
+    sizes of the data it stands for, which it records in the headers when the
+    entry is closed. The source file isn't read again.
+
+    Args:
+        zf: The ZipFile to write to.
+        zi: The ZipInfo of the entry.
+        precompressed: The Precompressed data for the entry.
+        **kwargs: Passed to `ZipFile.open`.
+    """
+    # Let zipfile decide if the entry needs zip64 extensions.
+    zi.file_size = precompressed.size
+    with zf.open(zi, "w", **kwargs) as dst:
+        dst._compressor = _Flushed()
+        compress_size = 0
+        for block in iter(lambda: precompressed.data.read(_BLOCK_SIZE), b""):
+            dst._fileobj.write(block)
+            compress_size += len(block)
+        dst._compress_size = compress_size
+        dst._file_size = precompressed.size
+        dst._crc = precompressed.crc
+
+
+@functools.cache
+def _can_write_precompressed():
+    """Tells if `write_precompressed` works with the running Python's zipfile.
+
+    `write_precompressed` relies on internals of `zipfile`, which may change
+    between Python versions. So an entry written with it is checked to be
+    identical to the entry `zipfile` writes by itself. If it isn't, files are
+    compressed while they're written instead.
+    """
+    # Several blocks of poorly compressible data.
+    data = b"".join(
+        hashlib.sha256(str(i).encode()).hexdigest().encode() for i in range(8192)
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = join(tmp_dir, "data")
+        with open(path, "wb") as f:
+            f.write(data)
+
+        def write_zip(precompress):
+            out = io.BytesIO()
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+                zi = _new_zip_info("data", zipfile.ZIP_DEFLATED)
+                if precompress:
+                    precompressed = deflate_file(zi, path)
+                    try:
+                        write_precompressed(zf, zi, precompressed)
+                    finally:
+                        precompressed.close()
+                else:
+                    with open(path, "rb") as src:
+                        with zf.open(zi, "w") as dst:
+                            shutil.copyfileobj(src, dst, _BLOCK_SIZE)
+            return out.getvalue()
+
+        try:
+            return write_zip(precompress=True) == write_zip(precompress=False)
+        except Exception:
+            return False
+
+
+def _scan_file(path, with_digest):
+    """Returns the CRC-32, size, and SHA-256 hex digest (if requested) of a file."""
+    crc = 0
+    size = 0
+    digest = hashlib.sha256() if with_digest else None
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+            if digest is not None:
+                digest.update(block)
+    return crc, size, digest.hexdigest() if digest is not None else None
+
+
+def _compress_file(zi, content_path, reuse=None):
+    """Compresses a file the same way `zipfile` does for the given ZipInfo.
+
+    If `reuse` is given, the compressed data is taken from it when the content
+    was already compressed before, and is added to it otherwise.
+
+    Returns:
+        The Precompressed data.
+    """
+    if reuse is None:
+        return deflate_file(zi, content_path)
+    crc, size, digest = _scan_file(content_path, reuse.uses_digest)
+    precompressed = reuse.get(zi, content_path, crc, size, digest)
+    if precompressed is None:
+        precompressed = deflate_file(zi, content_path)
+        reuse.put(zi, digest, precompressed)
+    return precompressed
+
+
+# The fixed size part of a zip local file header, which is followed by the
+# file name and extra field. See section 4.3.7 of the zip APPNOTE.
+_LOCAL_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+
+def _same_content(compressed, path):
+    """Tells if the raw deflate data in `compressed` decompresses to a file."""
+    decompressor = zlib.decompressobj(-15)
+    with open(path, "rb") as f:
+        for block in iter(lambda: compressed.read(_BLOCK_SIZE), b""):
+            while block:
+                # Bound the decompressed size, deflate can compress 1000:1.
+                data = decompressor.decompress(block, _BLOCK_SIZE)
+                if f.read(len(data)) != data:
+                    return False
+                block = decompressor.unconsumed_tail
+        data = decompressor.flush()
+        if f.read(len(data)) != data:
+            return False
+        return decompressor.eof and not f.read(1)
+
+
+class _ReuseSources:
+    """Sources of compressed data for content that was compressed before.
+
+    Data can be reused from a previously created zip and a content-addressed
+    cache directory. Members of the previous zip are reused if they have the
+    same path, mode, size, and CRC, and decompress to the same content. Cache
+    entries are keyed by the SHA-256 of the content, the compression level,
+    and the zlib version, and are added for content that isn't found.
+    """
+
+    def __init__(self, reuse_zip=None, cache_dir=None):
+        self._zip = zipfile.ZipFile(reuse_zip) if reuse_zip else None
+        # The members of the previous zip are read through a single file
+        # object, which the compression threads share.
+        self._zip_lock = threading.Lock()
+        self._cache_dir = cache_dir
+        # Cache entries are found by the digest of the content.
+        self.uses_digest = bool(cache_dir)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+    def get(self, zi, content_path, crc, size, digest):
+        compressed = self._get_from_zip(zi, content_path, crc, size)
+        if compressed is None:
+            compressed = self._get_from_cache(zi, digest, crc, size)
+        return compressed
+
+    def put(self, zi, digest, precompressed):
+        if not self._cache_dir:
+            return
+        path = self._cache_path(zi, digest)
+        os.makedirs(dirname(path), exist_ok=True)
+        # Write to a unique temporary file and rename it, so that concurrent
+        # builds never observe a partially written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(precompressed.data, f, _BLOCK_SIZE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        finally:
+            precompressed.data.seek(0)
+
+    def _get_from_zip(self, zi, content_path, crc, size):
+        if self._zip is None:
+            return None
+        try:
+            info = self._zip.getinfo(zi.filename)
+        except KeyError:
+            return None
+        if (
+            info.compress_type != zipfile.ZIP_DEFLATED
+            or info.external_attr != zi.external_attr
+            or info.file_size != size
+            or info.CRC != crc
+        ):
+            return None
+        data = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+        try:
+            with self._zip_lock:
+                fp = self._zip.fp
+                fp.seek(info.header_offset)
+                header = _LOCAL_FILE_HEADER.unpack(fp.read(_LOCAL_FILE_HEADER.size))
+                name_length, extra_length = header[-2:]
+                fp.seek(name_length + extra_length, os.SEEK_CUR)
+                remaining = info.compress_size
+                while remaining:
+                    block = fp.read(min(remaining, _BLOCK_SIZE))
+                    if not block:
+                        raise EOFError(f"{zi.filename} is truncated")
+                    data.write(block)
+                    remaining -= len(block)
+            # A matching CRC doesn't guarantee matching content.
+            data.seek(0)
+            same = _same_content(data, content_path)
+            data.seek(0)
+        except BaseException:
+            data.close()
+            raise
+        if not same:
+            data.close()
+            return None
+        return Precompressed(data, crc, size)
+
+    def _get_from_cache(self, zi, digest, crc, size):
+        if not self._cache_dir:
+            return None
+        try:
+            data = open(self._cache_path(zi, digest), "rb")
+        except FileNotFoundError:
+            return None
+        return Precompressed(data, crc, size)
+
+    def _cache_path(self, zi, digest):
+        return join(
+            self._cache_dir,
+            "deflate-{}-zlib-{}".format(_compress_level(zi), zlib.ZLIB_RUNTIME_VERSION),
+            digest[:2],
+            digest,
+        )
+
+
+def _compress_in_order(items, workers, reuse=None):
+    """Compresses files in a thread pool, yielding results in order.
+
+    zlib releases the GIL while compressing, so threads compress in parallel.
+    At most a couple of files per worker are compressed ahead of the one being
+    written. Compressed data beyond `_SPOOL_MAX_SIZE` per file is spooled to
+    disk, which bounds memory usage regardless of the file sizes.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        try:
+            for zi, content_path in items:
+                pending.append(executor.submit(_compress_file, zi, content_path, reuse))
+                if len(pending) > workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Don't leave spooled data behind if writing the zip failed.
+            for future in pending:
+                if not future.cancel() and not future.exception():
+                    future.result().close()
 
 
 def create_zip(
@@ -187,6 +527,9 @@ def create_zip(
     legacy_external_runfiles,
     runfiles_dir,
     platform_pathsep,
+    workers=1,
+    reuse_zip=None,
+    cache_dir=None,
 ):
     compress_type = zipfile.ZIP_STORED if compress_level == 0 else zipfile.ZIP_DEFLATED
     zf_level = compress_level if compress_level != 0 else None
@@ -195,12 +538,78 @@ def create_zip(
         manifest_path, workspace_name, legacy_external_runfiles, runfiles_dir
     )
 
+    prepared = []
     seen = set()
-    with zipfile.ZipFile(
-        output_zip, "w", compress_type, allowZip64=True, compresslevel=zf_level
-    ) as zf:
-        for entry in entries:
-            _write_entry(zf, entry, compress_type, seen, platform_pathsep)
+    for entry in entries:
+        # Normalize slashes, otherwise the `seen` logic doesn't
+        # work correctly.
+        zip_path = normalize_zip_path(entry[2])
+        if zip_path in seen:
+            # This can occur because symlink entries have precedence
+            # over non-symlink entries.
+            continue
+        seen.add(zip_path)
+        prepared.append(_prepare_entry(entry, compress_type, platform_pathsep))
+
+    # Compressed data can only be written if `write_precompressed` works, and
+    # reusing it is only useful if the data is compressed.
+    precompress = compress_type == zipfile.ZIP_DEFLATED and _can_write_precompressed()
+    if precompress and (reuse_zip or cache_dir):
+        reuse = _ReuseSources(reuse_zip, cache_dir)
+    else:
+        reuse = None
+
+    if precompress and (workers > 1 or reuse is not None):
+        compressed = _compress_in_order(
+            (
+                (zi, content.path)
+                for zi, content in prepared
+                if isinstance(content, _FileContent)
+            ),
+            workers,
+            reuse,
+        )
+    else:
+        compressed = None
+
+    # The previous zip may be the output, so it can't be overwritten while
+    # its members are being read.
+    if reuse is not None:
+        tmp_output_zip = str(output_zip) + ".tmp"
+    else:
+        tmp_output_zip = output_zip
+    try:
+        with zipfile.ZipFile(
+            tmp_output_zip, "w", compress_type, allowZip64=True, compresslevel=zf_level
+        ) as zf:
+            for zi, content in prepared:
+                if not isinstance(content, _FileContent):
+                    zf.writestr(zi, content)
+                elif compressed is not None:
+                    precompressed = next(compressed)
+                    try:
+                        write_precompressed(zf, zi, precompressed)
+                    finally:
+                        precompressed.close()
+                else:
+                    with open(content.path, "rb") as src, zf.open(zi, "w") as dst:
+                        shutil.copyfileobj(src, dst, _BLOCK_SIZE)
+    except BaseException:
+        if compressed is not None:
+            compressed.close()
+        if reuse is not None:
+            # Don't leave a partial output behind; the previous zip, if it is
+            # the output, is left untouched.
+            try:
+                os.unlink(tmp_output_zip)
+            except FileNotFoundError:
+                pass
+        raise
+    finally:
+        if reuse is not None:
+            reuse.close()
+    if reuse is not None:
+        os.replace(tmp_output_zip, output_zip)
 
 
 def main():
@@ -252,6 +661,28 @@ into account.
         default=0,
         help="Compression level (0 for stored, others for deflated)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of threads used to compress files",
+    )
+    parser.add_argument(
+        "--reuse-zip",
+        help="""
+Path to a previously created zip, e.g. a previous version of the output.
+Compressed members whose path, mode, and content are unchanged are copied
+from it instead of being compressed again. It must have been created with the
+same compression level.
+""",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="""
+Path to a directory to cache compressed content in. Content found in it isn't
+compressed again, and content that isn't found is added to it.
+""",
+    )
     parser.add_argument("--workspace-name", default="", help="Name of the workspace")
     parser.add_argument(
         "--legacy-external-runfiles",
@@ -276,6 +707,9 @@ into account.
             legacy_external_runfiles=args.legacy_external_runfiles == "1",
             runfiles_dir=args.runfiles_dir,
             platform_pathsep=args.target_platform_pathsep,
+            workers=args.workers,
+            reuse_zip=args.reuse_zip,
+            cache_dir=args.cache_dir,
         )
     except Exception as e:
         e.add_note(f"Error creating zip {args.output}")
@@ -16,19 +16,31 @@ from __future__ import annotations
 
 import argparse
 import base64
+import collections
 import csv
+import functools
 import hashlib
 import io
 import os
 import re
 import stat
 import sys
+import tempfile
 import zipfile
-from collections.abc import Sequence
+import zlib
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 _ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
 
+# The size of the blocks files are read, hashed, and compressed in.
+_BLOCK_SIZE = 2**20
+
+# Compressed data up to this size is kept in memory, larger data is spooled
+# to a temporary file.
+_SPOOL_MAX_SIZE = 16 * 2**20
+
 
 def commonpath(path1, path2):
     ret = []
@@ -127,6 +139,140 @@ def arcname_from(
     return add_path_prefix + normalized_arcname
 
 
+class _Precompressed:
+    """Stands in for the compressor of a zip entry whose data is compressed.
+
+    `zipfile` feeds the uncompressed data through the compressor, computing
+    the CRC and sizes along the way. The compressed data is returned in
+    chunks as the data is fed, and any remainder when flushed. Since zlib's
+    output doesn't depend on how its input is split, the result is identical
+    to compressing the data while writing it.
+    """
+
+    def __init__(self, compressed):
+        self._compressed = compressed
+
+    def compress(self, data):
+        return self._compressed.read(len(data))
+
+    def flush(self):
+        return self._compressed.read()
+
+
+def _hash_and_compress(zinfo: zipfile.ZipInfo, real_filename: str, compress=None):
+    """Hashes a file and compresses it the way `zipfile` does for `zinfo`.
+
+    Args:
+        zinfo: The ZipInfo of the file's entry.
+        real_filename: The path of the file.
+        compress: Whether to compress the file. If None, deflated entries are
+            compressed if `_Precompressed` can be used.
+
+    Returns:
+        A tuple of the sha256 hash object, the size of the file, and a file
+        object with the compressed data (or None if it isn't compressed).
+    """
+    if compress is None:
+        compress = (
+            zinfo.compress_type == zipfile.ZIP_DEFLATED and _can_swap_compressor()
+        )
+    hash = hashlib.sha256()
+    size = 0
+    compressed = None
+    compressor = None
+    if compress:
+        # Python 3.13 renamed this to `compress_level`, keeping an alias.
+        level = zinfo._compresslevel
+        if level is None:
+            level = zlib.Z_DEFAULT_COMPRESSION
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        compressed = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+    try:
+        with open(real_filename, "rb") as fsrc:
+            while True:
+                block = fsrc.read(_BLOCK_SIZE)
+                if not block:
+                    break
+                hash.update(block)
+                size += len(block)
+                if compressor is not None:
+                    compressed.write(compressor.compress(block))
+        if compressor is not None:
+            compressed.write(compressor.flush())
+            compressed.seek(0)
+    except BaseException:
+        if compressed is not None:
+            compressed.close()
+        raise
+    return hash, size, compressed
+
+
+def _write_entry(zip_file, zinfo, real_filename, compressed=None, hash=None):
+    """Writes a file to a zip, returning its size.
+
+    Args:
+        zip_file: The ZipFile to write to.
+        zinfo: The ZipInfo of the file's entry.
+        real_filename: The path of the file.
+        compressed: The data `_hash_and_compress` compressed for the file,
+            which `zipfile` writes instead of compressing the file itself.
+        hash: A `hashlib` hash object to update with the file's content.
+    """
+    written = 0
+    with open(real_filename, "rb") as fsrc:
+        with zip_file.open(zinfo, "w", force_zip64=True) as fdst:
+            if compressed is not None:
+                fdst._compressor = _Precompressed(compressed)
+            while True:
+                block = fsrc.read(_BLOCK_SIZE)
+                if not block:
+                    break
+                fdst.write(block)
+                if hash is not None:
+                    hash.update(block)
+                written += len(block)
+    return written
+
+
+@functools.cache
+def _can_swap_compressor() -> bool:
+    """Tells if `_Precompressed` can stand in for the compressor of `zipfile`.
+
+    Swapping the compressor relies on internals of `zipfile`, which may change
+    between Python versions. So an entry written with it is checked to be
+    identical to the entry `zipfile` writes by itself. If it isn't, files are
+    only hashed ahead of time, and compressed while they're written.
+    """
+    # Several blocks of poorly compressible data.
+    data = b"".join(
+        hashlib.sha256(str(i).encode()).hexdigest().encode() for i in range(8192)
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "data")
+        with open(path, "wb") as f:
+            f.write(data)
+
+        def write_zip(swap):
+            out = io.BytesIO()
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                zinfo = zipfile.ZipInfo("data", date_time=_ZIP_EPOCH)
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+                compressed = None
+                if swap:
+                    compressed = _hash_and_compress(zinfo, path, compress=True)[2]
+                try:
+                    _write_entry(zip_file, zinfo, path, compressed)
+                finally:
+                    if compressed is not None:
+                        compressed.close()
+            return out.getvalue()
+
+        try:
+            return write_zip(swap=True) == write_zip(swap=False)
+        except Exception:
+            return False
+
+
 class _WhlFile(zipfile.ZipFile):
     def __init__(
         self,
@@ -138,9 +284,16 @@ class _WhlFile(zipfile.ZipFile):
         add_path_prefix=None,
         compression=zipfile.ZIP_DEFLATED,
         quote_all_filenames: bool = False,
+        workers: int = 1,
+        stored_extensions: Sequence[str] = (),
         **kwargs,
     ):
         self._distribution_prefix = distribution_prefix
+        # Number of threads to hash and compress files with.
+        self._workers = max(1, workers)
+        # Files with these (lowercase) extensions are already compressed, so
+        # they're stored without compressing them again.
+        self._stored_extensions = tuple(ext.lower() for ext in stored_extensions)
 
         self._strip_path_prefixes = strip_path_prefixes or []
         self._add_path_prefix = add_path_prefix or ""
@@ -160,16 +313,57 @@ class _WhlFile(zipfile.ZipFile):
 
     def add_file(self, package_filename, real_filename):
         """Add given file to the distribution."""
+        self.add_files([(package_filename, real_filename)])
 
-        if os.path.isdir(real_filename):
-            directory_contents = sorted(os.listdir(real_filename))
-            for file_ in directory_contents:
-                self.add_file(
-                    "{}/{}".format(package_filename, file_),
-                    "{}/{}".format(real_filename, file_),
+    def add_files(self, files: Iterable[tuple[str, str]]) -> None:
+        """Add given (package_filename, real_filename) pairs to the distribution.
+
+        Files are hashed and compressed in parallel, but are written in the
+        given order, so the archive doesn't depend on the number of workers.
+        """
+        entries = (
+            (self._file_zipinfo(package_filename), real_filename)
+            for package_filename, real_filename in self._expand_dirs(files)
+        )
+        for zinfo, real_filename, result in self._hash_and_compress(entries):
+            if result is None:
+                # Hash and compress while writing.
+                hash, compressed = hashlib.sha256(), None
+            else:
+                hash, size, compressed = result
+
+            # Write file to the zip archive while computing the hash and length
+            try:
+                written = _write_entry(
+                    self,
+                    zinfo,
+                    real_filename,
+                    compressed,
+                    hash if result is None else None,
                 )
-            return
+            finally:
+                if compressed is not None:
+                    compressed.close()
+            if result is None:
+                size = written
+
+            self._add_to_record(zinfo.filename, self._serialize_digest(hash), size)
+
+    def _expand_dirs(self, files):
+        for package_filename, real_filename in files:
+            if os.path.isdir(real_filename):
+                directory_contents = sorted(os.listdir(real_filename))
+                yield from self._expand_dirs(
+                    (
+                        "{}/{}".format(package_filename, file_),
+                        "{}/{}".format(real_filename, file_),
+                    )
+                    for file_ in directory_contents
+                )
+            else:
+                yield package_filename, real_filename
 
+    def _file_zipinfo(self, package_filename):
         arcname = arcname_from(
             package_filename,
             distribution_prefix=self._distribution_prefix,
@@ -177,21 +371,51 @@ class _WhlFile(zipfile.ZipFile):
             add_path_prefix=self._add_path_prefix,
         )
         zinfo = self._zipinfo(arcname)
+        if self._stored_extensions and arcname.lower().endswith(
+            self._stored_extensions
+        ):
+            zinfo.compress_type = zipfile.ZIP_STORED
+        return zinfo
 
-        # Write file to the zip archive while computing the hash and length
-        hash = hashlib.sha256()
-        size = 0
-        with open(real_filename, "rb") as fsrc:
-            with self.open(zinfo, "w", force_zip64=True) as fdst:
-                while True:
-                    block = fsrc.read(2**20)
-                    if not block:
-                        break
-                    fdst.write(block)
-                    hash.update(block)
-                    size += len(block)
+    def _hash_and_compress(self, entries):
+        """Hashes and compresses files in a thread pool, yielding them in order.
 
-        self._add_to_record(arcname, self._serialize_digest(hash), size)
+        With a single worker, the files are hashed and compressed while they
+        are written instead, and None is yielded as their result.
+
+        zlib and hashlib release the GIL while processing data, so threads
+        work in parallel. At most a couple of files per worker are processed
+        ahead of the one being written, which bounds memory and disk usage.
+        """
+        if self._workers == 1:
+            for zinfo, real_filename in entries:
+                yield zinfo, real_filename, None
+            return
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            pending = collections.deque()
+            try:
+                for zinfo, real_filename in entries:
+                    pending.append(
+                        (
+                            zinfo,
+                            real_filename,
+                            executor.submit(_hash_and_compress, zinfo, real_filename),
+                        )
+                    )
+                    if len(pending) > self._workers * 2:
+                        zinfo, real_filename, future = pending.popleft()
+                        yield zinfo, real_filename, future.result()
+                while pending:
+                    zinfo, real_filename, future = pending.popleft()
+                    yield zinfo, real_filename, future.result()
+            finally:
+                # Release the compressed data of files that weren't written.
+                for _, _, future in pending:
+                    if not future.cancel() and future.exception() is None:
+                        compressed = future.result()[2]
+                        if compressed is not None:
+                            compressed.close()
 
     def add_string(self, filename, contents):
         """Add given 'contents' as filename to the distribution."""
@@ -269,6 +493,8 @@ class WheelMaker(object):
         outfile=None,
         strip_path_prefixes=None,
         add_path_prefix=None,
+        workers=1,
+        stored_extensions=(),
     ):
         self._name = name
         self._version = normalize_pep440(version)
@@ -280,6 +506,8 @@ class WheelMaker(object):
         self._strip_path_prefixes = strip_path_prefixes
         self._add_path_prefix = add_path_prefix
         self._compress = compress
+        self._workers = workers
+        self._stored_extensions = stored_extensions
         self._wheelname_fragment_distribution_name = escape_filename_distribution_name(
             self._name
         )
@@ -305,6 +533,8 @@ class WheelMaker(object):
             compression=(
                 zipfile.ZIP_DEFLATED if self._compress else zipfile.ZIP_STORED
             ),
+            workers=self._workers,
+            stored_extensions=self._stored_extensions,
         )
         return self
 
@@ -341,6 +571,10 @@ class WheelMaker(object):
         """Add given file to the distribution."""
         self.whlfile.add_file(package_filename, real_filename)
 
+    def add_files(self, files):
+        """Add given (package_filename, real_filename) pairs to the distribution."""
+        self.whlfile.add_files(files)
+
     def add_wheelfile(self):
         """Write WHEEL file to the distribution"""
         # TODO(pstradomski): Support non-purelib wheels.
@@ -472,6 +706,20 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Disable compression of the final archive",
     )
+    output_group.add_argument(
+        "--stored_extension",
+        type=str,
+        action="append",
+        default=[],
+        help="Extension (e.g. '.gz') of already compressed files to store "
+        "without compressing them again. Can be supplied multiple times.",
+    )
+    output_group.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of threads used to hash and compress files.",
+    )
     output_group.add_argument(
         "--name_file",
         type=Path,
@@ -610,9 +858,10 @@ def main() -> None:
         strip_path_prefixes=strip_prefixes,
         add_path_prefix=arguments.path_prefix,
         compress=not arguments.no_compress,
+        workers=arguments.workers,
+        stored_extensions=arguments.stored_extension,
     ) as maker:
-        for package_filename, real_filename in all_files:
-            maker.add_file(package_filename, real_filename)
+        maker.add_files(all_files)
         maker.add_wheelfile()
 
         description = None
@@ -680,10 +929,14 @@ def main() -> None:
             )
 
         # Sort the files for reproducible order in the archive.
-        for filename, real_path in sorted(data_files):
-            maker.add_file(maker.data_path(filename), real_path)
-        for filename, real_path in sorted(extra_distinfo_file):
-            maker.add_file(maker.distinfo_path(filename), real_path)
+        maker.add_files(
+            (maker.data_path(filename), real_path)
+            for filename, real_path in sorted(data_files)
+        )
+        maker.add_files(
+            (maker.distinfo_path(filename), real_path)
+            for filename, real_path in sorted(extra_distinfo_file)
+        )
 
         maker.add_recordfile()
 